@@ -0,0 +1,31 @@
+"""Add task info hash
+
+Revision ID: 2d7b5e41c8a3
+Revises: 5d1f0a3c9b7e
+Create Date: 2016-08-24 11:05:12.304818
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2d7b5e41c8a3'
+down_revision = '5d1f0a3c9b7e'
+
+from alembic import op
+import sqlalchemy as sa
+
+from pybossa.model.info_hash import (create_hash_column, update_hashes,
+                                     setup_hash)
+
+
+def upgrade():
+    conn = op.get_bind()
+    create_hash_column(conn)
+    update_hashes(conn)
+    setup_hash(conn)
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS task_info_hash ON task')
+    op.drop_column('task', 'info_hash')
+    op.execute('DROP FUNCTION IF EXISTS pybossa_info_hash_trigger()')
+    op.execute('DROP FUNCTION IF EXISTS pybossa_info_hash(json)')
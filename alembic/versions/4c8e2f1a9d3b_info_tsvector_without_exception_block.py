@@ -0,0 +1,34 @@
+"""Info tsvector without exception block
+
+Revision ID: 4c8e2f1a9d3b
+Revises: 2d7b5e41c8a3
+Create Date: 2016-08-29 09:47:21.113604
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4c8e2f1a9d3b'
+down_revision = '2d7b5e41c8a3'
+
+from alembic import op
+import sqlalchemy as sa
+
+from pybossa.model.search import INFO_VECTOR
+
+
+def upgrade():
+    op.execute(INFO_VECTOR)
+
+
+def downgrade():
+    op.execute("""
+CREATE OR REPLACE FUNCTION pybossa_info_tsvector(info json)
+RETURNS tsvector AS $$
+BEGIN
+    RETURN to_tsvector(pybossa_search_config(), coalesce(
+        (SELECT string_agg(value, ' ') FROM json_each_text(info)), ''));
+EXCEPTION WHEN others THEN
+    RETURN ''::tsvector;
+END
+$$ LANGUAGE plpgsql IMMUTABLE
+""")
@@ -0,0 +1,37 @@
+"""Add full text search vectors
+
+Revision ID: 5d1f0a3c9b7e
+Revises: 8ce9b3da799e
+Create Date: 2016-08-10 10:21:34.518223
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5d1f0a3c9b7e'
+down_revision = '8ce9b3da799e'
+
+from alembic import op
+import sqlalchemy as sa
+
+from pybossa.model.search import (create_search_columns, setup_search,
+                                  update_search_vectors, VECTOR_COLUMNS,
+                                  INFO_TABLES)
+
+
+def upgrade():
+    conn = op.get_bind()
+    create_search_columns(conn)
+    setup_search(conn)
+    update_search_vectors(conn)
+
+
+def downgrade():
+    for table in INFO_TABLES:
+        op.execute('DROP TRIGGER IF EXISTS %s_info_tsv ON %s' % (table, table))
+    op.execute('DROP TRIGGER IF EXISTS project_search_tsv ON project')
+    for table, column in VECTOR_COLUMNS.items():
+        op.drop_column(table, column)
+    op.execute('DROP FUNCTION IF EXISTS pybossa_info_tsv_trigger()')
+    op.execute('DROP FUNCTION IF EXISTS pybossa_project_tsv_trigger()')
+    op.execute('DROP FUNCTION IF EXISTS pybossa_info_tsvector(json)')
+    op.execute('DROP FUNCTION IF EXISTS pybossa_search_config()')
@@ -39,6 +39,7 @@ import pybossa.model as model
 from pybossa.core import csrf, ratelimits, sentinel
 from pybossa.ratelimit import ratelimit
 from pybossa.cache.projects import n_tasks
+import pybossa.cache.helpers as cached_helpers
 import pybossa.sched as sched
 from pybossa.error import ErrorStatus
 from global_stats import GlobalStatsAPI
@@ -53,6 +54,9 @@ from token import TokenAPI
 from result import ResultAPI
 from pybossa.core import project_repo, task_repo
 from pybossa.contributions_guard import ContributionsGuard
+from pybossa.project_versions import ProjectVersions
+from api_base import request_validators, not_modified, set_validators
+from api_base import not_modified_response
 from pybossa.auth import jwt_authorize_project
 
 blueprint = Blueprint('api', __name__)
@@ -167,12 +171,13 @@ def _retrieve_new_task(project_id):
 def user_progress(project_id=None, short_name=None):
     """API endpoint for user progress.
 
-    Return a JSON object with two fields regarding the tasks for the user:
+    Return a JSON object with three fields regarding the tasks for the user:
         { 'done': 10,
-          'total: 100
+          'total: 100,
+          'available': 90
         }
        This will mean that the user has done a 10% of the available tasks for
-       him
+       him, and that he can still contribute to 90 tasks
 
     """
     if project_id or short_name:
@@ -182,15 +187,20 @@ def user_progress(project_id=None, short_name=None):
             project = project_repo.get(project_id)
 
         if project:
-            # For now, keep this version, but wait until redis cache is used here for task_runs too
             query_attrs = dict(project_id=project.id)
             if current_user.is_anonymous():
                 query_attrs['user_ip'] = request.remote_addr or '127.0.0.1'
             else:
                 query_attrs['user_id'] = current_user.id
-            taskrun_count = task_repo.count_task_runs_with(**query_attrs)
-            tmp = dict(done=taskrun_count, total=n_tasks(project.id))
-            return Response(json.dumps(tmp), mimetype="application/json")
+            version = ProjectVersions(sentinel.master).get(project.id)
+            validators = request_validators(version, *sorted(query_attrs.items()))
+            if not_modified(*validators):
+                return not_modified_response(*validators)
+            progress = cached_helpers.user_progress(**query_attrs)
+            tmp = dict(done=progress['done'], total=n_tasks(project.id),
+                       available=progress['available'])
+            response = Response(json.dumps(tmp), mimetype="application/json")
+            return set_validators(response, *validators)
         else:
             return abort(404)
     else:  # pragma: no cover
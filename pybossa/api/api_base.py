@@ -27,21 +27,24 @@ This package adds GET, POST, PUT and DELETE methods for any class:
 
 """
 import json
-from flask import request, abort, Response
+from datetime import datetime
+from hashlib import md5
+from flask import request, abort, Response, stream_with_context
 from flask.ext.login import current_user
 from flask.views import MethodView
-from werkzeug.exceptions import NotFound, Unauthorized, Forbidden
+from werkzeug.exceptions import NotFound, Unauthorized, Forbidden, BadRequest
 from pybossa.util import jsonpify
-from pybossa.core import ratelimits
-from pybossa.auth import ensure_authorized_to
+from pybossa.core import ratelimits, sentinel
+from pybossa.auth import ensure_authorized_to, is_authorized_many
 from pybossa.hateoas import Hateoas
 from pybossa.ratelimit import ratelimit
 from pybossa.error import ErrorStatus
+from pybossa.project_versions import ProjectVersions
 from pybossa.core import project_repo, user_repo, task_repo, result_repo
 
 repos = {'Task'   : {'repo': task_repo, 'filter': 'filter_tasks_by',
                      'get': 'get_task', 'save': 'save', 'update': 'update',
-                     'delete': 'delete'},
+                     'delete': 'delete', 'bulk_save': 'bulk_save'},
         'TaskRun' : {'repo': task_repo, 'filter': 'filter_task_runs_by',
                      'get': 'get_task_run',  'save': 'save', 'update': 'update',
                      'delete': 'delete'},
@@ -61,12 +64,74 @@ repos = {'Task'   : {'repo': task_repo, 'filter': 'filter_tasks_by',
 error = ErrorStatus()
 
 
+def request_validators(version, *identity):
+    """Return the ETag and Last-Modified of the current request.
+
+    The ETag depends on the version of the data, on who is asking for it (as
+    the output may vary per user) and on the full path with its arguments.
+
+    """
+    parts = (version,) + identity + (request.full_path,)
+    etag = md5(':'.join(unicode(part) for part in parts).encode('utf-8'))
+    timestamp = ProjectVersions(sentinel.master).timestamp(version)
+    return etag.hexdigest(), datetime.utcfromtimestamp(timestamp)
+
+
+def not_modified(etag, last_modified):
+    """Return True if the client copy is still valid.
+
+    If-None-Match takes precedence over If-Modified-Since.
+
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified):
+    """Add the validators to a response, forcing clients to revalidate it."""
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified_response(etag, last_modified):
+    """Return an empty 304 Not Modified response."""
+    return set_validators(Response(status=304), etag, last_modified)
+
+
 class APIBase(MethodView):
 
     """Class to create CRUD methods."""
 
     hateoas = Hateoas()
 
+    # Domain objects that can be listed as a NDJSON stream. Only objects whose
+    # read permission does not depend on the item itself should be streamable,
+    # as the stream is authorized once for the whole class.
+    streamable = False
+    stream_chunk_size = 1000
+
+    # Columns always loaded when a client asks for a subset of fields with
+    # fields=, as the HATEOAS links or _select_attributes need them.
+    link_fields = ('id', 'project_id', 'task_id', 'category_id')
+    required_fields = ()
+
+    # Domain objects that support conditional GET requests. Their changes are
+    # tracked with the project versions, so If-None-Match/If-Modified-Since
+    # can be answered with a 304 without querying the DB.
+    conditional = False
+
+    # Domain objects that can be created in bulk by POSTing a JSON array or
+    # NDJSON. The create permission is checked once per project, so only
+    # objects whose permission depends just on their project should be bulk.
+    bulk = False
+    bulk_chunk_size = 1000
+
     def valid_args(self):
         """Check if the domain object args are valid."""
         for k in request.args.keys():
@@ -92,38 +157,136 @@ class APIBase(MethodView):
         """
         try:
             ensure_authorized_to('read', self.__class__)
+            if oid is None and self._stream_requested():
+                return self._create_stream_response()
+            validators = self._validators(oid)
+            if validators and not_modified(*validators):
+                return not_modified_response(*validators)
             query = self._db_query(oid)
             json_response = self._create_json_response(query, oid)
-            return Response(json_response, mimetype='application/json')
+            response = Response(json_response, mimetype='application/json')
+            if validators:
+                set_validators(response, *validators)
+            return response
         except Exception as e:
             return error.format_exception(
                 e,
                 target=self.__class__.__name__.lower(),
                 action='GET')
 
+    def _validators(self, oid):
+        """Return the ETag and Last-Modified for a GET, or None."""
+        if not self.conditional or request.args.get('callback'):
+            return None
+        version = ProjectVersions(sentinel.master).get(
+            self._validator_project_id(oid))
+        user_id = (current_user.id if current_user.is_authenticated()
+                   else 'anonymous')
+        return request_validators(version, self.__class__.__name__, user_id)
+
+    def _validator_project_id(self, oid):
+        """Return the project whose version validates the request.
+
+        Requests not bound to a single project are validated with the site
+        version, which changes whenever any project does.
+
+        """
+        try:
+            return int(request.args.get('project_id'))
+        except (ValueError, TypeError):
+            return None
+
     def _create_json_response(self, query_result, oid):
         if len(query_result) == 1 and query_result[0] is None:
             raise abort(404)
-        items = []
-        for item in query_result:
-            try:
-                items.append(self._create_dict_from_model(item))
-                ensure_authorized_to('read', item)
-            except (Forbidden, Unauthorized):
-                # Remove last added item, as it is 401 or 403
-                items.pop()
-            except Exception:  # pragma: no cover
-                raise
         if oid is not None:
             ensure_authorized_to('read', query_result[0])
-            items = items[0]
+            return json.dumps(self._create_dict_from_model(query_result[0]))
+        authorized = is_authorized_many(current_user, 'read', query_result)
+        items = [self._create_dict_from_model(item)
+                 for item, allowed in zip(query_result, authorized) if allowed]
         return json.dumps(items)
 
+    def _stream_requested(self):
+        if not self.streamable:
+            return False
+        if request.args.get('stream') == '1':
+            return True
+        mimetypes = ['application/json', 'application/x-ndjson']
+        best = request.accept_mimetypes.best_match(mimetypes)
+        return best == 'application/x-ndjson'
+
+    def _create_stream_response(self):
+        """Return every item matching the filters as a NDJSON stream.
+
+        The items are walked by ascending id from last_id using a server side
+        cursor, so there is no limit and memory use is constant.
+
+        """
+        repo_info = repos[self.__class__.__name__]
+        repo = repo_info['repo']
+        query_func = repo_info['filter']
+        filters = self._filters_from_request()
+        try:
+            last_id = int(request.args.get('last_id') or 0)
+        except ValueError:
+            raise BadRequest('last_id must be an integer')
+        results = getattr(repo, query_func)(
+            last_id=last_id, yielded=True, chunk_size=self.stream_chunk_size,
+            fulltextsearch=request.args.get('fulltextsearch'), desc=False,
+            fields=self._fields_to_load(), **filters)
+
+        def generate():
+            for item in results:
+                yield json.dumps(self._create_dict_from_model(item)) + '\n'
+        return Response(stream_with_context(generate()),
+                        mimetype='application/x-ndjson')
+
     def _create_dict_from_model(self, model):
-        return self._select_attributes(self._add_hateoas_links(model))
+        obj = self._dictize_fields(model)
+        if request.args.get('links') != '0':
+            obj = self._add_hateoas_links(model, obj)
+        obj = self._select_attributes(obj)
+        fields = self._requested_fields()
+        if fields is not None:
+            # The required fields are only there for _select_attributes
+            for field in set(self.required_fields).difference(fields):
+                obj.pop(field, None)
+        return obj
 
-    def _add_hateoas_links(self, item):
-        obj = item.dictize()
+    def _dictize_fields(self, item):
+        fields = self._requested_fields()
+        if fields is None:
+            return item.dictize()
+        fields = set(fields).union(self.required_fields)
+        return dict((field, getattr(item, field)) for field in fields)
+
+    def _requested_fields(self):
+        """Return the columns asked for with fields=, or None for all."""
+        if not request.args.get('fields'):
+            return None
+        columns = self.__class__.__table__.c.keys()
+        fields = [field.strip() for field in request.args['fields'].split(',')
+                  if field.strip()]
+        for field in fields:
+            if field not in columns:
+                raise AttributeError("%s has no field %s"
+                                     % (self.__class__.__name__, field))
+        return fields
+
+    def _fields_to_load(self):
+        """Return the columns to load from the DB, or None for all."""
+        fields = self._requested_fields()
+        if fields is None:
+            return None
+        columns = self.__class__.__table__.c.keys()
+        fields = set(fields).union(self.required_fields)
+        if request.args.get('links') != '0':
+            fields.update(field for field in self.link_fields
+                          if field in columns)
+        return list(fields)
+
+    def _add_hateoas_links(self, item, obj):
         links, link = self.hateoas.create_links(item)
         if links:
             obj['links'] = links
@@ -150,30 +313,35 @@ class APIBase(MethodView):
             del filters['owner_id']
         return filters
 
-    def _filter_query(self, repo_info, limit, offset):
+    def _filters_from_request(self):
         filters = {}
         for k in request.args.keys():
             if k not in ['limit', 'offset', 'api_key', 'last_id', 'all',
-                         'fulltextsearch', 'desc']:
+                         'fulltextsearch', 'desc', 'stream', 'fields',
+                         'links']:
                 # Raise an error if the k arg is not a column
                 getattr(self.__class__, k)
                 filters[k] = request.args[k]
-        repo = repo_info['repo']
         filters = self.api_context(all_arg=request.args.get('all'), **filters)
+        return self._custom_filter(filters)
+
+    def _filter_query(self, repo_info, limit, offset):
+        repo = repo_info['repo']
         query_func = repo_info['filter']
-        filters = self._custom_filter(filters)
+        filters = self._filters_from_request()
         last_id = request.args.get('last_id')
         fulltextsearch = request.args.get('fulltextsearch')
         desc = request.args.get('desc')
+        fields = self._fields_to_load()
         if last_id:
             results = getattr(repo, query_func)(limit=limit, last_id=last_id,
                                                 fulltextsearch=fulltextsearch,
-                                                desc=False,
+                                                desc=False, fields=fields,
                                                 **filters)
         else:
             results = getattr(repo, query_func)(limit=limit, offset=offset,
                                                 fulltextsearch=fulltextsearch,
-                                                desc=desc,
+                                                desc=desc, fields=fields,
                                                 **filters)
         return results
 
@@ -199,7 +367,9 @@ class APIBase(MethodView):
         """
         try:
             self.valid_args()
-            data = json.loads(request.data)
+            data = self._load_request_data()
+            if self.bulk and isinstance(data, list):
+                return self._create_bulk_response(data)
             self._forbidden_attributes(data)
             inst = self._create_instance_from_request(data)
             repo = repos[self.__class__.__name__]['repo']
@@ -213,6 +383,12 @@ class APIBase(MethodView):
                 target=self.__class__.__name__.lower(),
                 action='POST')
 
+    def _load_request_data(self):
+        if self.bulk and request.mimetype == 'application/x-ndjson':
+            return [json.loads(line) for line in request.data.splitlines()
+                    if line.strip()]
+        return json.loads(request.data)
+
     def _create_instance_from_request(self, data):
         data = self.hateoas.remove_links(data)
         inst = self.__class__(**data)
@@ -221,6 +397,45 @@ class APIBase(MethodView):
         self._validate_instance(inst)
         return inst
 
+    def _create_bulk_response(self, items):
+        """Create many items, returning one JSON result per item.
+
+        Each result is either the created item or the error that prevented
+        it from being created, in the same order as the request.
+
+        """
+        target = self.__class__.__name__.lower()
+        results = [None] * len(items)
+        projects = {}
+        for index, data in enumerate(items):
+            try:
+                if not isinstance(data, dict):
+                    raise BadRequest('Each item must be a JSON object')
+                self._forbidden_attributes(data)
+                data = self.hateoas.remove_links(data)
+                inst = self.__class__(**data)
+                self._update_object(inst)
+                self._validate_instance(inst)
+                projects.setdefault(inst.project_id, []).append((index, inst))
+            except Exception as e:
+                results[index] = error.format_error(e, target, 'POST')
+        authorized = []
+        for project_items in projects.values():
+            try:
+                ensure_authorized_to('create', project_items[0][1])
+                authorized.extend(project_items)
+            except Exception as e:
+                for index, inst in project_items:
+                    results[index] = error.format_error(e, target, 'POST')
+        authorized.sort()
+        repo = repos[self.__class__.__name__]['repo']
+        bulk_save_func = repos[self.__class__.__name__]['bulk_save']
+        getattr(repo, bulk_save_func)([inst for index, inst in authorized],
+                                      chunk_size=self.bulk_chunk_size)
+        for index, inst in authorized:
+            results[index] = inst.dictize()
+        return Response(json.dumps(results), mimetype='application/json')
+
     @jsonpify
     @ratelimit(limit=ratelimits.get('LIMIT'), per=ratelimits.get('PER'))
     def delete(self, oid):
@@ -0,0 +1,64 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Fast path for the requests to the PYBOSSA API.
+
+API clients authenticate with a token (api_key argument or Authorization
+header), or they are anonymous, so those requests do not need the browser
+session: the session cookie is neither decoded nor saved, and the anonymous
+user is set directly instead of being loaded by Flask-Login.
+
+Requests that carry the session or remember me cookies (like the ones sent by
+the task presenters from the browser) go through the regular path, even with
+an Authorization header, as it also carries the project JWT of the task runs
+of external users.
+
+"""
+from flask.sessions import SecureCookieSession, SecureCookieSessionInterface
+
+
+def is_fast_path(app, request):
+    """Return True if the request can skip the browser session."""
+    if not app.config.get('API_FAST_PATH') or request.blueprint != 'api':
+        return False
+    if request.args.get('api_key'):
+        return True
+    remember_cookie = app.config.get('REMEMBER_COOKIE_NAME', 'remember_token')
+    return (app.session_cookie_name not in request.cookies and
+            remember_cookie not in request.cookies)
+
+
+class FastPathSession(SecureCookieSession):
+
+    """An empty session that is never saved."""
+
+
+class FastPathSessionInterface(SecureCookieSessionInterface):
+
+    """Session interface that skips the session cookie on the fast path."""
+
+    def open_session(self, app, request):
+        if is_fast_path(app, request):
+            return FastPathSession()
+        return super(FastPathSessionInterface, self).open_session(app, request)
+
+    def save_session(self, app, session, response):
+        if isinstance(session, FastPathSession):
+            return
+        return super(FastPathSessionInterface, self).save_session(app, session,
+                                                                  response)
@@ -47,6 +47,13 @@ class ProjectAPI(APIBase):
     reserved_keys = set(['id', 'created', 'updated', 'completed', 'contacted',
                          'published', 'secret_key'])
     private_keys = set(['secret_key'])
+    conditional = True
+
+    # Needed by ProjectAuth when the client asks for some fields only
+    required_fields = ('published', 'owner_id')
+
+    def _validator_project_id(self, oid):
+        return oid
 
     def _create_instance_from_request(self, data):
         inst = super(ProjectAPI, self)._create_instance_from_request(data)
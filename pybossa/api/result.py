@@ -22,7 +22,10 @@ This package adds GET, POST, PUT and DELETE methods for:
     * tasks
 
 """
+import json
+from flask import request, Response, stream_with_context
 from werkzeug.exceptions import BadRequest
+from pybossa.core import result_repo
 from pybossa.model.result import Result
 from api_base import APIBase
 
@@ -32,9 +35,30 @@ class ResultAPI(APIBase):
     """Class for domain object Result."""
 
     __class__ = Result
+    streamable = True
+    conditional = True
     reserved_keys = set(['id', 'created', 'project_id',
                          'task_id', 'task_run_ids', 'last_version'])
 
+    def _create_stream_response(self):
+        """Stream the results of a project with their task and task runs
+        embedded if answers=1, so every line is self-contained."""
+        if request.args.get('answers') != '1':
+            return super(ResultAPI, self)._create_stream_response()
+        try:
+            project_id = int(request.args.get('project_id'))
+            last_id = int(request.args.get('last_id') or 0)
+        except (ValueError, TypeError):
+            raise BadRequest('project_id and last_id must be integers')
+        rows = result_repo.filter_results_with_answers(
+            project_id, last_id=last_id, chunk_size=self.stream_chunk_size)
+
+        def generate():
+            for row in rows:
+                yield json.dumps(row) + '\n'
+        return Response(stream_with_context(generate()),
+                        mimetype='application/x-ndjson')
+
     def _forbidden_attributes(self, data):
         for key in data.keys():
             if key in self.reserved_keys:
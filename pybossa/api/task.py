@@ -34,6 +34,9 @@ class TaskAPI(APIBase):
     """Class for domain object Task."""
 
     __class__ = Task
+    streamable = True
+    conditional = True
+    bulk = True
     reserved_keys = set(['id', 'created', 'state'])
 
     def _forbidden_attributes(self, data):
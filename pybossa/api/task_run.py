@@ -30,7 +30,8 @@ from werkzeug.exceptions import Forbidden, BadRequest
 
 from api_base import APIBase
 from pybossa.util import get_user_id_or_ip
-from pybossa.core import task_repo, sentinel
+from pybossa.core import project_repo, sentinel
+from pybossa.cache import tasks as cached_tasks
 from pybossa.contributions_guard import ContributionsGuard
 from pybossa.auth import jwt_authorize_project
 
@@ -40,11 +41,13 @@ class TaskRunAPI(APIBase):
     """Class API for domain object TaskRun."""
 
     __class__ = TaskRun
+    streamable = True
+    conditional = True
     reserved_keys = set(['id', 'created', 'finish_time'])
 
     def _update_object(self, taskrun):
         """Update task_run object with user id or ip."""
-        task = task_repo.get_task(taskrun.task_id)
+        task = cached_tasks.get_task(taskrun.task_id)
         guard = ContributionsGuard(sentinel.master)
 
         self._validate_project_and_task(taskrun, task)
@@ -63,7 +66,8 @@ class TaskRunAPI(APIBase):
         if (task.project_id != taskrun.project_id):
             raise Forbidden('Invalid project_id')
         if taskrun.external_uid:
-            resp = jwt_authorize_project(task.project,
+            project = project_repo.get(task.project_id)
+            resp = jwt_authorize_project(project,
                                          request.headers.get('Authorization'))
             if type(resp) == Response:
                 msg = json.loads(resp.data)['description']
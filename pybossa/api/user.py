@@ -49,6 +49,9 @@ class UserAPI(APIBase):
     # has privacy_mode disabled
     allowed_attributes = ('name', 'locale', 'fullname', 'created')
 
+    # Needed by _select_attributes when the client asks for some fields only
+    required_fields = ('privacy_mode',)
+
     def _select_attributes(self, user_data):
         privacy = self._is_user_private(user_data)
         for attribute in user_data.keys():
@@ -20,6 +20,7 @@ import inspect
 from flask import abort
 from flask.ext.login import current_user
 from pybossa.core import task_repo, project_repo, result_repo
+from pybossa.cache import request_values
 from pybossa.auth.errcodes import *
 
 import jwt
@@ -62,6 +63,9 @@ _auth_classes = {'project': project.ProjectAuth,
                  'result': result.ResultAuth}
 
 
+_authorizers = {}
+
+
 def is_authorized(user, action, resource, **kwargs):
     is_class = inspect.isclass(resource)
     name = resource.__name__ if is_class else resource.__class__.__name__
@@ -71,7 +75,25 @@ def is_authorized(user, action, resource, **kwargs):
     auth = _authorizer_for(name.lower())
     actions = _actions + auth.specific_actions
     assert action in actions, "%s is not a valid action" % action
-    return auth.can(user, action, resource, **kwargs)
+    key = _decision_key(user, action, name, resource, kwargs)
+    decisions = request_values() if key is not None else None
+    if decisions is None:
+        return auth.can(user, action, resource, **kwargs)
+    if key not in decisions:
+        decisions[key] = auth.can(user, action, resource, **kwargs)
+    return decisions[key]
+
+
+def is_authorized_many(user, action, resources):
+    """Return a list with the authorization of action for each resource.
+
+    If the rule of the action gets the project of the resources, they are
+    loaded with a single query, so the authorization classes get them from
+    the session instead of querying them one by one.
+    """
+    # Hold the projects, as the session only keeps weak references to them
+    projects = _load_projects(action, resources)
+    return [is_authorized(user, action, resource) for resource in resources]
 
 
 def ensure_authorized_to(action, resource, **kwargs):
@@ -85,6 +107,8 @@ def ensure_authorized_to(action, resource, **kwargs):
 
 
 def _authorizer_for(resource_name):
+    if resource_name in _authorizers:
+        return _authorizers[resource_name]
     kwargs = {}
     if resource_name in ('project', 'taskrun'):
         kwargs.update({'task_repo': task_repo})
@@ -93,7 +117,31 @@ def _authorizer_for(resource_name):
         kwargs.update({'project_repo': project_repo})
     if resource_name in ('project', 'task', 'taskrun'):
         kwargs.update({'result_repo': result_repo})
-    return _auth_classes[resource_name](**kwargs)
+    _authorizers[resource_name] = _auth_classes[resource_name](**kwargs)
+    return _authorizers[resource_name]
+
+
+def _decision_key(user, action, name, resource, kwargs):
+    """Return the key of a decision that can be reused within a request."""
+    if resource is None or kwargs or getattr(resource, 'id', None) is None:
+        return None
+    user_id = 'anonymous' if user.is_anonymous() else user.id
+    return ('auth', user_id, action, name, resource.id)
+
+
+def _load_projects(action, resources):
+    ids = set()
+    for resource in resources:
+        auth = _authorizer_for(resource.__class__.__name__.lower())
+        if action not in getattr(auth, '_project_actions', ()):
+            continue
+        # Only if loaded, as a deferred column would be queried row by row
+        project_id = resource.__dict__.get('project_id')
+        if project_id is not None:
+            ids.add(project_id)
+    if not ids:
+        return []
+    return project_repo.get_many(list(ids))
 
 
 def handle_error(error):
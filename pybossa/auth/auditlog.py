@@ -19,6 +19,8 @@
 
 class AuditlogAuth(object):
     _specific_actions = []
+    # Actions whose rules get the project of the resource
+    _project_actions = ('read',)
 
     def __init__(self, project_repo):
         self.project_repo = project_repo
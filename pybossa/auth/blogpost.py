@@ -19,6 +19,8 @@
 
 class BlogpostAuth(object):
     _specific_actions = []
+    # Actions whose rules get the project of the resource
+    _project_actions = ('create', 'read')
 
     def __init__(self, project_repo):
         self.project_repo = project_repo
@@ -21,6 +21,8 @@ from flask import abort
 
 class TaskRunAuth(object):
     _specific_actions = []
+    # Actions whose rules get the project of the resource
+    _project_actions = ('create',)
 
     def __init__(self, task_repo, project_repo, result_repo):
         self.task_repo = task_repo
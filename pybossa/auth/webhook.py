@@ -20,6 +20,8 @@
 class WebhookAuth(object):
 
     _specific_actions = []
+    # Actions whose rules get the project of the resource
+    _project_actions = ('read',)
 
     def __init__(self, project_repo):
         self.project_repo = project_repo
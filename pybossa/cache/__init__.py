@@ -24,11 +24,15 @@ It exports:
     * memoize: for caching functions using its arguments as part of the key
     * delete_cached: to remove a cached value
     * delete_memoized: to remove a cached value from the memoize decorator
+    * request_cache: for caching functions for the length of a request
+    * delete_request_cached: to remove a value cached for the current request
+    * request_values: a dict of values stored for the current request
 
 """
 import os
 import hashlib
 from functools import wraps
+from flask import _request_ctx_stack
 from pybossa.core import sentinel
 
 try:
@@ -94,11 +98,12 @@ def cache(key_prefix, timeout=300):
     return decorator
 
 
-def memoize(timeout=300):
+def memoize(timeout=300, cache_none=True):
     """
     Decorator for caching functions using its arguments as part of the key.
 
-    Returns the cached value, or the function if the cache is disabled
+    Returns the cached value, or the function if the cache is disabled. None
+    is not cached if cache_none is False.
 
     """
     if timeout is None:
@@ -113,11 +118,9 @@ def memoize(timeout=300):
                 output = sentinel.slave.get(key)
                 if output:
                     return pickle.loads(output)
-                output = f(*args, **kwargs)
-                sentinel.master.setex(key, timeout, pickle.dumps(output))
-                return output
             output = f(*args, **kwargs)
-            sentinel.master.setex(key, timeout, pickle.dumps(output))
+            if output is not None or cache_none:
+                sentinel.master.setex(key, timeout, pickle.dumps(output))
             return output
         return wrapper
     return decorator
@@ -154,3 +157,41 @@ def delete_memoized(function, *args, **kwargs):
             return False
         return bool(sentinel.master.delete(*keys_to_delete))
     return True
+
+
+def request_values():
+    """Return the values cached for the current request or None."""
+    ctx = _request_ctx_stack.top
+    if ctx is None:
+        return None
+    if not hasattr(ctx, 'pybossa_cache'):
+        ctx.pybossa_cache = {}
+    return ctx.pybossa_cache
+
+
+def request_cache(f):
+    """
+    Decorator for caching functions for the length of a request.
+
+    It works as an identity map: the function is called only once per request
+    for the same arguments. Outside of a request the function is always called.
+
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        values = request_values()
+        if values is None:
+            return f(*args, **kwargs)
+        key = (f.__name__, get_key_to_hash(*args, **kwargs))
+        if key not in values:
+            values[key] = f(*args, **kwargs)
+        return values[key]
+    return wrapper
+
+
+def delete_request_cached(function, *args, **kwargs):
+    """Delete a value cached for the current request."""
+    values = request_values()
+    if values is not None:
+        key = (function.__name__, get_key_to_hash(*args, **kwargs))
+        values.pop(key, None)
@@ -18,15 +18,14 @@
 """Cache module with helper functions."""
 
 from sqlalchemy.sql import text
-from pybossa.core import db
-from pybossa.cache import memoize, ONE_HOUR
+from pybossa.core import db, sentinel
 from pybossa.cache.projects import overall_progress, n_results
+from pybossa.progress_counters import ProgressCounters
 
 
 session = db.slave_session
 
 
-@memoize(timeout=ONE_HOUR * 3)
 def n_available_tasks(project_id, user_id=None, user_ip=None):
     """Return the number of tasks for a given project a user can contribute to.
 
@@ -58,6 +57,45 @@ def n_available_tasks(project_id, user_id=None, user_ip=None):
     return n_tasks
 
 
+def n_user_task_runs(project_id, user_id=None, user_ip=None):
+    """Return the number of task runs a user has submitted to a project."""
+    if user_id:
+        query = text('''SELECT COUNT(id) AS n_task_runs FROM task_run
+                       WHERE project_id=:project_id AND user_id=:user_id;''')
+        params = dict(project_id=project_id, user_id=user_id)
+    else:
+        query = text('''SELECT COUNT(id) AS n_task_runs FROM task_run
+                       WHERE project_id=:project_id AND user_ip=:user_ip;''')
+        params = dict(project_id=project_id, user_ip=user_ip or '127.0.0.1')
+    # Use the master, as the task run may have just been submitted
+    result = db.session.execute(query, params)
+    n_task_runs = 0
+    for row in result:
+        n_task_runs = row.n_task_runs
+    return n_task_runs
+
+
+def user_progress(project_id, user_id=None, user_ip=None):
+    """Return a dict with the number of task runs a user has submitted to a
+    project (done) and the number of tasks they can still contribute to
+    (available).
+
+    The values are kept in Redis counters, and they are only computed from the
+    DB when the counters do not exist yet.
+    """
+    if user_id:
+        user_ip = None
+    counters = ProgressCounters(sentinel.master)
+    progress = counters.get(project_id, user_id=user_id, user_ip=user_ip)
+    if progress is None:
+        done = n_user_task_runs(project_id, user_id=user_id, user_ip=user_ip)
+        available = n_available_tasks(project_id, user_id=user_id,
+                                      user_ip=user_ip)
+        progress = counters.set(project_id, done, available,
+                                user_id=user_id, user_ip=user_ip)
+    return progress
+
+
 def check_contributing_state(project, user_id=None, user_ip=None):
     """Return the state of a given project for a given user.
 
@@ -73,7 +111,8 @@ def check_contributing_state(project, user_id=None, user_ip=None):
         if has_no_presenter(project) or _has_no_tasks(project_id):
             return states[1]
         return states[2]
-    if n_available_tasks(project_id, user_id=user_id, user_ip=user_ip) > 0:
+    progress = user_progress(project_id, user_id=user_id, user_ip=user_ip)
+    if progress['available'] > 0:
         return states[3]
     return states[4]
 
@@ -17,10 +17,11 @@
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 """Cache module for projects."""
 from sqlalchemy.sql import text
-from pybossa.core import db, timeouts
+from pybossa.core import db, timeouts, sentinel
 from pybossa.model.project import Project
 from pybossa.util import pretty_date
 from pybossa.cache import memoize, cache, delete_memoized, delete_cached
+from pybossa.project_versions import ProjectVersions
 
 
 session = db.slave_session
@@ -499,3 +500,4 @@ def clean_project(project_id):
     delete_last_activity(project_id)
     delete_n_task_runs(project_id)
     delete_overall_progress(project_id)
+    ProjectVersions(sentinel.master).bump(project_id)
@@ -0,0 +1,68 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""Cache module for tasks.
+
+The contribute cycle loads the same task several times, so the immutable
+columns of a task are cached in Redis for a short time, and for the length of
+the request.
+"""
+from collections import namedtuple
+from sqlalchemy.sql import text
+from pybossa.core import db, timeouts
+from pybossa.cache import memoize, delete_memoized
+from pybossa.cache import request_cache, delete_request_cached
+
+
+session = db.slave_session
+
+TaskPayload = namedtuple('TaskPayload', ['id', 'project_id', 'info',
+                                         'n_answers'])
+
+
+@request_cache
+@memoize(timeout=timeouts.get('TASK_TIMEOUT'), cache_none=False)
+def get_task(task_id):
+    """Return the id, project_id, info and n_answers of a task or None.
+
+    A task missing in the slave, which can lag behind, is looked for in the
+    master, and a missing task is not cached.
+    """
+    task = _query_task(session, task_id)
+    if task is None and session is not db.session:
+        task = _query_task(db.session, task_id)
+    return task
+
+
+def _query_task(session, task_id):
+    sql = text('''SELECT id, project_id, info, n_answers FROM task
+               WHERE id=:task_id;''')
+    results = session.execute(sql, dict(task_id=task_id))
+    for row in results:
+        return TaskPayload(row.id, row.project_id, row.info, row.n_answers)
+    return None
+
+
+def delete_task(task_id):
+    """Delete from cache a task."""
+    delete_memoized(get_task, task_id)
+    delete_request_cached(get_task, task_id)
+
+
+def reset():
+    """Delete from cache all the tasks."""
+    delete_memoized(get_task)
@@ -288,6 +288,31 @@ def get_users_page(page, per_page=24):
     return accounts
 
 
+# Attributes of the user of an API key which are cached, the ones read by
+# the authorization
+API_KEY_USER_ATTRIBUTES = ('id', 'name', 'admin', 'pro')
+
+
+@memoize(timeout=timeouts.get('API_KEY_TIMEOUT'), cache_none=False)
+def get_user_by_api_key(api_key):
+    """Return a dict with the id and the attributes read by the
+    authorization of the user of an API key, or None.
+
+    It is looked up in the master, as the slave can lag behind a key just
+    created or revoked, and unknown keys are not cached.
+    """
+    columns = [getattr(User, attr) for attr in API_KEY_USER_ATTRIBUTES]
+    user = db.session.query(*columns).filter(User.api_key == api_key).first()
+    if user is None:
+        return None
+    return dict(zip(API_KEY_USER_ATTRIBUTES, user))
+
+
 def delete_user_summary(name):
     """Delete from cache the user summary."""
     delete_memoized(get_user_summary, name)
+
+
+def delete_user_by_api_key(api_key):
+    """Delete from cache the user of an API key."""
+    delete_memoized(get_user_by_api_key, api_key)
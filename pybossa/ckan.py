@@ -18,6 +18,10 @@
 """CKAN module for PYBOSSA."""
 import requests
 import json
+import time
+from itertools import islice
+from multiprocessing.pool import ThreadPool
+from requests.adapters import HTTPAdapter
 from pybossa.model.task import Task
 from pybossa.model.task_run import TaskRun
 
@@ -26,6 +30,9 @@ class Ckan(object):
 
     """Class for CKAN service."""
 
+    # Seconds to wait for CKAN to answer a chunk of records
+    upsert_timeout = 60
+
     def _field_setup(self, obj):
         int_fields = ['id', 'project_id', 'task_id', 'user_id',
                       'n_answers', 'timeout', 'calibration', 'quorum']
@@ -209,6 +216,64 @@ class Ckan(object):
                                 r.status_code)
         return True
 
+    def datastore_upsert_chunks(self, name, chunks, resource_id=None,
+                                workers=4, retries=3, backoff=1,
+                                callback=None):
+        """Upsert chunks (lists) of records, up to workers at a time over a
+        pooled session. A failed chunk is retried with exponential backoff,
+        as upserting it again is harmless.
+
+        callback is called with every chunk once it and all the previous
+        ones are upserted, and only workers chunks are held in memory.
+        """
+        if resource_id is None:
+            resource_id = self.get_resource_id(name)
+        chunks = iter(chunks)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        pool = ThreadPool(workers)
+        try:
+            window = list(islice(chunks, workers))
+            while window:
+                pool.map(lambda records: self._upsert_chunk(
+                    session, resource_id, records, retries, backoff), window)
+                if callback is not None:
+                    for records in window:
+                        callback(records)
+                window = list(islice(chunks, workers))
+        finally:
+            pool.close()
+            pool.join()
+            session.close()
+        return True
+
+    def _upsert_chunk(self, session, resource_id, records, retries, backoff):
+        payload = json.dumps({'resource_id': resource_id,
+                              'records': records,
+                              'method': 'upsert',
+                              'force': True})
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(backoff * 2 ** (attempt - 1))
+            try:
+                r = session.post(self.url + "/action/datastore_upsert",
+                                 headers=self.headers, data=payload,
+                                 timeout=self.upsert_timeout)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                error = e
+                continue
+            if r.status_code == 200:
+                return True
+            msg = "CKAN: the remote site failed! datastore_upsert failed"
+            error = Exception(msg, r.text, r.status_code)
+            # Only the errors of the server are worth retrying
+            if r.status_code < 500:
+                break
+        raise error
+
     def datastore_delete(self, name, resource_id=None):
         """Delete datastore."""
         payload = {'resource_id': resource_id, 'force': True}
@@ -20,7 +20,7 @@ import os
 import logging
 import humanize
 from flask import Flask, url_for, request, render_template, \
-    flash, _app_ctx_stack
+    flash, session, _app_ctx_stack
 from flask.ext.login import current_user
 from flask.ext.babel import gettext
 from flask.ext.assets import Bundle
@@ -47,6 +47,7 @@ def create_app(run_as_server=True):
     setup_error_email(app)
     setup_logging(app)
     setup_login_manager(app)
+    setup_sessions(app)
     setup_babel(app)
     setup_markdown(app)
     setup_db(app)
@@ -140,10 +141,13 @@ def setup_exporter(app):
     """Setup exporter."""
     global csv_exporter
     global json_exporter
+    global parquet_exporter
     from pybossa.exporter.csv_export import CsvExporter
     from pybossa.exporter.json_export import JsonExporter
+    from pybossa.exporter.parquet_export import ParquetExporter
     csv_exporter = CsvExporter()
     json_exporter = JsonExporter()
+    parquet_exporter = ParquetExporter()
 
 
 def setup_markdown(app):
@@ -242,6 +246,12 @@ def setup_login_manager(app):
     login_manager.setup_app(app)
 
 
+def setup_sessions(app):
+    """Setup the session interface, with the API fast path."""
+    from pybossa.api.fast_path import FastPathSessionInterface
+    app.session_interface = FastPathSessionInterface()
+
+
 def setup_babel(app):
     """Return babel handler."""
     babel.init_app(app)
@@ -303,6 +313,7 @@ def setup_external_services(app):
     setup_twitter_login(app)
     setup_facebook_login(app)
     setup_google_login(app)
+    setup_csv_importer(app)
     setup_flickr_importer(app)
     setup_dropbox_importer(app)
     setup_twitter_importer(app)
@@ -357,6 +368,14 @@ def setup_google_login(app):
         app.logger.info(log_message)
 
 
+def setup_csv_importer(app):
+    importer_params = {
+        'max_rows': app.config.get('CSV_IMPORT_MAX_ROWS'),
+        'max_bytes': app.config.get('CSV_IMPORT_MAX_BYTES')
+    }
+    importer.register_csv_importer(importer_params)
+
+
 def setup_flickr_importer(app):
     try:  # pragma: no cover
         if (app.config['FLICKR_API_KEY']
@@ -497,9 +516,24 @@ def setup_hooks(app):
         if 'Authorization' in request.headers:
             apikey = request.headers.get('Authorization')
         if apikey:
-            user = user_repo.get_by(api_key=apikey)
-            if user:
+            from sqlalchemy.orm import make_transient_to_detached
+            from pybossa.cache.users import get_user_by_api_key
+            from pybossa.model.user import User
+            attrs = get_user_by_api_key(apikey)
+            if attrs:
+                # Attach the cached attributes without a query, the rest of
+                # them are loaded when read
+                user = User(**attrs)
+                make_transient_to_detached(user)
+                user = db.session.merge(user, load=False)
                 _request_ctx_stack.top.user = user
+        from pybossa.api.fast_path import FastPathSession
+        if isinstance(session, FastPathSession):
+            if getattr(_request_ctx_stack.top, 'user', None) is None:
+                _request_ctx_stack.top.user = login_manager.anonymous_user()
+        # The API reads the request data itself
+        if request.blueprint == 'api':
+            return
         # Handle forms
         request.body = request.form
         if (request.method == 'POST' and
@@ -606,6 +640,8 @@ def setup_ratelimits(app):
     global ratelimits
     ratelimits['LIMIT'] = app.config['LIMIT']
     ratelimits['PER'] = app.config['PER']
+    ratelimits['ENDPOINTS'] = app.config.get('RATE_LIMIT_ENDPOINTS', {})
+    ratelimits['LEASE'] = app.config.get('RATE_LIMIT_LEASE', 1)
 
 
 def setup_cache_timeouts(app):
@@ -628,6 +664,9 @@ def setup_cache_timeouts(app):
     timeouts['USER_TIMEOUT'] = app.config['USER_TIMEOUT']
     timeouts['USER_TOP_TIMEOUT'] = app.config['USER_TOP_TIMEOUT']
     timeouts['USER_TOTAL_TIMEOUT'] = app.config['USER_TOTAL_TIMEOUT']
+    timeouts['API_KEY_TIMEOUT'] = app.config['API_KEY_TIMEOUT']
+    # Tasks
+    timeouts['TASK_TIMEOUT'] = app.config['TASK_TIMEOUT']
 
 
 def setup_scheduled_jobs(app):  # pragma: no cover
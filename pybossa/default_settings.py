@@ -50,6 +50,21 @@ APPS_PER_PAGE = 20
 ALLOWED_EXTENSIONS = ['js', 'css', 'png', 'jpg', 'jpeg', 'gif', 'zip']
 UPLOAD_METHOD = 'local'
 
+## Export the ZIPs of the projects with more rows than this in shards of this
+## many rows, in parallel background jobs (only for the local uploader)
+EXPORT_SHARD_SIZE = 500000
+
+## CKAN exports upsert this many rows per request, with up to CKAN_WORKERS
+## requests at a time, retrying every failed request CKAN_RETRIES times
+CKAN_CHUNK_SIZE = 500
+CKAN_WORKERS = 4
+CKAN_RETRIES = 3
+
+## The CSV and Google Drive importers reject the files with more rows or
+## bytes than these. None means no limit
+CSV_IMPORT_MAX_ROWS = None
+CSV_IMPORT_MAX_BYTES = None
+
 ## Default number of users shown in the leaderboard
 LEADERBOARD = 20
 
@@ -81,6 +96,14 @@ CATEGORY_TIMEOUT = 24 * 60 * 60
 USER_TIMEOUT = 15 * 60
 USER_TOP_TIMEOUT = 24 * 60 * 60
 USER_TOTAL_TIMEOUT = 24 * 60 * 60
+API_KEY_TIMEOUT = 60
+# Task cache
+TASK_TIMEOUT = 60
+
+# Full text search: text search configuration (language) and weights of the
+# project columns. Run "python cli.py update_search" after changing them.
+FULLTEXTSEARCH_LANGUAGE = 'english'
+FULLTEXTSEARCH_WEIGHTS = {'name': 'A', 'description': 'B'}
 
 # Project Presenters
 PRESENTERS = ["basic", "image", "sound", "video", "map", "pdf"]
@@ -105,6 +128,14 @@ ACCOUNT_LINK_EXPIRATION = 5 * 60 * 60
 # Rate limits default values
 LIMIT = 300
 PER = 15 * 60
+# Limit and per values for specific endpoints, e.g.
+# {'api.api_task': {'limit': 1000, 'per': 15 * 60}}
+RATE_LIMIT_ENDPOINTS = {}
+# Tokens taken at once for clients under half their limit (1 disables it)
+RATE_LIMIT_LEASE = 1
+
+# Skip the browser session for token authenticated and anonymous API requests
+API_FAST_PATH = True
 
 # Disable new account confirmation (via email)
 ACCOUNT_CONFIRMATION_DISABLED = True
@@ -115,6 +146,28 @@ WEEKLY_UPDATE_STATS = 'Sunday'
 # Enable Server Sent Events
 SSE = False
 
+# SSE gateways (see sse_gateway.py). When set, the project streams redirect to
+# them instead of holding a web worker per client. Streams are sharded by
+# channel across the list.
+SSE_GATEWAY_URLS = []
+SSE_GATEWAY_MAX_CONNECTIONS = 5000
+SSE_GATEWAY_MAX_CONNECTIONS_PER_IP = 20
+SSE_GATEWAY_CLIENT_QUEUE = 100
+SSE_GATEWAY_HEARTBEAT = 15
+SSE_GATEWAY_TOKEN_TIMEOUT = 60
+
+# Read replicas (see pybossa/read_replicas.py). The reads of the GET requests
+# go to one of these SQLALCHEMY_BINDS, unless it is the master, is more than
+# READ_REPLICA_MAX_LAG seconds behind it or the client wrote less than
+# READ_REPLICA_STICKY seconds ago.
+READ_REPLICA_BINDS = ['slave']
+READ_REPLICA_MAX_LAG = 10
+READ_REPLICA_LAG_CHECK = 5
+READ_REPLICA_STICKY = 30
+
+# Bind the stats and export jobs read from, if it is in SQLALCHEMY_BINDS
+ANALYTICS_BIND = 'analytics'
+
 # Pro user features. False will make the feature available to all regular users,
 # while True will make it available only to pro users
 PRO_FEATURES = {
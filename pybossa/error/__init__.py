@@ -34,6 +34,7 @@ class ErrorStatus(object):
     Class for formatting error status in JSON format.
 
     This class has the following methods:
+        * format_error: returns a dict with the error.
         * format_exception: returns a Flask Response with the error.
 
     """
@@ -50,11 +51,11 @@ class ErrorStatus(object):
                     "DBIntegrityError": 415,
                     "TooManyRequests": 429}
 
-    def format_exception(self, e, target, action):
+    def format_error(self, e, target, action):
         """
-        Format the exception to a valid JSON object.
+        Format the exception to a dict.
 
-        Returns a Flask Response with the error.
+        Returns the dict that format_exception sends as JSON.
 
         """
         exception_cls = e.__class__.__name__
@@ -64,11 +65,20 @@ class ErrorStatus(object):
             status = 500
         if exception_cls in ('BadRequest', 'Forbidden','Unauthorized'):
             e.message = e.description
-        error = dict(action=action.upper(),
-                     status="failed",
-                     status_code=status,
-                     target=target,
-                     exception_cls=exception_cls,
-                     exception_msg=str(e.message))
-        return Response(json.dumps(error), status=status,
+        return dict(action=action.upper(),
+                    status="failed",
+                    status_code=status,
+                    target=target,
+                    exception_cls=exception_cls,
+                    exception_msg=str(e.message))
+
+    def format_exception(self, e, target, action):
+        """
+        Format the exception to a valid JSON object.
+
+        Returns a Flask Response with the error.
+
+        """
+        error = self.format_error(e, target, action)
+        return Response(json.dumps(error), status=error['status_code'],
                         mimetype='application/json')
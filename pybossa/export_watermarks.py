@@ -0,0 +1,177 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Export watermarks for PYBOSSA.
+
+A Redis hash is stored for every exported project with:
+    * mark: the last task id, task run id and project.updated of the last
+      export, so the export jobs skip the projects that have not changed
+    * one checkpoint per exported file, so append only exports only add the
+      rows past the last exported one
+    * the shard plan of the files being exported in shards, with the result
+      of every shard that is done, so failed shards can be resumed, and the
+      job of every shard enqueued, so it is not enqueued again while pending
+    * the last row synced to every CKAN resource, so the next sync only
+      sends the rows added since then, and the progress of the syncs
+
+Losing them is safe, as the next export will be a full one.
+
+"""
+import json
+
+
+class ExportWatermarks(object):
+
+    KEY_PREFIX = 'pybossa:export:project:%s'
+    MARK = 'mark'
+    SHARDS = 'shards:%s'
+    SHARD = 'shard:%s:%s'
+    SHARD_JOB = 'shard_job:%s:%s'
+    SHARDS_DONE = 'shards_done:%s'
+    CKAN = 'ckan:%s'
+    CKAN_PROGRESS = 'ckan_progress:%s'
+
+    def __init__(self, redis_conn):
+        self.conn = redis_conn
+
+    def get_mark(self, project_id):
+        """Return the mark of the last export of a project or None."""
+        return self.conn.hget(self._create_key(project_id), self.MARK)
+
+    def set_mark(self, project_id, mark):
+        """Store the mark of the last export of a project."""
+        self.conn.hset(self._create_key(project_id), self.MARK, mark)
+
+    def get_checkpoint(self, project_id, filename):
+        """Return the checkpoint of an exported file or None."""
+        checkpoint = self.conn.hget(self._create_key(project_id), filename)
+        if checkpoint is None:
+            return None
+        return json.loads(checkpoint)
+
+    def set_checkpoint(self, project_id, filename, checkpoint):
+        """Store the checkpoint of an exported file, or delete it if None."""
+        key = self._create_key(project_id)
+        if checkpoint is None:
+            self.conn.hdel(key, filename)
+        else:
+            self.conn.hset(key, filename, json.dumps(checkpoint))
+
+    def get_shards(self, project_id, filename):
+        """Return the shard plan of a file being exported or None."""
+        plan = self.conn.hget(self._create_key(project_id),
+                              self.SHARDS % filename)
+        if plan is None:
+            return None
+        return json.loads(plan)
+
+    def set_shards(self, project_id, filename, plan):
+        """Store the shard plan of a file, or delete it if None, forgetting
+        the shards done for a previous one."""
+        key = self._create_key(project_id)
+        prefixes = (self.SHARD % (filename, ''),
+                    self.SHARD_JOB % (filename, ''))
+        fields = [field for field in self.conn.hkeys(key)
+                  if field.startswith(prefixes)]
+        fields.append(self.SHARDS_DONE % filename)
+        pipe = self.conn.pipeline()
+        pipe.hdel(key, *fields)
+        if plan is None:
+            pipe.hdel(key, self.SHARDS % filename)
+        else:
+            pipe.hset(key, self.SHARDS % filename, json.dumps(plan))
+        pipe.execute()
+
+    def shard_done(self, project_id, filename, index, result):
+        """Store the result of a shard, returning how many are done, or None
+        if it was already done."""
+        key = self._create_key(project_id)
+        if self.conn.hsetnx(key, self.SHARD % (filename, index),
+                            json.dumps(result)):
+            return self.conn.hincrby(key, self.SHARDS_DONE % filename, 1)
+        return None
+
+    def get_shard_results(self, project_id, filename, n_shards):
+        """Return the result of every shard of a file, None if not done."""
+        fields = [self.SHARD % (filename, index) for index in range(n_shards)]
+        results = self.conn.hmget(self._create_key(project_id), fields)
+        return [json.loads(result) if result is not None else None
+                for result in results]
+
+    def get_shard_jobs(self, project_id, filename, n_shards):
+        """Return the id of the last job enqueued for every shard of a file,
+        None if none was."""
+        fields = [self.SHARD_JOB % (filename, index)
+                  for index in range(n_shards)]
+        return self.conn.hmget(self._create_key(project_id), fields)
+
+    def set_shard_job(self, project_id, filename, index, job_id):
+        """Store the id of the job enqueued for a shard of a file."""
+        self.conn.hset(self._create_key(project_id),
+                       self.SHARD_JOB % (filename, index), job_id)
+
+    def get_progress(self, project_id):
+        """Return a dict with the shards done and the total shards of every
+        file of a project being exported in shards."""
+        values = self.conn.hgetall(self._create_key(project_id))
+        progress = {}
+        for field, value in values.items():
+            if field.startswith(self.SHARDS % ''):
+                filename = field[len(self.SHARDS % ''):]
+                total = len(json.loads(value)['boundaries']) - 1
+                done = int(values.get(self.SHARDS_DONE % filename, 0))
+                progress[filename] = dict(done=done, total=total)
+        return progress
+
+    def get_ckan_sync(self, project_id, resource_id):
+        """Return the id of the last row synced to a CKAN resource or None."""
+        last_id = self.conn.hget(self._create_key(project_id),
+                                 self.CKAN % resource_id)
+        if last_id is None:
+            return None
+        return int(last_id)
+
+    def set_ckan_sync(self, project_id, resource_id, last_id):
+        """Store the last row synced to a CKAN resource, or forget the syncs
+        of the resource if None."""
+        key = self._create_key(project_id)
+        if last_id is None:
+            self.conn.hdel(key, self.CKAN % resource_id)
+        else:
+            self.conn.hset(key, self.CKAN % resource_id, last_id)
+
+    def set_ckan_progress(self, project_id, ty, done, total):
+        """Store the chunks done and the total chunks of a CKAN sync."""
+        self.conn.hset(self._create_key(project_id), self.CKAN_PROGRESS % ty,
+                       json.dumps(dict(done=done, total=total)))
+
+    def get_ckan_progress(self, project_id):
+        """Return a dict with the chunks done and the total chunks of the
+        last CKAN sync of every type of a project."""
+        values = self.conn.hgetall(self._create_key(project_id))
+        prefix = self.CKAN_PROGRESS % ''
+        return dict((field[len(prefix):], json.loads(value))
+                    for field, value in values.items()
+                    if field.startswith(prefix))
+
+    def reset(self, project_id):
+        """Forget the exports of a project, so the next one is a full one."""
+        self.conn.delete(self._create_key(project_id))
+
+    def _create_key(self, project_id):
+        return self.KEY_PREFIX % project_id
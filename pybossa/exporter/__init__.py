@@ -20,39 +20,289 @@
 Exporter module for exporting tasks and tasks results out of PYBOSSA
 """
 
+import json
 import os
 import zipfile
-from pybossa.core import uploader
+from pybossa.core import uploader, sentinel, task_repo, result_repo
+from pybossa.export_watermarks import ExportWatermarks
+from pybossa.exporter.zipstream import ZipStream
+from pybossa.model.result import Result
+from pybossa.model.task import Task
+from pybossa.model.task_run import TaskRun
 from pybossa.uploader import local
+from rq import get_current_job
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
 from unidecode import unidecode
-from flask import url_for, safe_join, send_file, redirect
+from flask import (current_app, url_for, safe_join, send_file, redirect,
+                   Response, stream_with_context)
 from werkzeug.utils import secure_filename
 
 class Exporter(object):
 
     """Abstract generic exporter class."""
 
+    # Types whose rows never change once exported, so their ZIPs are only
+    # extended with the new ones
+    append_only = ('task_run',)
+    chunk_size = 64 * 1024
+    models = dict(task=Task, task_run=TaskRun, result=Result)
+    # Keys of the rows of a type holding other objects, which the flat
+    # formats write as JSON
+    embedded = dict(result=('task', 'task_runs'))
+    # Name of the exporter in pybossa.core, used by the shard jobs
+    export_format = None
+
     def _project_name_latin_encoded(self, project):
         """project short name for later HTML header usage"""
         # name = project.short_name.encode('utf-8', 'ignore').decode('latin-1')
         name = unidecode(project.short_name)
         return name
 
-    def _zip_factory(self, filename):
-        """create a ZipFile Object with compression and allow big ZIP files (allowZip64)"""
-        try:
-            import zlib
-            assert zlib
-            zip_compression= zipfile.ZIP_DEFLATED
-        except Exception as ex:
-            zip_compression= zipfile.ZIP_STORED
-        _zip = zipfile.ZipFile(file=filename, mode='w', compression=zip_compression, allowZip64=True)
-        return _zip
+    def _rows(self, ty, id, cursor, chunk_size=None):
+        """Yield the rows of a certain type of a project as dicts, by id,
+        from cursor['last_id'] and before cursor['until_id']. The results
+        come with their task and task runs."""
+        if ty == 'result':
+            return result_repo.filter_results_with_answers(
+                id, last_id=cursor.get('last_id'),
+                until_id=cursor.get('until_id'),
+                chunk_size=chunk_size or 1000)
+        return getattr(task_repo, 'filter_%ss_by' % ty)(
+            project_id=id, last_id=cursor.get('last_id'),
+            until_id=cursor.get('until_id'), yielded=True, dictized=True,
+            chunk_size=chunk_size)
 
-    def _make_zip(self, project, ty):
-        """Generate a ZIP of a certain type and upload it"""
+    def _first(self, ty, id):
+        """Get the first object of a certain type of a project or None"""
+        if ty == 'result':
+            return result_repo.get_by(project_id=id)
+        return getattr(task_repo, 'get_%s_by' % ty)(project_id=id)
+
+    def _zip_member(self, project, ty, cursor, resume=False):
+        """Get the (filename, chunks, tail) of a ZIP of a certain type.
+        The chunks hold the rows past cursor['last_id'] and before
+        cursor['until_id'], moving the first forward, and they are meant to
+        be appended to a previous export if resume"""
         pass
 
+    def _zip_chunks(self, project, ty):
+        """Generate a ZIP of a certain type, yielding it in chunks"""
+        return ZipStream().stream([self._zip_member(project, ty, {})])
+
+    def _make_zip(self, project, ty):
+        """Generate a ZIP of a certain type and upload it.
+        Append only types only compress the rows added since the last export,
+        copying the head of the previous ZIP when possible."""
+        filename = self.download_name(project, ty)
+        container = self._container(project)
+        watermarks = ExportWatermarks(sentinel.master)
+        checkpoint = watermarks.get_checkpoint(project.id, filename)
+        plan = watermarks.get_shards(project.id, filename)
+        if plan is None:
+            plan = self._plan_shards(project, ty, checkpoint)
+            if plan is not None and plan['boundaries']:
+                watermarks.set_shards(project.id, filename, plan)
+        if plan is not None:
+            if plan['boundaries']:
+                return self._export_shards(project, ty, plan)
+            return True
+        zipstream = ZipStream()
+        cursor = {}
+        if self._can_resume(project, ty, checkpoint):
+            cursor['last_id'] = checkpoint.pop('last_id')
+            chunks = self._resumed_chunks(zipstream, project, ty, checkpoint,
+                                          cursor)
+        else:
+            chunks = zipstream.stream([self._zip_member(project, ty, cursor)])
+        if not uploader.upload_chunks(chunks, filename, container):
+            watermarks.set_checkpoint(project.id, filename, None)
+            return False
+        checkpoint = None
+        if ty in self.append_only and cursor.get('last_id'):
+            checkpoint = dict(zipstream.checkpoint, last_id=cursor['last_id'])
+        watermarks.set_checkpoint(project.id, filename, checkpoint)
+        return True
+
+    def _can_resume(self, project, ty, checkpoint):
+        return (checkpoint is not None and 'offset' in checkpoint and
+                ty in self.append_only and
+                isinstance(uploader, local.LocalUploader) and
+                self.zip_existing(project, ty))
+
+    def _plan_shards(self, project, ty, checkpoint):
+        """Get the shard plan of a ZIP of a certain type, or None if it is
+        small enough to be generated at once. An archive of shards of an
+        append only type is the base of the next plan, which only has the
+        rows added since then (and no shards at all if there are none)."""
+        size = current_app.config.get('EXPORT_SHARD_SIZE')
+        if not size or not isinstance(uploader, local.LocalUploader):
+            return None
+        base = (checkpoint is not None and 'parts' in checkpoint and
+                ty in self.append_only and self.zip_existing(project, ty))
+        last_id = checkpoint['last_id'] if base else None
+        boundaries = task_repo.get_shard_boundaries(self.models[ty],
+                                                    project.id, size, last_id)
+        if not base and len(boundaries) <= 2:
+            return None
+        return dict(boundaries=boundaries, base=base,
+                    first_part=checkpoint['parts'] if base else 0)
+
+    def _shard_name(self, filename, index):
+        return '%s_part%04d.zip' % (os.path.splitext(filename)[0], index)
+
+    def _export_shards(self, project, ty, plan):
+        """Enqueue a job for every shard of a ZIP of a certain type which is
+        not done yet, in the queue of the current job. The shards whose job
+        is still queued or running are skipped, so they are not exported
+        twice at the same time. If every shard is done and none of their
+        jobs is pending, the stitch of the last one failed, so it is done
+        again here."""
+        from pybossa.jobs import enqueue_job, export_shard, MINUTE
+        filename = self.download_name(project, ty)
+        watermarks = ExportWatermarks(sentinel.master)
+        n_shards = len(plan['boundaries']) - 1
+        results = watermarks.get_shard_results(project.id, filename, n_shards)
+        job_ids = watermarks.get_shard_jobs(project.id, filename, n_shards)
+        job = get_current_job()
+        queue = job.origin if job is not None else 'low'
+        pending = False
+        for index, result in enumerate(results):
+            if self._shard_pending(job_ids[index]):
+                pending = True
+                continue
+            if result is not None:
+                continue
+            job = enqueue_job(dict(name=export_shard,
+                                   args=[self.export_format, project.id, ty,
+                                         index],
+                                   kwargs={},
+                                   timeout=(10 * MINUTE),
+                                   queue=queue))
+            watermarks.set_shard_job(project.id, filename, index, job.id)
+            pending = True
+        if pending:
+            return True
+        container = self._container(project)
+        if not all(uploader.file_exists(self._shard_name(filename, index),
+                                        container)
+                   for index in range(n_shards)):
+            # A shard is lost, so the next export plans them again
+            watermarks.set_shards(project.id, filename, None)
+            return False
+        return self._stitch_shards(project, ty, plan)
+
+    def _shard_pending(self, job_id):
+        """Return True if the job of a shard is queued or running."""
+        if job_id is None:
+            return False
+        try:
+            job = Job.fetch(job_id, connection=sentinel.master)
+        except NoSuchJobError:
+            return False
+        return job.is_queued or job.is_started
+
+    def export_shard(self, project, ty, index):
+        """Generate a shard of a ZIP of a certain type and upload it. The
+        last shard to be done stitches all of them into the ZIP."""
+        filename = self.download_name(project, ty)
+        watermarks = ExportWatermarks(sentinel.master)
+        plan = watermarks.get_shards(project.id, filename)
+        if plan is None:
+            return False
+        boundaries = plan['boundaries']
+        cursor = dict(last_id=boundaries[index] - 1,
+                      until_id=boundaries[index + 1])
+        chunks = ZipStream().stream([self._zip_member(project, ty, cursor)])
+        if not uploader.upload_chunks(chunks,
+                                      self._shard_name(filename, index),
+                                      self._container(project)):
+            raise IOError('Shard %d of %s could not be uploaded'
+                          % (index, filename))
+        result = dict(first_id=boundaries[index],
+                      until_id=boundaries[index + 1],
+                      last_id=cursor['last_id'])
+        done = watermarks.shard_done(project.id, filename, index, result)
+        if done == len(boundaries) - 1:
+            return self._stitch_shards(project, ty, plan)
+        return True
+
+    def _stitch_shards(self, project, ty, plan):
+        """Stitch the shards of a ZIP of a certain type into a single ZIP,
+        with a member per shard and a manifest of them, and upload it."""
+        filename = self.download_name(project, ty)
+        container = self._container(project)
+        watermarks = ExportWatermarks(sentinel.master)
+        n_shards = len(plan['boundaries']) - 1
+        results = watermarks.get_shard_results(project.id, filename, n_shards)
+        parts = []
+        chunks = self._stitched_chunks(project, ty, plan, results, parts)
+        if not uploader.upload_chunks(chunks, filename, container):
+            watermarks.set_checkpoint(project.id, filename, None)
+            return False
+        checkpoint = None
+        if ty in self.append_only:
+            checkpoint = dict(parts=len(parts), last_id=parts[-1]['last_id'])
+        watermarks.set_checkpoint(project.id, filename, checkpoint)
+        watermarks.set_shards(project.id, filename, None)
+        for index in range(n_shards):
+            uploader.delete_file(self._shard_name(filename, index), container)
+        return True
+
+    def _stitched_chunks(self, project, ty, plan, results, parts):
+        path = self._download_path(project)
+        filename = self.download_name(project, ty)
+        zipstream = ZipStream()
+        if plan['base']:
+            with open(safe_join(path, filename), 'rb') as archive:
+                names = zipfile.ZipFile(archive).namelist()
+                manifest = json.loads(zipfile.ZipFile(archive)
+                                      .read('manifest.json'))
+                parts.extend(manifest['parts'])
+                for name in names:
+                    if name == 'manifest.json':
+                        continue
+                    for data in zipstream.copy(archive, name, name):
+                        yield data
+        for index, result in enumerate(results):
+            shard = safe_join(path, self._shard_name(filename, index))
+            with open(shard, 'rb') as archive:
+                name = zipfile.ZipFile(archive).namelist()[0]
+                root, ext = os.path.splitext(name)
+                arcname = '%s_%04d%s' % (root, plan['first_part'] + index,
+                                         ext)
+                for data in zipstream.copy(archive, name, arcname):
+                    yield data
+            parts.append(dict(result, name=arcname))
+        manifest = dict(project_id=project.id, type=ty,
+                        format=self.export_format, parts=parts)
+        for data in zipstream.stream([('manifest.json',
+                                       [json.dumps(manifest)])]):
+            yield data
+
+    def _resumed_chunks(self, zipstream, project, ty, checkpoint, cursor):
+        path = safe_join(self._download_path(project),
+                         self.download_name(project, ty))
+        with open(path, 'rb') as archive:
+            head = checkpoint['offset']
+            while head > 0:
+                data = archive.read(min(head, self.chunk_size))
+                if not data:
+                    raise IOError('%s is shorter than its checkpoint' % path)
+                head -= len(data)
+                yield data
+        _, chunks, tail = self._zip_member(project, ty, cursor, resume=True)
+        for data in zipstream.resume(checkpoint, chunks, tail):
+            yield data
+
+    def _stream_zip(self, project, ty):
+        """Generate a ZIP of a certain type straight into the response"""
+        filename = self.download_name(project, ty)
+        chunks = stream_with_context(self._zip_chunks(project, ty))
+        res = Response(chunks, mimetype='application/octet-stream')
+        res.headers['Content-Disposition'] = 'attachment; filename=%s' % filename
+        return res
+
     def _container(self, project):
         return "user_%d" % project.owner_id
 
@@ -82,11 +332,11 @@ class Exporter(object):
 
     def get_zip(self, project, ty):
         """Get a ZIP file directly from uploaded directory
-        or generate one on the fly and upload it if not existing."""
+        or generate one on the fly and stream it if not existing."""
         filename = self.download_name(project, ty)
         if not self.zip_existing(project, ty):
             print "Warning: Generating %s on the fly now!" % filename
-            self._make_zip(project, ty)
+            return self._stream_zip(project, ty)
         if isinstance(uploader, local.LocalUploader):
             filepath = self._download_path(project)
             res = send_file(filename_or_fp=safe_join(filepath, filename),
@@ -106,5 +356,7 @@ class Exporter(object):
         return self.get_zip(project, ty)
 
     def pregenerate_zip_files(self, project):
-        """Cache and generate all types (tasks and task_run) of ZIP files"""
+        """Cache and generate all types (tasks and task_run) of ZIP files.
+        Results can be updated at any time, so their ZIPs are never cached
+        but generated on the fly."""
         pass
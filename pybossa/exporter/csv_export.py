@@ -20,18 +20,19 @@
 CSV Exporter module for exporting tasks and tasks results out of PYBOSSA
 """
 
-import tempfile
+import json
+from cStringIO import StringIO
 from pybossa.exporter import Exporter
-from pybossa.core import uploader, task_repo
 from pybossa.model.task import Task
 from pybossa.model.task_run import TaskRun
 from pybossa.util import UnicodeWriter
-from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
 
 class CsvExporter(Exporter):
 
+    export_format = 'csv'
+
     def _format_csv_row(self, row, ty):
         tmp = row.keys()
         task_keys = []
@@ -67,17 +68,21 @@ class CsvExporter(Exporter):
 
     def _handle_row(self, writer, t, ty):
         normal_ty = filter(lambda char: char.isalpha(), ty)
-        writer.writerow(self._format_csv_row(t.dictize(), ty=normal_ty))
+        for key in self.embedded.get(ty, ()):
+            t[key] = json.dumps(t[key])
+        writer.writerow(self._format_csv_row(t, ty=normal_ty))
 
-    def _get_csv(self, out, writer, table, id):
-        for tr in getattr(task_repo, 'filter_%ss_by' % table)(project_id=id,
-                                                              yielded=True):
+    def _get_csv(self, out, writer, table, id, cursor):
+        for tr in self._rows(table, id, cursor):
             self._handle_row(writer, tr, table)
-        out.seek(0)
-        yield out.read()
+            cursor['last_id'] = tr['id']
+            if out.tell() >= self.chunk_size:
+                yield out.getvalue()
+                out.truncate(0)
+        yield out.getvalue()
 
     def _format_headers(self, t, ty):
-        tmp = t.dictize().keys()
+        tmp = t.dictize().keys() + list(self.embedded.get(ty, ()))
         task_keys = []
         for k in tmp:
             k = "%s__%s" % (ty, k)
@@ -93,45 +98,26 @@ class CsvExporter(Exporter):
         keys = task_keys + task_info_keys
         return sorted(keys)
 
-    def _respond_csv(self, ty, id):
-        out = tempfile.TemporaryFile()
+    def _respond_csv(self, ty, id, cursor=None, resume=False):
+        out = StringIO()
         writer = UnicodeWriter(out)
-        t = getattr(task_repo, 'get_%s_by' % ty)(project_id=id)
+        if resume:
+            return self._get_csv(out, writer, ty, id, cursor)
+        t = self._first(ty, id)
         if t is not None:
             headers = self._format_headers(t, ty)
             writer.writerow(headers)
 
-            return self._get_csv(out, writer, ty, id)
+            return self._get_csv(out, writer, ty, id, cursor or {})
         else:
             def empty_csv(out):
-                yield out.read()
+                yield out.getvalue()
             return empty_csv(out)
 
-    def _make_zip(self, project, ty):
+    def _zip_member(self, project, ty, cursor, resume=False):
         name = self._project_name_latin_encoded(project)
-        csv_task_generator = self._respond_csv(ty, project.id)
-        if csv_task_generator is not None:
-            # TODO: use temp file from csv generation directly
-            datafile = tempfile.NamedTemporaryFile()
-            try:
-                for line in csv_task_generator:
-                    datafile.write(str(line))
-                datafile.flush()
-                csv_task_generator.close()  # delete temp csv file
-                zipped_datafile = tempfile.NamedTemporaryFile()
-                try:
-                    _zip = self._zip_factory(zipped_datafile.name)
-                    _zip.write(
-                        datafile.name, secure_filename('%s_%s.csv' % (name, ty)))
-                    _zip.close()
-                    container = "user_%d" % project.owner_id
-                    _file = FileStorage(
-                        filename=self.download_name(project, ty), stream=zipped_datafile)
-                    uploader.upload_file(_file, container=container)
-                finally:
-                    zipped_datafile.close()
-            finally:
-                datafile.close()
+        filename = secure_filename('%s_%s.csv' % (name, ty))
+        return filename, self._respond_csv(ty, project.id, cursor, resume), ""
 
     def download_name(self, project, ty):
         return super(CsvExporter, self).download_name(project, ty, 'csv')
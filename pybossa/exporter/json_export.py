@@ -21,50 +21,33 @@ JSON Exporter module for exporting tasks and tasks results out of PYBOSSA
 """
 
 import json
-import tempfile
+from itertools import chain
 from pybossa.exporter import Exporter
-from pybossa.core import uploader, task_repo
-from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
 class JsonExporter(Exporter):
 
+    export_format = 'json'
+
+    def _gen_items(self, table, id, cursor, sep=""):
+        for tr in self._rows(table, id, cursor):
+            yield sep + json.dumps(tr)
+            sep = ", "
+            cursor['last_id'] = tr['id']
+
     def gen_json(self, table, id):
-        n = getattr(task_repo, 'count_%ss_with' % table)(project_id=id)
-        sep = ", "
         yield "["
-        for i, tr in enumerate(getattr(task_repo, 'filter_%ss_by' % table)(project_id=id, yielded=True), 1):
-            item = json.dumps(tr.dictize())
-            if (i == n):
-                sep = ""
-            yield item + sep
+        for item in self._gen_items(table, id, {}):
+            yield item
         yield "]"
 
-    def _respond_json(self, ty, id):  # TODO: Refactor _respond_json out?
-        # TODO: check ty here
-        return self.gen_json(ty, id)
-
-    def _make_zip(self, project, ty):
+    def _zip_member(self, project, ty, cursor, resume=False):
         name = self._project_name_latin_encoded(project)
-        json_task_generator = self._respond_json(ty, project.id)
-        if json_task_generator is not None:
-            datafile = tempfile.NamedTemporaryFile()
-            try:
-                for line in json_task_generator:
-                    datafile.write(str(line))
-                datafile.flush()
-                zipped_datafile = tempfile.NamedTemporaryFile()
-                try:
-                    _zip = self._zip_factory(zipped_datafile.name)
-                    _zip.write(datafile.name, secure_filename('%s_%s.json' % (name, ty)))
-                    _zip.close()
-                    container = "user_%d" % project.owner_id
-                    _file = FileStorage(filename=self.download_name(project, ty), stream=zipped_datafile)
-                    uploader.upload_file(_file, container=container)
-                finally:
-                    zipped_datafile.close()
-            finally:
-                datafile.close()
+        filename = secure_filename('%s_%s.json' % (name, ty))
+        if resume:
+            return filename, self._gen_items(ty, project.id, cursor, ", "), "]"
+        items = chain(["["], self._gen_items(ty, project.id, cursor))
+        return filename, items, "]"
 
     def download_name(self, project, ty):
         return super(JsonExporter, self).download_name(project, ty, 'json')
@@ -0,0 +1,188 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+# Cache global variables for timeouts
+"""
+Parquet Exporter module for exporting tasks and tasks results out of PYBOSSA
+
+It needs pyarrow, the format is not offered if it is not installed.
+"""
+
+import json
+from sqlalchemy import Boolean, Float, Integer
+from pybossa.exporter import Exporter
+from pybossa.core import task_repo
+from werkzeug.utils import secure_filename
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+
+class ParquetSink(object):
+
+    """Write only file that hands out the data written to it."""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.position += len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = ''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ParquetExporter(Exporter):
+
+    # A parquet file ends with its metadata, so it cannot be appended to
+    append_only = ()
+    row_group_size = 10000
+    export_format = 'parquet'
+
+    @property
+    def enabled(self):
+        return pyarrow is not None
+
+    def _column_type(self, column):
+        if isinstance(column.type, Boolean):
+            return pyarrow.bool_()
+        if isinstance(column.type, Integer):
+            return pyarrow.int64()
+        if isinstance(column.type, Float):
+            return pyarrow.float64()
+        return pyarrow.string()
+
+    def _info_type(self, types):
+        types = types - set(['null'])
+        if types == set(['number']):
+            return pyarrow.float64()
+        if types == set(['boolean']):
+            return pyarrow.bool_()
+        return pyarrow.string()
+
+    def _to_text(self, value):
+        if value is None or isinstance(value, basestring):
+            return value
+        return json.dumps(value)
+
+    def _raw_info(self, row):
+        if isinstance(row['info'], dict):
+            return None
+        return self._to_text(row['info'])
+
+    def _format_columns(self, ty, id):
+        """Return the schema of the export and a function per column that
+        gets its value out of a row. The info keys of all the rows are
+        columns of their own."""
+        model = self.models[ty]
+        fields = []
+        getters = []
+        for name in model.column_names():
+            if name == 'info':
+                # Only kept for info which is not a JSON object
+                fields.append(pyarrow.field('%s__info' % ty, pyarrow.string()))
+                getters.append(self._raw_info)
+                continue
+            _type = self._column_type(model.__table__.c[name])
+            fields.append(pyarrow.field('%s__%s' % (ty, name), _type))
+            if _type == pyarrow.string():
+                getters.append(lambda row, name=name:
+                               self._to_text(row[name]))
+            else:
+                getters.append(lambda row, name=name: row[name])
+        for name in self.embedded.get(ty, ()):
+            fields.append(pyarrow.field('%s__%s' % (ty, name),
+                                        pyarrow.string()))
+            getters.append(lambda row, name=name: self._to_text(row[name]))
+        info_types = task_repo.get_info_types(model, id)
+        for key in sorted(info_types):
+            _type = self._info_type(info_types[key])
+            fields.append(pyarrow.field('%sinfo__%s' % (ty, key), _type))
+            if _type == pyarrow.string():
+                convert = self._to_text
+            elif _type == pyarrow.float64():
+                convert = lambda value: None if value is None else float(value)
+            else:
+                convert = lambda value: value
+
+            def getter(row, key=key, convert=convert):
+                if not isinstance(row['info'], dict):
+                    return None
+                return convert(row['info'].get(key))
+            getters.append(getter)
+        return pyarrow.schema(fields), getters
+
+    def _row_group(self, schema, columns):
+        arrays = [pyarrow.array(values, type=field.type)
+                  for field, values in zip(schema, columns)]
+        return pyarrow.Table.from_arrays(arrays, schema=schema)
+
+    def gen_parquet(self, ty, id, cursor=None):
+        """Yield a parquet file of a certain type, one row group at a time"""
+        cursor = cursor if cursor is not None else {}
+        schema, getters = self._format_columns(ty, id)
+        sink = ParquetSink()
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        columns = [[] for _ in getters]
+        n_rows = 0
+        for row in self._rows(ty, id, cursor, self.row_group_size):
+            for values, getter in zip(columns, getters):
+                values.append(getter(row))
+            cursor['last_id'] = row['id']
+            n_rows += 1
+            if n_rows == self.row_group_size:
+                writer.write_table(self._row_group(schema, columns))
+                yield sink.drain()
+                columns = [[] for _ in getters]
+                n_rows = 0
+        if n_rows:
+            writer.write_table(self._row_group(schema, columns))
+        writer.close()
+        yield sink.drain()
+
+    def _zip_member(self, project, ty, cursor, resume=False):
+        name = self._project_name_latin_encoded(project)
+        filename = secure_filename('%s_%s.parquet' % (name, ty))
+        return filename, self.gen_parquet(ty, project.id, cursor), None
+
+    def download_name(self, project, ty):
+        return super(ParquetExporter, self).download_name(project, ty,
+                                                          'parquet')
+
+    def pregenerate_zip_files(self, project):
+        if not self.enabled:
+            return
+        print "%d (parquet)" % project.id
+        self._make_zip(project, "task")
+        self._make_zip(project, "task_run")
@@ -0,0 +1,223 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Streaming ZIP writer for the PYBOSSA exporters.
+
+This module exports:
+    * ZipStream class: builds a ZIP archive in a single pass
+
+zipfile.ZipFile needs a seekable file and the whole member on disk, so
+ZipStream deflates the data as it comes and yields the archive in chunks. The
+sizes and CRC of every member go in a data descriptor after its data, so
+nothing has to be written twice.
+
+"""
+import struct
+import time
+import zipfile
+import zlib
+
+DEFLATED = zipfile.ZIP_DEFLATED
+DATA_DESCRIPTOR = 0x08
+DATA_DESCRIPTOR_SIGNATURE = 'PK\x07\x08'
+ZIP64_EXTRA = 0x0001
+ZIP64_VERSION = 45
+DEFAULT_VERSION = 20
+UNIX = 3
+
+
+class ZipStream(object):
+
+    """Build a ZIP archive in a single pass, yielding it in chunks.
+
+    A member can have a tail, which is compressed apart from the rest of its
+    data. The archive is then checkpointed just before the tail, so it can be
+    resumed later on with more data without compressing it all again.
+
+    """
+
+    def __init__(self):
+        self._members = []
+        self._offset = 0
+        self.checkpoint = None
+
+    def stream(self, members):
+        """Yield an iterable of (arcname, chunks[, tail]) members, followed
+        by the central directory that closes the archive."""
+        for member in members:
+            for data in self._member(*member):
+                yield data
+        for data in self._central_directory():
+            yield data
+
+    def resume(self, checkpoint, chunks, tail):
+        """Yield the archive of a checkpoint with more data.
+
+        The archive is yielded from the checkpoint offset, so the caller has
+        to send the head of the previous archive up to it first.
+        """
+        member = dict(checkpoint)
+        member['arcname'] = member['arcname'].encode('utf-8')
+        self._offset = member.pop('offset')
+        for data in self._deflate(member, chunks, tail):
+            yield data
+        for data in self._central_directory():
+            yield data
+
+    def copy(self, fileobj, name, arcname):
+        """Yield a deflated member of another ZIP file as arcname, copying
+        its compressed data as it is."""
+        info = zipfile.ZipFile(fileobj).getinfo(name)
+        if info.compress_type != DEFLATED:
+            raise ValueError('%s is not deflated' % name)
+        fileobj.seek(info.header_offset)
+        header = struct.unpack(zipfile.structFileHeader,
+                               fileobj.read(zipfile.sizeFileHeader))
+        fileobj.seek(header[zipfile._FH_FILENAME_LENGTH] +
+                     header[zipfile._FH_EXTRA_FIELD_LENGTH], 1)
+        member = self._new_member(arcname, info.date_time)
+        member.update(crc=info.CRC, size=info.file_size,
+                      compress_size=info.compress_size)
+        yield self._local_header(member)
+        remaining = info.compress_size
+        while remaining > 0:
+            data = fileobj.read(min(remaining, 64 * 1024))
+            if not data:
+                raise IOError('%s is truncated' % name)
+            remaining -= len(data)
+            yield self._write(data)
+        yield self._write(self._descriptor(member))
+        self._members.append(member)
+
+    def _write(self, data):
+        self._offset += len(data)
+        return data
+
+    def _new_member(self, arcname, date_time):
+        if isinstance(arcname, unicode):
+            arcname = arcname.encode('utf-8')
+        dosdate = ((date_time[0] - 1980) << 9 | date_time[1] << 5 |
+                   date_time[2])
+        dostime = (date_time[3] << 11 | date_time[4] << 5 |
+                   (date_time[5] // 2))
+        return dict(arcname=arcname, dostime=dostime, dosdate=dosdate,
+                    header_offset=self._offset, crc=0, size=0,
+                    compress_size=0)
+
+    def _local_header(self, member):
+        header = struct.pack(zipfile.structFileHeader,
+                             zipfile.stringFileHeader, DEFAULT_VERSION, 0,
+                             DATA_DESCRIPTOR, DEFLATED, member['dostime'],
+                             member['dosdate'], 0, 0, 0,
+                             len(member['arcname']), 0)
+        return self._write(header + member['arcname'])
+
+    def _descriptor(self, member):
+        zip64 = (max(member['size'], member['compress_size']) >
+                 zipfile.ZIP64_LIMIT)
+        return struct.pack('<4sLQQ' if zip64 else '<4sLLL',
+                           DATA_DESCRIPTOR_SIGNATURE, member['crc'],
+                           member['compress_size'], member['size'])
+
+    def _member(self, arcname, chunks, tail=None):
+        member = self._new_member(arcname, time.localtime(time.time())[:6])
+        yield self._local_header(member)
+        for data in self._deflate(member, chunks, tail):
+            yield data
+
+    def _deflate(self, member, chunks, tail):
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION,
+                                      zlib.DEFLATED, -15)
+        for chunk in chunks:
+            data = self._compress(member, compressor, chunk)
+            if data:
+                yield self._write(data)
+        if tail is not None:
+            # A full flush leaves the stream byte aligned and without
+            # references to the previous data, so a new compressor can
+            # carry on from here.
+            data = compressor.flush(zlib.Z_FULL_FLUSH)
+            member['compress_size'] += len(data)
+            yield self._write(data)
+            self.checkpoint = dict(member, offset=self._offset,
+                                   crc=member['crc'] & 0xffffffff)
+            data = self._compress(member, compressor, tail)
+        else:
+            data = ''
+        data += compressor.flush()
+        member['compress_size'] += len(data)
+        member['crc'] = member['crc'] & 0xffffffff
+        yield self._write(data + self._descriptor(member))
+        self._members.append(member)
+
+    def _compress(self, member, compressor, chunk):
+        if isinstance(chunk, unicode):
+            chunk = chunk.encode('utf-8')
+        if not chunk:
+            return ''
+        member['crc'] = zlib.crc32(chunk, member['crc'])
+        member['size'] += len(chunk)
+        data = compressor.compress(chunk)
+        member['compress_size'] += len(data)
+        return data
+
+    def _central_directory(self):
+        start = self._offset
+        for member in self._members:
+            values = (member['size'], member['compress_size'],
+                      member['header_offset'])
+            extra = [value for value in values if value > zipfile.ZIP64_LIMIT]
+            size, compress_size, offset = [
+                0xffffffff if value > zipfile.ZIP64_LIMIT else value
+                for value in values]
+            if extra:
+                extra_data = struct.pack('<HH' + 'Q' * len(extra),
+                                         ZIP64_EXTRA, 8 * len(extra), *extra)
+                version = ZIP64_VERSION
+            else:
+                extra_data = ''
+                version = DEFAULT_VERSION
+            arcname = member['arcname']
+            record = struct.pack(zipfile.structCentralDir,
+                                 zipfile.stringCentralDir, version, UNIX,
+                                 version, 0, DATA_DESCRIPTOR, DEFLATED,
+                                 member['dostime'], member['dosdate'],
+                                 member['crc'], compress_size, size,
+                                 len(arcname), len(extra_data), 0, 0, 0,
+                                 0600 << 16, offset)
+            yield self._write(record + arcname + extra_data)
+        yield self._end_of_archive(start, self._offset - start)
+
+    def _end_of_archive(self, start, size):
+        count = len(self._members)
+        data = ''
+        if (count >= zipfile.ZIP_FILECOUNT_LIMIT or
+                start > zipfile.ZIP64_LIMIT or size > zipfile.ZIP64_LIMIT):
+            end64 = self._offset
+            data += struct.pack(zipfile.structEndArchive64,
+                                zipfile.stringEndArchive64, 44,
+                                ZIP64_VERSION, ZIP64_VERSION, 0, 0, count,
+                                count, size, start)
+            data += struct.pack(zipfile.structEndArchive64Locator,
+                                zipfile.stringEndArchive64Locator, 0, end64,
+                                1)
+            count, start, size = 0xffff, 0xffffffff, 0xffffffff
+        data += struct.pack(zipfile.structEndArchive,
+                            zipfile.stringEndArchive, 0, 0, count, count,
+                            size, start, 0)
+        return self._write(data)
@@ -46,8 +46,8 @@ from pybossa.sentinel import Sentinel
 sentinel = Sentinel()
 
 # DB
-from flask.ext.sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
+from pybossa.read_replicas import RoutingSQLAlchemy
+db = RoutingSQLAlchemy()
 db.slave_session = db.session
 
 # Repositories
@@ -102,6 +102,7 @@ uploader = None
 # Exporters
 json_exporter = None
 csv_exporter = None
+parquet_exporter = None
 
 # CSRF protection
 from flask_wtf.csrf import CsrfProtect
@@ -0,0 +1,81 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Import checkpoints for PYBOSSA.
+
+A Redis hash is stored for every project with the progress of the import
+jobs running or stopped midway, by import, with:
+    * rows: how many rows of the source have been imported
+    * created: how many tasks have been created out of them
+    * version: the version of the source, for the sources which tell it
+
+The import jobs save it after every chunk of tasks they insert, so a job
+which is run again for the same source skips the rows already imported
+instead of inserting them again if its version has not changed, and the
+tasks page shows how far it got. They expire after a day.
+
+"""
+import hashlib
+import json
+
+
+class ImportCheckpoints(object):
+
+    KEY_PREFIX = 'pybossa:import:project:%s'
+    CHECKPOINT_TTL = 60 * 60 * 24
+
+    def __init__(self, redis_conn):
+        self.conn = redis_conn
+
+    def get(self, project_id, form_data):
+        """Return the checkpoint of an import or None."""
+        checkpoint = self.conn.hget(self._create_key(project_id),
+                                    self._fingerprint(form_data))
+        if checkpoint is None:
+            return None
+        return json.loads(checkpoint)
+
+    def set(self, project_id, form_data, rows, created, version=None):
+        """Store the rows imported and the tasks created by an import, and
+        the version of its source if known."""
+        key = self._create_key(project_id)
+        checkpoint = dict(type=form_data.get('type'), rows=rows,
+                          created=created)
+        if version is not None:
+            checkpoint['version'] = version
+        pipe = self.conn.pipeline()
+        pipe.hset(key, self._fingerprint(form_data), json.dumps(checkpoint))
+        pipe.expire(key, self.CHECKPOINT_TTL)
+        pipe.execute()
+        return checkpoint
+
+    def delete(self, project_id, form_data):
+        """Forget the checkpoint of an import once it is done."""
+        self.conn.hdel(self._create_key(project_id),
+                       self._fingerprint(form_data))
+
+    def get_progress(self, project_id):
+        """Return the checkpoints of the unfinished imports of a project."""
+        values = self.conn.hvals(self._create_key(project_id))
+        return [json.loads(value) for value in values]
+
+    def _fingerprint(self, form_data):
+        return hashlib.sha1(json.dumps(form_data, sort_keys=True)).hexdigest()
+
+    def _create_key(self, project_id):
+        return self.KEY_PREFIX % project_id
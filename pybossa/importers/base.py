@@ -16,6 +16,13 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import deque
+from itertools import islice
+from multiprocessing.pool import ThreadPool
+import requests
+from requests.adapters import HTTPAdapter
+
+
 class BulkImportException(Exception):
 
     """Generic Bulk Importer Exception Error."""
@@ -35,7 +42,51 @@ class BulkTaskImport(object):
 
     def count_tasks(self):
         """Return amount of tasks to be imported."""
-        return len([task for task in self.tasks()])
+        return sum(1 for task in self.tasks())
 
     def import_metadata(self):
         return None
+
+    def source_version(self):
+        """Return a string which changes whenever the source does, once the
+        tasks are requested, or None if it cannot be told. An import stopped
+        midway only skips the rows already imported if the version of its
+        source is the same."""
+        return None
+
+
+class PageFetcher(object):
+
+    """Fetch the pages of a remote API over a pooled requests.Session.
+
+    For the APIs which tell the number of pages in the first one, map fetches
+    the rest up to workers at a time, while the previous ones are imported.
+
+    """
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url, **kwargs):
+        """Send a GET request over the pooled session."""
+        return self.session.get(url, **kwargs)
+
+    def map(self, fetch, pages):
+        """Yield fetch(page) for every page in order, fetching up to workers
+        pages ahead of the one yielded."""
+        pages = iter(pages)
+        pool = ThreadPool(self.workers)
+        try:
+            pending = deque(pool.apply_async(fetch, (page,))
+                            for page in islice(pages, self.workers))
+            while pending:
+                result = pending.popleft().get()
+                for page in islice(pages, 1):
+                    pending.append(pool.apply_async(fetch, (page,)))
+                yield result
+        finally:
+            pool.terminate()
@@ -16,8 +16,8 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 
+import codecs
 import requests
-from StringIO import StringIO
 from flask.ext.babel import gettext
 from pybossa.util import unicode_csv_reader
 
@@ -29,17 +29,30 @@ class BulkTaskCSVImport(BulkTaskImport):
     """Class to import CSV tasks in bulk."""
 
     importer_id = "csv"
+    chunk_size = 64 * 1024
+    task_fields = set(['state', 'quorum', 'calibration', 'priority_0',
+                       'n_answers'])
 
-    def __init__(self, csv_url, last_import_meta=None):
+    def __init__(self, csv_url, last_import_meta=None, max_rows=None,
+                 max_bytes=None):
         self.url = csv_url
         self.last_import_meta = last_import_meta
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
 
     def tasks(self):
-        """Get tasks from a given URL."""
+        """Get tasks from a given URL, streaming the file so only a chunk of
+        it is in memory at a time."""
         dataurl = self._get_data_url()
-        r = requests.get(dataurl)
+        r = requests.get(dataurl, stream=True)
+        self._version = (r.headers.get('etag') or
+                         r.headers.get('content-length'))
         return self._get_csv_data_from_request(r)
 
+    def source_version(self):
+        """Return the ETag of the file, or its length if it has none."""
+        return getattr(self, '_version', None)
+
     def _get_data_url(self):
         """Get data from URL."""
         return self.url
@@ -47,8 +60,7 @@ class BulkTaskCSVImport(BulkTaskImport):
     def _import_csv_tasks(self, csvreader):
         """Import CSV tasks."""
         headers = []
-        fields = set(['state', 'quorum', 'calibration', 'priority_0',
-                      'n_answers'])
+        fields = self.task_fields
         field_header_index = []
         row_number = 0
         for row in csvreader:
@@ -61,6 +73,7 @@ class BulkTaskCSVImport(BulkTaskImport):
                     field_header_index.append(headers.index(field))
             else:
                 row_number += 1
+                self._check_max_rows(row_number)
                 self._check_valid_row_length(row, row_number, headers)
                 task_data = {"info": {}}
                 for idx, cell in enumerate(row):
@@ -90,6 +103,45 @@ class BulkTaskCSVImport(BulkTaskImport):
                           "row %s." % (row_number+1))
             raise BulkImportException(msg)
 
+    def _check_max_rows(self, row_number):
+        if self.max_rows is not None and row_number > self.max_rows:
+            msg = gettext("The file you uploaded has more than %(max)s rows.",
+                          max=self.max_rows)
+            raise BulkImportException(msg)
+
+    def _iter_content(self, r):
+        """Yield the chunks of a response as they are downloaded."""
+        try:
+            for chunk in r.iter_content(self.chunk_size):
+                yield chunk
+        finally:
+            r.close()
+
+    def _decode(self, chunks, encoding):
+        """Decode some chunks of bytes as they come, up to max_bytes."""
+        decoder = codecs.getincrementaldecoder(encoding)('replace')
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            if self.max_bytes is not None and size > self.max_bytes:
+                msg = gettext("The file you uploaded is bigger than "
+                              "%(max)s bytes.", max=self.max_bytes)
+                raise BulkImportException(msg)
+            yield decoder.decode(chunk)
+        yield decoder.decode('', True)
+
+    def _iter_lines(self, texts):
+        """Yield the lines of some chunks of text, keeping their line
+        breaks, as a quoted value can span many lines."""
+        pending = u''
+        for text in texts:
+            lines = (pending + text).split(u'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line + u'\n'
+        if pending:
+            yield pending
+
     def _get_csv_data_from_request(self, r):
         """Get CSV data from a request."""
         if r.status_code == 403:
@@ -102,8 +154,8 @@ class BulkTaskCSVImport(BulkTaskImport):
             raise BulkImportException(msg, 'error')
 
         r.encoding = 'utf-8'
-        csvcontent = StringIO(r.text)
-        csvreader = unicode_csv_reader(csvcontent)
+        texts = self._decode(self._iter_content(r), r.encoding)
+        csvreader = unicode_csv_reader(self._iter_lines(texts))
         return self._import_csv_tasks(csvreader)
 
 
@@ -113,8 +165,10 @@ class BulkTaskGDImport(BulkTaskCSVImport):
 
     importer_id = "gdocs"
 
-    def __init__(self, googledocs_url):
+    def __init__(self, googledocs_url, max_rows=None, max_bytes=None):
         self.url = googledocs_url
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
 
     def _get_data_url(self, **form_data):
         """Get data from URL."""
@@ -38,7 +38,7 @@ class BulkTaskDropboxImport(BulkTaskImport):
 
     def count_tasks(self):
         """Count number of tasks."""
-        return len(self.tasks())
+        return len(self.files)
 
     def _extract_file_info(self, _file):
         """Extract file information."""
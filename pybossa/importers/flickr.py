@@ -17,9 +17,8 @@
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 
 import json
-import requests
 
-from .base import BulkTaskImport, BulkImportException
+from .base import BulkTaskImport, BulkImportException, PageFetcher
 
 
 class BulkTaskFlickrImport(BulkTaskImport):
@@ -27,6 +26,7 @@ class BulkTaskFlickrImport(BulkTaskImport):
     """Class to import tasks from Flickr in bulk."""
 
     importer_id = "flickr"
+    url = 'https://api.flickr.com/services/rest/'
 
     def __init__(self, api_key, album_id, last_import_meta=None):
         """Init method."""
@@ -35,30 +35,33 @@ class BulkTaskFlickrImport(BulkTaskImport):
         self.last_import_meta = last_import_meta
 
     def tasks(self):
-        """Get tasks."""
-        album_info = self._get_album_info()
-        return self._get_tasks_data_from_request(album_info)
+        """Get tasks, fetching the pages of the album after the first one
+        as they are imported."""
+        fetcher = PageFetcher()
+        album_info = self._get_album_info(fetcher)
+        return self._get_tasks_data_from_request(fetcher, album_info)
 
     def count_tasks(self):
         """Count tasks."""
         album_info = self._get_album_info()
         return int(album_info['total'])
 
-    def _get_album_info(self):
-        """Get album info."""
-        url = 'https://api.flickr.com/services/rest/'
+    def _get_album_info(self, fetcher=None):
+        """Get album info, with the photos of its first page."""
+        fetcher = fetcher or PageFetcher()
+        res = fetcher.get(self.url, params=self._payload())
+        if self._is_valid_response(res):
+            return json.loads(res.text)['photoset']
+
+    def _payload(self, page=None):
         payload = {'method': 'flickr.photosets.getPhotos',
                    'api_key': self.api_key,
                    'photoset_id': self.album_id,
                    'format': 'json',
                    'nojsoncallback': '1'}
-        res = requests.get(url, params=payload)
-        if self._is_valid_response(res):
-            content = json.loads(res.text)['photoset']
-            total_pages = content.get('pages')
-            rest_photos = self._remaining_photos(url, payload, total_pages)
-            content['photo'] += rest_photos
-            return content
+        if page is not None:
+            payload['page'] = page
+        return payload
 
     def _is_valid_response(self, response):
         """Check if it's a valid response."""
@@ -72,25 +75,28 @@ class BulkTaskFlickrImport(BulkTaskImport):
             raise BulkImportException(error_message)
         return valid
 
-    def _remaining_photos(self, url, payload, total_pages):
-        """Return the remainin photos."""
-        photo_lists = [self._photos_from_page(url, payload, page)
-                       for page in range(2, total_pages+1)]
-        return [item for sublist in photo_lists for item in sublist]
+    def _remaining_photos(self, fetcher, total_pages):
+        """Yield the photos of the pages after the first one."""
+        fetch = lambda page: self._photos_from_page(fetcher, page)
+        for photos in fetcher.map(fetch, range(2, total_pages+1)):
+            for photo in photos:
+                yield photo
 
-    def _photos_from_page(self, url, payload, page):
+    def _photos_from_page(self, fetcher, page):
         """Return photos from page."""
-        payload['page'] = page
-        res = requests.get(url, params=payload)
+        res = fetcher.get(self.url, params=self._payload(page))
         if self._is_valid_response(res):
             return json.loads(res.text)['photoset']['photo']
         return []
 
-    def _get_tasks_data_from_request(self, album_info):
-        """Get tasks data from request."""
-        photo_list = album_info['photo']
+    def _get_tasks_data_from_request(self, fetcher, album_info):
+        """Yield the tasks of the photos of an album."""
         owner = album_info['owner']
-        return [self._extract_photo_info(photo, owner) for photo in photo_list]
+        for photo in album_info['photo']:
+            yield self._extract_photo_info(photo, owner)
+        total_pages = album_info.get('pages')
+        for photo in self._remaining_photos(fetcher, total_pages):
+            yield self._extract_photo_info(photo, owner)
 
     def _extract_photo_info(self, photo, owner):
         """Extract photo info."""
@@ -16,6 +16,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 
+from itertools import islice
 from flask.ext.babel import gettext
 from .csv import BulkTaskCSVImport, BulkTaskGDImport
 from .dropbox import BulkTaskDropboxImport
@@ -24,19 +25,28 @@ from .twitterapi import BulkTaskTwitterImport
 from .youtubeapi import BulkTaskYoutubeImport
 from .epicollect import BulkTaskEpiCollectPlusImport
 from .s3 import BulkTaskS3Import
+from .localfile import BulkTaskLocalFileImport
 
 class Importer(object):
 
     """Class to import data."""
 
+    _server_importers = ('localfile',)
+
     def __init__(self):
         """Init method."""
         self._importers = dict(csv=BulkTaskCSVImport,
                                gdocs=BulkTaskGDImport,
                                epicollect=BulkTaskEpiCollectPlusImport,
-                               s3=BulkTaskS3Import)
+                               s3=BulkTaskS3Import,
+                               localfile=BulkTaskLocalFileImport)
         self._importer_constructor_params = dict()
 
+    def register_csv_importer(self, csv_params):
+        """Register the limits of the CSV and Google Drive importers."""
+        self._importer_constructor_params['csv'] = csv_params
+        self._importer_constructor_params['gdocs'] = csv_params
+
     def register_flickr_importer(self, flickr_params):
         """Register Flickr importer."""
         self._importers['flickr'] = BulkTaskFlickrImport
@@ -54,23 +64,36 @@ class Importer(object):
         self._importers['youtube'] = BulkTaskYoutubeImport
         self._importer_constructor_params['youtube'] = youtube_params
 
-    def create_tasks(self, task_repo, project_id, **form_data):
-        """Create tasks."""
-        from pybossa.model.task import Task
+    def create_tasks(self, task_repo, project_id, checkpoint=None,
+                     progress=None, **form_data):
         """Create tasks from a remote source using an importer object and
-        avoiding the creation of repeated tasks"""
-        empty = True
-        n = 0
+        avoiding the creation of repeated tasks.
+
+        checkpoint is a dict with the rows of the source already imported,
+        the tasks created out of them and the version of the source, to carry
+        on with a previous import. The rows are only skipped if the source
+        has the same version. progress, if given, is called with the rows
+        imported, the tasks created so far and the version of the source
+        after every chunk of tasks inserted."""
         importer = self._create_importer_for(**form_data)
-        for task_data in importer.tasks():
-            task = Task(project_id=project_id)
-            [setattr(task, k, v) for k, v in task_data.iteritems()]
-            found = task_repo.get_task_by(project_id=project_id, info=task.info)
-            if found is None:
-                task_repo.save(task)
-                n += 1
-                empty = False
-        if empty:
+        checkpoint = checkpoint or dict(rows=0, created=0)
+        tasks_data = importer.tasks()
+        version = importer.source_version()
+        # The rows of a source which could have changed are read again, as
+        # the tasks already created are skipped by their info hash anyway
+        skip = 0
+        if version is not None and checkpoint.get('version') == version:
+            skip = checkpoint['rows']
+        tasks = islice(self._build_tasks(tasks_data, project_id), skip, None)
+
+        def callback(rows, created):
+            if progress is not None:
+                progress(skip + rows, checkpoint['created'] + created,
+                         version)
+
+        n = checkpoint['created'] + task_repo.import_tasks(tasks,
+                                                           callback=callback)
+        if n == 0:
             msg = gettext('It looks like there were no new records to import')
             return ImportReport(message=msg, metadata=None, total=n)
         metadata = importer.import_metadata()
@@ -80,6 +103,13 @@ class Importer(object):
         report = ImportReport(message=msg, metadata=metadata, total=n)
         return report
 
+    def _build_tasks(self, tasks_data, project_id):
+        from pybossa.model.task import Task
+        for task_data in tasks_data:
+            task = Task(project_id=project_id)
+            [setattr(task, k, v) for k, v in task_data.iteritems()]
+            yield task
+
     def count_tasks_to_import(self, **form_data):
         """Count tasks to import."""
         return self._create_importer_for(**form_data).count_tasks()
@@ -87,18 +117,20 @@ class Importer(object):
     def _create_importer_for(self, **form_data):
         """Create importer."""
         importer_id = form_data.get('type')
-        params = self._importer_constructor_params.get(importer_id) or {}
+        params = dict(self._importer_constructor_params.get(importer_id) or {})
         params.update(form_data)
         del params['type']
         return self._importers[importer_id](**params)
 
     def get_all_importer_names(self):
-        """Get all importer names."""
-        return self._importers.keys()
+        """Get all importer names, but for the ones which read the files of
+        the server, which are only available from the command line."""
+        return [name for name in self._importers.keys()
+                if name not in self._server_importers]
 
     def get_autoimporter_names(self):
         """Get autoimporter names."""
-        no_autoimporters = ('dropbox', 's3')
+        no_autoimporters = ('dropbox', 's3') + self._server_importers
         return [name for name in self._importers.keys() if name not in no_autoimporters]
 
 
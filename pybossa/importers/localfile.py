@@ -0,0 +1,177 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import json
+import os
+import re
+from itertools import chain
+from flask.ext.babel import gettext
+from pybossa.util import unicode_csv_reader
+
+from .base import BulkImportException
+from .csv import BulkTaskCSVImport
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class BulkTaskLocalFileImport(BulkTaskCSVImport):
+
+    """Class to import tasks in bulk from a CSV, JSON array or NDJSON file of
+    the server, gzipped or not.
+
+    The file is read and parsed a chunk at a time, so it can be of any size.
+    The keys of the JSON objects go to the info of the tasks, but for the
+    task fields, as the headers of a CSV file.
+
+    """
+
+    importer_id = "localfile"
+    file_formats = ('csv', 'json', 'ndjson')
+
+    def __init__(self, filename, file_format=None, last_import_meta=None,
+                 max_rows=None, max_bytes=None):
+        self.filename = filename
+        self.file_format = file_format or self._guess_format(filename)
+        self.last_import_meta = last_import_meta
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+
+    def tasks(self):
+        """Get tasks from the file."""
+        if self.file_format not in self.file_formats:
+            msg = gettext("Oops! That file doesn't look like the right file.")
+            raise BulkImportException(msg, 'error')
+        try:
+            _file = self._open()
+        except IOError:
+            msg = gettext("The file %(name)s cannot be read.",
+                          name=self.filename)
+            raise BulkImportException(msg, 'error')
+        texts = self._decode(self._iter_file(_file), 'utf-8')
+        if self.file_format == 'csv':
+            csvreader = unicode_csv_reader(self._iter_lines(texts))
+            return self._import_csv_tasks(csvreader)
+        if self.file_format == 'ndjson':
+            return self._import_json_tasks(self._iter_ndjson(texts))
+        return self._import_json_tasks(self._iter_json_array(texts))
+
+    def source_version(self):
+        """Return the modification time and the size of the file."""
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            return None
+        return '%r:%d' % (stat.st_mtime, stat.st_size)
+
+    def _guess_format(self, filename):
+        name = filename.lower()
+        if name.endswith('.gz'):
+            name = name[:-3]
+        extension = name.rsplit('.', 1)[-1]
+        if extension == 'jsonl':
+            return 'ndjson'
+        return extension
+
+    def _open(self):
+        """Open the file, uncompressing it if it is gzipped."""
+        _file = open(self.filename, 'rb')
+        magic = _file.read(2)
+        _file.seek(0)
+        if magic == '\x1f\x8b':
+            return gzip.GzipFile(fileobj=_file, mode='rb')
+        return _file
+
+    def _iter_file(self, _file):
+        """Yield the chunks of a file, closing it once read."""
+        try:
+            for chunk in iter(lambda: _file.read(self.chunk_size), ''):
+                yield chunk
+        finally:
+            _file.close()
+
+    def _iter_ndjson(self, texts):
+        """Yield the values of the lines of some NDJSON text."""
+        for line_number, line in enumerate(self._iter_lines(texts), 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                msg = gettext("The file you uploaded has an invalid JSON "
+                              "value on line %(line)s.", line=line_number)
+                raise BulkImportException(msg)
+
+    def _iter_json_array(self, texts):
+        """Yield the items of a JSON array as they are read, without
+        decoding the whole array at once."""
+        decoder = json.JSONDecoder()
+        invalid = gettext("The file you uploaded is not a valid JSON array.")
+        buf = u''
+        pos = 0
+        started = False
+        # None marks the end of the text
+        for text in chain(texts, [None]):
+            if text is not None:
+                buf = buf[pos:] + text
+                pos = 0
+            while True:
+                pos = WHITESPACE.match(buf, pos).end()
+                if pos == len(buf):
+                    break
+                if not started:
+                    if buf[pos] != u'[':
+                        raise BulkImportException(invalid)
+                    started = True
+                    pos += 1
+                    continue
+                if buf[pos] == u']':
+                    return
+                if buf[pos] == u',':
+                    pos += 1
+                    continue
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    # The item is incomplete, unless there is no more text
+                    if text is None:
+                        raise BulkImportException(invalid)
+                    break
+                # A number at the end could go on in the next chunk
+                if end == len(buf) and text is not None:
+                    break
+                pos = end
+                yield item
+        raise BulkImportException(invalid)
+
+    def _import_json_tasks(self, items):
+        """Import tasks from JSON objects."""
+        for row_number, item in enumerate(items, 1):
+            self._check_max_rows(row_number)
+            if not isinstance(item, dict):
+                msg = gettext("The file you uploaded has a value which is "
+                              "not an object on row %(row)s.",
+                              row=row_number)
+                raise BulkImportException(msg)
+            task_data = {"info": {}}
+            for key, value in item.iteritems():
+                if key in self.task_fields:
+                    task_data[key] = value
+                else:
+                    task_data["info"][key] = value
+            yield task_data
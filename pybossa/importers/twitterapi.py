@@ -16,6 +16,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 import json
+from itertools import islice
 from twitter import Twitter, OAuth2, oauth2_dance, OAuth, TwitterHTTPError
 from .base import BulkTaskImport, BulkImportException
 
@@ -35,23 +36,19 @@ class BulkTaskTwitterImport(BulkTaskImport):
         self.source = source
         self.count = self.DEFAULT_TWEETS if max_tweets is None else max_tweets
         self.last_import_meta = last_import_meta
-        self._tasks = None
+        self._last_id = None
 
     def tasks(self):
-        if self._tasks is None:
-            statuses = self._get_statuses()
-            tasks = [self._create_task_from_status(status) for status in statuses]
-            self._tasks = tasks[0:self.count]
-        return self._tasks
+        for status in islice(self._get_statuses(), self.count):
+            if self._last_id is None or status['id'] > self._last_id:
+                self._last_id = status['id']
+            yield self._create_task_from_status(status)
 
     def count_tasks(self):
         return self.count
 
     def import_metadata(self):
-        return None if self._tasks is None else self._extract_metadata()
-
-    def _extract_metadata(self):
-        return {'last_id': max(t['info']['id'] for t in self._tasks)}
+        return None if self._last_id is None else {'last_id': self._last_id}
 
     def _get_statuses(self):
         meta = self.last_import_meta
@@ -116,20 +113,18 @@ class UserCredentialsClient(TwitterClient):
 
     def fetch_all_statuses(self, source, count, since_id):
         max_id = None
-        partial_results = self._fetch_statuses(q=source,
-                                               count=count,
-                                               since_id=since_id)
-        results = []
-        while len(results) < count and len(partial_results) > 0:
-            results += partial_results
-            remaining = count - len(results)
-            max_id = min([status['id'] for status in partial_results]) - 1
-            partial_results = self._fetch_statuses(
-                                  q=source,
-                                  count=remaining,
-                                  max_id=max_id,
-                                  since_id=since_id)
-        return results or partial_results
+        remaining = count
+        while remaining > 0:
+            statuses = self._fetch_statuses(q=source,
+                                            count=remaining,
+                                            max_id=max_id,
+                                            since_id=since_id)
+            if not statuses:
+                return
+            for status in statuses[:remaining]:
+                yield status
+            remaining -= len(statuses)
+            max_id = min([status['id'] for status in statuses]) - 1
 
 
 class AppCredentialsClient(TwitterClient):
@@ -140,5 +135,5 @@ class AppCredentialsClient(TwitterClient):
         self.api = Twitter(auth=auth)
 
     def fetch_all_statuses(self, source, count, since_id):
-        results = self._fetch_statuses(q=source, count=count)
-        return results
+        for status in self._fetch_statuses(q=source, count=count)[:count]:
+            yield status
@@ -34,8 +34,8 @@ class BulkTaskYoutubeImport(BulkTaskImport):
     def tasks(self):
         if self.playlist_url:
             playlist_id = self._get_playlist_id(self.playlist_url)
-            playlist = self._fetch_all_youtube_videos(playlist_id)
-            return [self._extract_video_info(item) for item in playlist['items']]
+            videos = self._fetch_all_youtube_videos(playlist_id)
+            return (self._extract_video_info(item) for item in videos)
         else:
             return []
 
@@ -68,37 +68,29 @@ class BulkTaskYoutubeImport(BulkTaskImport):
     def _fetch_all_youtube_videos(self, playlistId):
         """
         Fetches a playlist of videos from youtube
-        We splice the results together in no particular order
+        The videos are yielded one page at a time, as each page has the
+        token of the next one, so they cannot be fetched ahead
 
         Parameters:
             parm1 - (string) playlistId
         Returns:
-            playListItem Dict
+            playListItem generator
         """
         YOUTUBE_API_SERVICE_NAME = "youtube"
         YOUTUBE_API_VERSION = "v3"
         youtube = build(YOUTUBE_API_SERVICE_NAME,
                         YOUTUBE_API_VERSION,
                         developerKey=self.youtube_api_server_key)
-        res = youtube.playlistItems().list(
-        part="snippet",
-        playlistId=playlistId,
-        maxResults="50"
-        ).execute()
-
-        nextPageToken = res.get('nextPageToken')
-        while ('nextPageToken' in res):
-            nextPage = youtube.playlistItems().list(
+        nextPageToken = None
+        while True:
+            page = youtube.playlistItems().list(
             part="snippet",
             playlistId=playlistId,
             maxResults="50",
             pageToken=nextPageToken
             ).execute()
-            res['items'] = res['items'] + nextPage['items']
-
-            if 'nextPageToken' not in nextPage:
-                res.pop('nextPageToken', None)
-            else:
-                nextPageToken = nextPage['nextPageToken']
-
-        return res
+            for item in page['items']:
+                yield item
+            nextPageToken = page.get('nextPageToken')
+            if nextPageToken is None:
+                break
@@ -23,12 +23,14 @@ from flask import current_app, render_template
 from flask.ext.mail import Message
 from pybossa.core import mail, task_repo, importer
 from pybossa.model.webhook import Webhook
-from pybossa.util import with_cache_disabled, publish_channel
+from pybossa.util import with_cache_disabled, with_analytics_bind
+from pybossa.util import publish_channel
 import pybossa.dashboard.jobs as dashboard
 
 
 MINUTE = 60
 IMPORT_TASKS_TIMEOUT = (10 * MINUTE)
+CKAN_EXPORT_TIMEOUT = (60 * MINUTE)
 
 
 def schedule_job(function, scheduler):
@@ -68,16 +70,15 @@ def get_quarterly_date(now):
 
 
 def enqueue_job(job):
-    """Enqueues a job."""
+    """Enqueues a job, returning the RQ job."""
     from pybossa.core import sentinel
     from rq import Queue
     redis_conn = sentinel.master
     queue = Queue(job['queue'], connection=redis_conn)
-    queue.enqueue_call(func=job['name'],
-                       args=job['args'],
-                       kwargs=job['kwargs'],
-                       timeout=job['timeout'])
-    return True
+    return queue.enqueue_call(func=job['name'],
+                              args=job['args'],
+                              kwargs=job['kwargs'],
+                              timeout=job['timeout'])
 
 def enqueue_periodic_jobs(queue_name):
     """Enqueue all PYBOSSA periodic jobs."""
@@ -135,8 +136,9 @@ def get_default_jobs():  # pragma: no cover
 
 
 def get_export_task_jobs(queue):
-    """Export tasks to zip."""
-    from pybossa.core import project_repo
+    """Export tasks to zip, skipping the projects that have not changed."""
+    from pybossa.core import project_repo, sentinel
+    from pybossa.export_watermarks import ExportWatermarks
     import pybossa.cache.projects as cached_projects
     from pybossa.pro_features import ProFeatureHandler
     feature_handler = ProFeatureHandler(current_app.config.get('PRO_FEATURES'))
@@ -148,8 +150,16 @@ def get_export_task_jobs(queue):
                         if p.owner.pro is False)
     else:
         projects = (p.dictize() for p in project_repo.get_all())
+    marks = get_export_marks()
+    watermarks = ExportWatermarks(sentinel.master)
     for project in projects:
         project_id = project.get('id')
+        mark = marks.get(project_id)
+        # Projects with shards still to be done are exported again to resume
+        # them, even if they have not changed
+        if (mark is not None and watermarks.get_mark(project_id) == mark and
+                not watermarks.get_progress(project_id)):
+            continue
         job = dict(name=project_export,
                    args=[project_id], kwargs={},
                    timeout=(10 * MINUTE),
@@ -157,14 +167,102 @@ def get_export_task_jobs(queue):
         yield job
 
 
+def get_export_marks(project_id=None):
+    """Return the export mark of the projects: their last task and task run
+    ids and their updated timestamp."""
+    from sqlalchemy.sql import text
+    from pybossa.core import db
+    sql = text('''SELECT project.id, project.updated,
+               (SELECT MAX(task.id) FROM task
+                WHERE task.project_id=project.id) AS last_task,
+               (SELECT MAX(task_run.id) FROM task_run
+                WHERE task_run.project_id=project.id) AS last_task_run
+               FROM project
+               WHERE :project_id IS NULL OR project.id=:project_id''')
+    results = db.slave_session.execute(sql, dict(project_id=project_id))
+    return dict((row.id, '%s:%s:%s' % (row.last_task, row.last_task_run,
+                                       row.updated))
+                for row in results)
+
+
+@with_analytics_bind
 def project_export(_id):
     """Export project."""
     from pybossa.core import project_repo, json_exporter, csv_exporter
+    from pybossa.core import parquet_exporter, sentinel
+    from pybossa.export_watermarks import ExportWatermarks
     app = project_repo.get(_id)
     if app is not None:
         print "Export project id %d" % _id
+        mark = get_export_marks(_id).get(_id)
         json_exporter.pregenerate_zip_files(app)
         csv_exporter.pregenerate_zip_files(app)
+        parquet_exporter.pregenerate_zip_files(app)
+        ExportWatermarks(sentinel.master).set_mark(_id, mark)
+
+
+@with_analytics_bind
+def export_shard(export_format, project_id, ty, index):
+    """Export a shard of a big project ZIP."""
+    import pybossa.core
+    project = pybossa.core.project_repo.get(project_id)
+    if project is not None:
+        exporter = getattr(pybossa.core, '%s_exporter' % export_format)
+        print "Export shard %d of project id %d (%s %s)" % (
+            index, project_id, export_format, ty)
+        return exporter.export_shard(project, ty, index)
+
+
+@with_analytics_bind
+def export_to_ckan(project_id, ty, resource_id, user_id, append=False):
+    """Upsert the tasks or task runs of a project to a CKAN datastore in
+    chunks, reporting the progress. Only the rows added since the last sync
+    are sent if append."""
+    from pybossa.ckan import Ckan
+    from pybossa.core import project_repo, user_repo, sentinel
+    from pybossa.export_watermarks import ExportWatermarks
+    from pybossa.exporter import Exporter
+    project = project_repo.get(project_id)
+    user = user_repo.get(user_id)
+    if project is None or user is None:
+        return
+    config = current_app.config
+    chunk_size = config.get('CKAN_CHUNK_SIZE')
+    watermarks = ExportWatermarks(sentinel.master)
+    last_id = None
+    if append:
+        last_id = watermarks.get_ckan_sync(project_id, resource_id)
+    boundaries = task_repo.get_shard_boundaries(Exporter.models[ty],
+                                                project_id, chunk_size,
+                                                last_id)
+    total = max(len(boundaries) - 1, 0)
+    progress = dict(done=0)
+    watermarks.set_ckan_progress(project_id, ty, 0, total)
+    rows = getattr(task_repo, 'filter_%ss_by' % ty)(
+        project_id=project_id, last_id=last_id, yielded=True, dictized=True,
+        chunk_size=chunk_size)
+
+    def chunks():
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def chunk_done(records):
+        progress['done'] += 1
+        watermarks.set_ckan_sync(project_id, resource_id, records[-1]['id'])
+        watermarks.set_ckan_progress(project_id, ty, progress['done'], total)
+
+    ckan = Ckan(url=config['CKAN_URL'], api_key=user.ckan_api)
+    ckan.datastore_upsert_chunks(name=ty, chunks=chunks(),
+                                 resource_id=resource_id,
+                                 workers=config.get('CKAN_WORKERS'),
+                                 retries=config.get('CKAN_RETRIES'),
+                                 callback=chunk_done)
 
 
 def get_project_jobs(queue='super'):
@@ -306,6 +404,7 @@ def get_autoimport_jobs(queue='low'):
 # The following are the actual jobs (i.e. tasks performed in the background)
 
 @with_cache_disabled
+@with_analytics_bind
 def get_project_stats(_id, short_name):  # pragma: no cover
     """Get stats for project."""
     import pybossa.cache.projects as cached_projects
@@ -324,6 +423,7 @@ def get_project_stats(_id, short_name):  # pragma: no cover
 
 
 @with_cache_disabled
+@with_analytics_bind
 def warm_up_stats():  # pragma: no cover
     """Background job for warming stats."""
     print "Running on the background warm_up_stats"
@@ -456,22 +556,57 @@ def send_mail(message_dict):
 
 
 def import_tasks(project_id, from_auto=False, **form_data):
-    """Import tasks for a project."""
-    from pybossa.core import project_repo
+    """Import tasks for a project.
+
+    The rows imported so far are checkpointed after every chunk of tasks and
+    published to the private channel of the project, so if the job stops
+    midway, running it again carries on from the last checkpoint. The
+    sources of the autoimports change between runs, so they are read again
+    from the start."""
+    from pybossa.core import project_repo, sentinel
+    from pybossa.import_checkpoints import ImportCheckpoints
     project = project_repo.get(project_id)
-    report = importer.create_tasks(task_repo, project_id, **form_data)
+    checkpoints = ImportCheckpoints(sentinel.master)
+    checkpoint = checkpoints.get(project_id, form_data)
+    if from_auto and checkpoint is not None:
+        checkpoint.pop('version', None)
+
+    def progress(rows, created, version=None):
+        data = checkpoints.set(project_id, form_data, rows, created, version)
+        if current_app.config.get('SSE'):
+            publish_channel(sentinel, project.short_name, data=data,
+                            type='import', private=True)
+
+    try:
+        report = importer.create_tasks(task_repo, project_id,
+                                       checkpoint=checkpoint,
+                                       progress=progress, **form_data)
+    except Exception:
+        checkpoint = checkpoints.get(project_id, form_data)
+        if checkpoint is not None:
+            msg = ('The import of tasks to your project %s stopped after '
+                   'creating %s new tasks. It will carry on from there if '
+                   'you import the same tasks again.'
+                   % (project.name, checkpoint['created']))
+            _send_import_mail(project, msg)
+        raise
+    checkpoints.delete(project_id, form_data)
     if from_auto:
         form_data['last_import_meta'] = report.metadata
         project.set_autoimporter(form_data)
         project_repo.save(project)
     msg = report.message + ' to your project %s!' % project.name
+    _send_import_mail(project, msg)
+    return msg
+
+
+def _send_import_mail(project, msg):
     subject = 'Tasks Import to your project %s' % project.name
     body = 'Hello,\n\n' + msg + '\n\nAll the best,\nThe %s team.'\
         % current_app.config.get('BRAND')
     mail_dict = dict(recipients=[project.owner.email_addr],
                      subject=subject, body=body)
     send_mail(mail_dict)
-    return msg
 
 
 def webhook(url, payload=None, oid=None):
@@ -589,6 +724,7 @@ def get_weekly_stats_update_projects():
             yield job
 
 
+@with_analytics_bind
 def send_weekly_stats_project(project_id):
     from pybossa.cache.project_stats import get_stats
     from pybossa.core import project_repo
@@ -18,8 +18,11 @@
 
 import datetime
 import uuid
+from itertools import izip
+from operator import attrgetter
 
-from sqlalchemy.orm import class_mapper
+from sqlalchemy import event
+from sqlalchemy.orm import class_mapper, mapper
 
 import logging
 
@@ -27,13 +30,42 @@ import logging
 log = logging.getLogger(__name__)
 
 
+def make_serializer(names):
+    """Return a function that returns a dict with the given attributes of an
+    object, getting all of them in a single call."""
+    names = tuple(names)
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return lambda obj: {names[0]: getter(obj)}
+    return lambda obj: dict(izip(names, getter(obj)))
+
+
 class DomainObject(object):
 
+    _column_names = None
+    _serializer = None
+
     def dictize(self):
-        out = {}
-        for col in self.__table__.c:
-            out[col.name] = getattr(self, col.name)
-        return out
+        serializer = self.__class__._serializer
+        if serializer is None:
+            serializer = compile_serializer(self.__class__)
+        return serializer(self)
+
+    @classmethod
+    def column_names(cls):
+        """Return the names of the columns of the table."""
+        if cls._column_names is None:
+            compile_serializer(cls)
+        return cls._column_names
+
+    @classmethod
+    def dictize_rows(cls, rows, names=None):
+        """Yield a dict for every row tuple (as returned by session.execute or
+        query.with_entities) with the columns of the table or the given names,
+        without creating the objects."""
+        names = tuple(names or cls.column_names())
+        for row in rows:
+            yield dict(izip(names, row))
 
     def info_public_keys(self, data=None):
         """Return a dictionary of info field with public keys."""
@@ -50,9 +82,12 @@ class DomainObject(object):
         with only public attributes."""
 
         out = dict()
+        attributes = self.public_attributes()
         if data is None:
-            data = self.dictize()
-        for col in self.public_attributes():
+            columns = self.column_names()
+            data = dict((col, getattr(self, col)) for col in attributes
+                        if col in columns)
+        for col in attributes:
             if col == 'info':
                 out[col] = self.info_public_keys(data=data)
             else:
@@ -86,6 +121,22 @@ class DomainObject(object):
         repr += '>'
         return repr
 
+
+def compile_serializer(cls):
+    """Compile the dictize function of a DomainObject class."""
+    cls._column_names = tuple(col.name for col in cls.__table__.c)
+    serializer = make_serializer(cls._column_names)
+    cls._serializer = staticmethod(serializer)
+    return serializer
+
+
+@event.listens_for(mapper, 'mapper_configured')
+def compile_domain_object_serializer(mapper, class_):
+    """Compile the dictize function of every DomainObject once it is mapped."""
+    if issubclass(class_, DomainObject):
+        compile_serializer(class_)
+
+
 def make_timestamp():
     now = datetime.datetime.utcnow()
     return now.isoformat()
@@ -15,10 +15,14 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+from collections import namedtuple
 from datetime import datetime
 
+from flask import current_app
 from rq import Queue
-from sqlalchemy import event
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.util import identity_key
 
 from pybossa.feed import update_feed
 from pybossa.model import update_project_timestamp, update_target_timestamp
@@ -30,9 +34,13 @@ from pybossa.model.task_run import TaskRun
 from pybossa.model.webhook import Webhook
 from pybossa.model.user import User
 from pybossa.model.result import Result
+from pybossa.model.search import create_search_columns, setup_search
+from pybossa.model.search import VECTOR_COLUMNS
+from pybossa.model.info_hash import create_hash_column, setup_hash
 from pybossa.core import result_repo
 from pybossa.jobs import webhook, notify_blog_users
-from pybossa.core import sentinel
+from pybossa.progress_counters import ProgressCounters
+from pybossa.core import sentinel, db
 
 webhook_queue = Queue('high', connection=sentinel.master)
 mail_queue = Queue('email', connection=sentinel.master)
@@ -179,13 +187,31 @@ def create_result(conn, project_id, task_id):
     for r in results:
         return r.id
 
+def _loaded_project(target, *columns):
+    """Return the project of target as a row if it is loaded in its session.
+
+    The API loads the project to authorize the new object, so it does not need
+    to be selected again while flushing. Return None if the project or any of
+    the columns is not loaded.
+    """
+    session = object_session(target)
+    if session is None:
+        return None
+    project = session.identity_map.get(identity_key(Project,
+                                                    target.project_id))
+    if project is None:
+        return None
+    loaded = inspect(project).dict
+    if not all(column in loaded for column in columns):
+        return None
+    Row = namedtuple('Row', columns)
+    return [Row(*[loaded[column] for column in columns])]
+
+
 @event.listens_for(TaskRun, 'after_insert')
 def on_taskrun_submit(mapper, conn, target):
     """Update the task.state when n_answers condition is met."""
     # Get project details
-    sql_query = ('select name, short_name, published, webhook, info from project \
-                 where id=%s') % target.project_id
-    results = conn.execute(sql_query)
     project_obj = dict(id=target.project_id,
                    name=None,
                    short_name=None,
@@ -193,6 +219,13 @@ def on_taskrun_submit(mapper, conn, target):
                    info=None,
                    webhook=None,
                    action_updated='TaskCompleted')
+    _webhook = None
+    results = _loaded_project(target, 'name', 'short_name', 'published',
+                              'webhook')
+    if results is None:
+        sql_query = ('select name, short_name, published, webhook, info from project \
+                     where id=%s') % target.project_id
+        results = conn.execute(sql_query)
     for r in results:
         project_obj['name'] = r.name
         project_obj['short_name'] = r.short_name
@@ -204,6 +237,9 @@ def on_taskrun_submit(mapper, conn, target):
         project_obj['id'] = target.project_id
 
     add_user_contributed_to_feed(conn, target.user_id, project_obj)
+    ProgressCounters(sentinel.master).add_task_run(target.project_id,
+                                                   user_id=target.user_id,
+                                                   user_ip=target.user_ip)
     if is_task_completed(conn, target.task_id) and project_obj['published']:
         update_task_state(conn, target.task_id)
         update_feed(project_obj)
@@ -233,3 +269,24 @@ def make_admin(mapper, conn, target):
     users = conn.scalar('select count(*) from "user"')
     if users == 0:
         target.admin = True
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_search_vectors(target, conn, **kw):
+    """Add the full text search vectors to the new tables."""
+    created = set(table.name for table in kw.get('tables', []))
+    if not created.issuperset(VECTOR_COLUMNS):
+        return
+    create_search_columns(conn)
+    setup_search(conn,
+                 language=current_app.config['FULLTEXTSEARCH_LANGUAGE'],
+                 weights=current_app.config['FULLTEXTSEARCH_WEIGHTS'])
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_info_hashes(target, conn, **kw):
+    """Add the info hashes to a new task table."""
+    if 'task' not in set(table.name for table in kw.get('tables', [])):
+        return
+    create_hash_column(conn)
+    setup_hash(conn)
@@ -0,0 +1,90 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Content hashes of the info of the tasks for PYBOSSA.
+
+Every task has a hash of its info, with a unique (project_id, info_hash)
+index, so the importers skip the tasks already in a project with INSERT ...
+ON CONFLICT DO NOTHING instead of comparing the info of every task.
+
+The hashes are computed by the DB from the jsonb form of the info, so the
+order of the keys and the spacing do not matter. A trigger sets them for the
+tasks created in any other way, leaving the hash of a task empty if it is a
+duplicate, as only the importers reject those. A duplicate inserted at the
+same time as the task it duplicates passes the check, so the repository
+inserts it again when it hits the unique index, and the trigger sees the
+other task then.
+
+The hash is not mapped by the ORM model, so it is never loaded or exported.
+
+"""
+
+INFO_HASH_INDEX = 'task_project_id_info_hash_key'
+
+INFO_HASH = """
+CREATE OR REPLACE FUNCTION pybossa_info_hash(info json) RETURNS text AS $$
+    SELECT md5(CAST(CAST(info AS jsonb) AS text))
+$$ LANGUAGE sql IMMUTABLE
+"""
+
+INFO_HASH_TRIGGER = """
+CREATE OR REPLACE FUNCTION pybossa_info_hash_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' OR NEW.info_hash IS NULL THEN
+        NEW.info_hash := pybossa_info_hash(NEW.info);
+        IF EXISTS (SELECT 1 FROM task WHERE project_id = NEW.project_id
+                   AND info_hash = NEW.info_hash AND id <> NEW.id) THEN
+            NEW.info_hash := NULL;
+        END IF;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def create_hash_column(conn):
+    """Add the info hash column to the task table."""
+    conn.execute('ALTER TABLE task ADD COLUMN info_hash text')
+
+
+def update_hashes(conn):
+    """Compute the hash of every task, leaving empty the ones of the
+    duplicates of a task with a lower id."""
+    conn.execute(INFO_HASH)
+    conn.execute('''
+        UPDATE task SET info_hash = hashes.info_hash
+        FROM (SELECT id, pybossa_info_hash(info) AS info_hash,
+                     row_number() OVER (
+                         PARTITION BY project_id, pybossa_info_hash(info)
+                         ORDER BY id) AS n
+              FROM task) AS hashes
+        WHERE task.id = hashes.id AND hashes.n = 1''')
+
+
+def setup_hash(conn):
+    """Create the unique index, and the functions and trigger that set the
+    hashes."""
+    conn.execute(INFO_HASH)
+    conn.execute(INFO_HASH_TRIGGER)
+    conn.execute('CREATE UNIQUE INDEX %s ON task (project_id, info_hash)'
+                 % INFO_HASH_INDEX)
+    conn.execute('DROP TRIGGER IF EXISTS task_info_hash ON task')
+    conn.execute('CREATE TRIGGER task_info_hash BEFORE INSERT OR UPDATE OF '
+                 'info ON task FOR EACH ROW EXECUTE PROCEDURE '
+                 'pybossa_info_hash_trigger()')
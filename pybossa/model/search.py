@@ -0,0 +1,138 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Full text search vectors for PYBOSSA.
+
+The info of tasks, task runs and results, and the name and description of
+projects, are kept in tsvector columns with GIN indexes. The vectors are
+updated by triggers, so they are right whatever the way rows are written (ORM,
+bulk inserts or raw SQL), and searches do not have to parse every row.
+
+The vectors are not mapped by the ORM models, so they are never loaded or
+exported. Use info_vector and project_vector to refer to them in queries, and
+search_config for the text search configuration (language) they were built
+with.
+
+"""
+import re
+from sqlalchemy import func
+from sqlalchemy.sql import literal_column
+
+LANGUAGE = 'english'
+WEIGHTS = {'name': 'A', 'description': 'B'}
+
+INFO_TABLES = ('task', 'task_run', 'result')
+VECTOR_COLUMNS = dict([(table, 'info_tsv') for table in INFO_TABLES] +
+                      [('project', 'search_tsv')])
+
+# An info which is not a JSON object has no keys, so its vector is empty
+INFO_VECTOR = """
+CREATE OR REPLACE FUNCTION pybossa_info_tsvector(info json)
+RETURNS tsvector AS $$
+    SELECT to_tsvector(pybossa_search_config(), coalesce(
+        (SELECT string_agg(value, ' ') FROM json_each_text(CASE
+            WHEN json_typeof(info) = 'object' THEN info
+            ELSE '{}'::json END)), ''))
+$$ LANGUAGE sql IMMUTABLE
+"""
+
+INFO_TRIGGER = """
+CREATE OR REPLACE FUNCTION pybossa_info_tsv_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.info_tsv := pybossa_info_tsvector(NEW.info);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+PROJECT_TRIGGER = """
+CREATE OR REPLACE FUNCTION pybossa_project_tsv_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_tsv := %s;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def search_config():
+    """Return the text search configuration used by the vectors."""
+    return func.pybossa_search_config()
+
+
+def info_vector(table):
+    """Return the info search vector column of a table, or None."""
+    if table not in INFO_TABLES:
+        return None
+    return literal_column('%s.info_tsv' % table)
+
+
+def project_vector():
+    """Return the project search vector column."""
+    return literal_column('project.search_tsv')
+
+
+def project_vector_sql(weights, prefix=''):
+    """Return the SQL expression that computes a project search vector."""
+    parts = []
+    for column, weight in sorted(weights.items()):
+        if not re.match(r'^\w+$', column) or weight not in 'ABCD':
+            raise ValueError('Invalid search weight %s: %s' % (column, weight))
+        parts.append("setweight(to_tsvector(pybossa_search_config(), "
+                     "coalesce(%s%s, '')), '%s')" % (prefix, column, weight))
+    return ' || '.join(parts)
+
+
+def create_search_columns(conn):
+    """Add the search vector columns and their GIN indexes."""
+    for table, column in sorted(VECTOR_COLUMNS.items()):
+        conn.execute('ALTER TABLE %s ADD COLUMN %s tsvector' % (table, column))
+        conn.execute('CREATE INDEX %s_%s_idx ON %s USING gin(%s)'
+                     % (table, column, table, column))
+
+
+def setup_search(conn, language=LANGUAGE, weights=WEIGHTS):
+    """Create or replace the search functions and triggers."""
+    if not re.match(r'^\w+$', language):
+        raise ValueError('Invalid search language %s' % language)
+    conn.execute("CREATE OR REPLACE FUNCTION pybossa_search_config() "
+                 "RETURNS regconfig AS $$ SELECT '%s'::regconfig $$ "
+                 "LANGUAGE sql IMMUTABLE" % language)
+    conn.execute(INFO_VECTOR)
+    conn.execute(INFO_TRIGGER)
+    conn.execute(PROJECT_TRIGGER % project_vector_sql(weights, prefix='NEW.'))
+    for table in INFO_TABLES:
+        conn.execute('DROP TRIGGER IF EXISTS %s_info_tsv ON %s'
+                     % (table, table))
+        conn.execute('CREATE TRIGGER %s_info_tsv BEFORE INSERT OR UPDATE OF '
+                     'info ON %s FOR EACH ROW EXECUTE PROCEDURE '
+                     'pybossa_info_tsv_trigger()' % (table, table))
+    conn.execute('DROP TRIGGER IF EXISTS project_search_tsv ON project')
+    conn.execute('CREATE TRIGGER project_search_tsv BEFORE INSERT OR UPDATE OF '
+                 '%s ON project FOR EACH ROW EXECUTE PROCEDURE '
+                 'pybossa_project_tsv_trigger()'
+                 % ', '.join(sorted(weights.keys())))
+
+
+def update_search_vectors(conn, weights=WEIGHTS):
+    """Compute again every search vector, e.g. after changing the language."""
+    for table in INFO_TABLES:
+        conn.execute('UPDATE %s SET info_tsv = pybossa_info_tsvector(info)'
+                     % table)
+    conn.execute('UPDATE project SET search_tsv = %s'
+                 % project_vector_sql(weights))
@@ -0,0 +1,84 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Progress counters for PYBOSSA.
+
+A Redis hash is stored for every contributor of a project with the number of
+task runs they have submitted (done) and the number of tasks they can still
+contribute to (available). They are initialized lazily from the DB, and then
+updated every time a task run is submitted, so the userprogress endpoint and
+the contribute buttons do not need to query the DB for every request.
+
+"""
+
+
+# Only update the counters if they have been initialized, so they never start
+# counting from a partial value.
+INCR = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBY', KEYS[1], 'done', 1)
+    redis.call('HINCRBY', KEYS[1], 'available', -1)
+    return 1
+end
+return 0
+"""
+
+
+class ProgressCounters(object):
+
+    KEY_PREFIX = 'pybossa:progress:project:%s:user:%s'
+    COUNTER_TTL = 60 * 60 * 3
+
+    def __init__(self, redis_conn):
+        self.conn = redis_conn
+
+    def get(self, project_id, user_id=None, user_ip=None):
+        """Return a dict with the done and available counters or None."""
+        key = self._create_key(project_id, user_id, user_ip)
+        counters = self.conn.hgetall(key)
+        if not counters:
+            return None
+        return dict(done=int(counters['done']),
+                    available=max(int(counters['available']), 0))
+
+    def set(self, project_id, done, available, user_id=None, user_ip=None):
+        """Initialize the counters of a contributor."""
+        key = self._create_key(project_id, user_id, user_ip)
+        pipe = self.conn.pipeline()
+        pipe.hmset(key, dict(done=done, available=available))
+        pipe.expire(key, self.COUNTER_TTL)
+        pipe.execute()
+        return dict(done=done, available=available)
+
+    def add_task_run(self, project_id, user_id=None, user_ip=None):
+        """Count a new task run, if the contributor counters exist."""
+        key = self._create_key(project_id, user_id, user_ip)
+        incr = self.conn.register_script(INCR)
+        return incr(keys=[key]) == 1
+
+    def reset(self, project_id):
+        """Delete the counters of every contributor of a project."""
+        pattern = self.KEY_PREFIX % (project_id, '*')
+        keys = list(self.conn.scan_iter(match=pattern))
+        if keys:
+            self.conn.delete(*keys)
+
+    def _create_key(self, project_id, user_id=None, user_ip=None):
+        if user_id:
+            return self.KEY_PREFIX % (project_id, user_id)
+        return self.KEY_PREFIX % (project_id, 'ip:%s' % (user_ip or '127.0.0.1'))
@@ -0,0 +1,66 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Project versions for PYBOSSA.
+
+A version is stored in Redis for every project, and another one for the whole
+site, and a new one is set every time a project or its tasks, task runs or
+results change. The API uses them as cheap validators for conditional GET
+requests (ETag and Last-Modified), so it can answer 304 Not Modified without
+querying the DB.
+
+"""
+import time
+
+
+class ProjectVersions(object):
+
+    KEY_PREFIX = 'pybossa:project_version:%s'
+    SITE = 'site'
+
+    def __init__(self, redis_conn):
+        self.conn = redis_conn
+
+    def bump(self, project_id):
+        """Set a new version for a project and for the site."""
+        version = self._new_version()
+        pipe = self.conn.pipeline()
+        pipe.set(self._create_key(project_id), version)
+        pipe.set(self._create_key(self.SITE), version)
+        pipe.execute()
+        return version
+
+    def get(self, project_id=None):
+        """Return the version of a project, or the site one if None."""
+        key = self._create_key(project_id or self.SITE)
+        version = self.conn.get(key)
+        if version is None:
+            # Nothing is known about previous versions, so start a new one
+            self.conn.setnx(key, self._new_version())
+            version = self.conn.get(key)
+        return version
+
+    def timestamp(self, version):
+        """Return the UNIX timestamp (in seconds) when a version was set."""
+        return int(float(version))
+
+    def _new_version(self):
+        return '%.6f' % time.time()
+
+    def _create_key(self, project_id):
+        return self.KEY_PREFIX % project_id
@@ -21,46 +21,130 @@ Rate limit module for limiting the requests in the API.
 
 This module exports:
     * RateLimit class: for limiting the requests
+    * LocalLeases class: for taking tokens in advance in this process
     * ratelimit decorator: for decorating the views
 
+Limits are token buckets stored in Redis: every client has a bucket of LIMIT
+tokens per endpoint that refills at LIMIT/PER tokens per second, and every
+request takes one token. Clients are identified by their user (via their
+API key or session) or by their IP address if they are anonymous.
+
 """
+import threading
 import time
 from functools import update_wrapper, wraps
 from flask import request, g
+from flask.ext.login import current_user
 from werkzeug.exceptions import TooManyRequests
-from pybossa.core import sentinel
+from pybossa.core import sentinel, ratelimits
 from pybossa.error import ErrorStatus
 
 error = ErrorStatus()
 
 
+# Refill the bucket for the elapsed time and take the tokens atomically. It
+# takes a lease of several tokens if the bucket is well over half full, or
+# just one token otherwise, so the limit is exact for clients close to it.
+TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local lease = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+if now > ts then
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    ts = now
+end
+local taken = 0
+if tokens - lease >= capacity / 2 then
+    taken = lease
+elseif tokens >= 1 then
+    taken = 1
+end
+tokens = tokens - taken
+redis.call('HMSET', KEYS[1], 'tokens', tokens, 'ts', ts)
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return {taken, math.floor(tokens)}
+"""
+
+
+class LocalLeases(object):
+
+    """
+    Tokens taken in advance from the Redis buckets by this process.
+
+    A lease lets the process serve the next requests of a client well under
+    its limit without asking Redis. Leases are short lived, so the unused
+    tokens are simply lost and the limit is never exceeded.
+
+    """
+
+    def __init__(self, ttl=1, max_keys=10000):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.leases = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, now):
+        """Take a leased token, returning the bucket remaining or None."""
+        with self.lock:
+            lease = self.leases.get(key)
+            if lease is None or lease[0] <= 0 or lease[1] < now:
+                return None
+            lease[0] -= 1
+            return lease[2] + lease[0]
+
+    def add(self, key, tokens, remaining, now):
+        """Store the tokens leased for a key."""
+        with self.lock:
+            if len(self.leases) >= self.max_keys:
+                self.leases = dict((k, v) for k, v in self.leases.items()
+                                   if v[1] >= now and v[0] > 0)
+                if len(self.leases) >= self.max_keys:
+                    self.leases.clear()
+            self.leases[key] = [tokens, now + self.ttl, remaining]
+
+
+leases = LocalLeases()
+
+
 class RateLimit(object):
 
     """
     Limit the number of requests.
 
-    It uses a Redis pipe from the master node (configured via Sentinel) to
-    limit the number of requests.
+    It runs a token bucket Lua script in the master node (configured via
+    Sentinel) to limit the number of requests. If lease is bigger than one,
+    that many tokens are taken at once for clients well under their limit,
+    and used from this process without asking Redis.
 
     """
 
-    expiration_window = 10
-
-    def __init__(self, key_prefix, limit, per, send_x_headers):
-        self.reset = (int(time.time()) // per) * per + per
-        self.key = key_prefix + str(self.reset)
+    def __init__(self, key, limit, per, send_x_headers, lease=1):
+        now = time.time()
+        self.key = key
         self.limit = limit
         self.per = per
         self.send_x_headers = send_x_headers
-
-        p = sentinel.master.pipeline()
-        p.incr(self.key)
-        p.expireat(self.key, self.reset + self.expiration_window)
-
-        self.current = min(p.execute()[0], limit)
-
-    remaining = property(lambda x: x.limit - x.current)
-    over_limit = property(lambda x: x.current >= x.limit)
+        self.rate = float(limit) / per
+        self.over_limit = False
+        remaining = leases.take(key, now) if lease > 1 else None
+        if remaining is None:
+            script = sentinel.master.register_script(TOKEN_BUCKET)
+            taken, remaining = script(keys=[key],
+                                      args=[limit, self.rate, now, lease])
+            self.over_limit = taken == 0
+            if taken > 1:
+                leases.add(key, taken - 1, remaining, now)
+                remaining += taken - 1
+        self.remaining = remaining
+        self.reset = int(now + (limit - remaining) / self.rate)
 
 
 def get_view_rate_limit():
@@ -68,13 +152,23 @@ def get_view_rate_limit():
     return getattr(g, '_view_rate_limit', None)
 
 
+def rate_limit_scope():
+    """Return who the request is limited for: its user or its IP."""
+    if current_user.is_authenticated():
+        return 'user:%s' % current_user.id
+    return 'ip:%s' % request.remote_addr
+
+
 def ratelimit(limit, per, send_x_headers=True,
-              scope_func=lambda: request.remote_addr,
+              scope_func=rate_limit_scope,
               key_func=lambda: request.endpoint,
               path=lambda: request.path):
     """
     Decorator for limiting the access to a route.
 
+    The limit and per values can be overridden for an endpoint with the
+    RATE_LIMIT_ENDPOINTS setting.
+
     Returns the function if within the limit, otherwise TooManyRequests error
 
     """
@@ -82,10 +176,13 @@ def ratelimit(limit, per, send_x_headers=True,
         @wraps(f)
         def rate_limited(*args, **kwargs):
             try:
-                key = 'rate-limit/%s/%s/' % (key_func(), scope_func())
-                rlimit = RateLimit(key, limit, per, send_x_headers)
+                endpoint = key_func()
+                override = ratelimits.get('ENDPOINTS', {}).get(endpoint, {})
+                key = 'rate-limit/%s/%s/' % (endpoint, scope_func())
+                rlimit = RateLimit(key, override.get('limit', limit),
+                                   override.get('per', per), send_x_headers,
+                                   lease=ratelimits.get('LEASE', 1))
                 g._view_rate_limit = rlimit
-                #if over_limit is not None and rlimit.over_limit:
                 if rlimit.over_limit:
                     raise TooManyRequests
                 return f(*args, **kwargs)
@@ -0,0 +1,225 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Read replica routing for PYBOSSA.
+
+This module exports:
+    * RoutingSQLAlchemy class: the db extension, using RoutingSession
+    * RoutingSession class: sends the reads of safe requests to a replica
+
+The SELECTs of the GET, HEAD and OPTIONS requests go to one of the
+READ_REPLICA_BINDS, so the repositories read from the replicas without
+knowing about them. They go to the master instead:
+    * once the request has written anything
+    * for READ_REPLICA_STICKY seconds after a client writes, so it always
+      reads its own writes. The mark goes in its session, or in Redis for the
+      API clients on the fast path, whose session is never saved
+    * when no replica is less than READ_REPLICA_MAX_LAG seconds behind the
+      master, checked at most every READ_REPLICA_LAG_CHECK seconds
+
+Background jobs can send their reads to another bind with read_from.
+
+"""
+import hashlib
+import math
+import random
+import time
+from contextlib import contextmanager
+from flask import has_request_context, request, session
+from flask.ext.sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.expression import SelectBase
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+WROTE_AT = 'db_wrote_at'
+WROTE_AT_KEY = 'pybossa:read_replicas:wrote_at:%s'
+LAG_SQL = '''SELECT CASE WHEN pg_is_in_recovery()
+             THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+             ELSE 0 END'''
+
+
+class ReplicaLag(object):
+
+    """Seconds every replica is behind the master, checked at most once per
+    interval and infinite if it cannot be checked."""
+
+    def __init__(self):
+        self._checks = {}
+
+    def get(self, bind, engine, interval):
+        now = time.time()
+        checked_at, lag = self._checks.get(bind, (None, None))
+        if checked_at is None or now - checked_at >= interval:
+            try:
+                lag = engine.scalar(LAG_SQL)
+            except Exception:
+                lag = None
+            lag = float(lag) if lag is not None else float('inf')
+            self._checks[bind] = (now, lag)
+        return lag
+
+    def reset(self):
+        self._checks = {}
+
+
+replica_lag = ReplicaLag()
+
+
+def is_read(clause):
+    """Return True if a statement only reads, so it can go to a replica."""
+    if isinstance(clause, SelectBase):
+        return getattr(clause, '_for_update_arg', None) is None
+    if isinstance(clause, TextClause):
+        clause = clause.text
+    if not isinstance(clause, basestring):
+        return False
+    sql = clause.lstrip().upper()
+    return sql.startswith('SELECT') and 'FOR UPDATE' not in sql
+
+
+class RoutingSession(SignallingSession):
+
+    """Session that reads from a replica during the safe requests."""
+
+    def __init__(self, db, **options):
+        # Only the default session is routed, not the ones bound to an engine
+        self.routing = options.get('bind') is None
+        self.read_bind = None
+        self.wrote = False
+        self._replica = None
+        self._db = db
+        SignallingSession.__init__(self, db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        bind = self._read_bind(clause)
+        if bind is not None:
+            return self._db.get_engine(self.app, bind=bind)
+        return SignallingSession.get_bind(self, mapper, clause)
+
+    def execute(self, clause, *args, **kwargs):
+        if not is_read(clause):
+            self.mark_write()
+        return SignallingSession.execute(self, clause, *args, **kwargs)
+
+    def mark_write(self):
+        """Send the rest of the reads to the master, and the ones of the
+        client for READ_REPLICA_STICKY seconds."""
+        self.wrote = True
+        if (self.routing and has_request_context() and
+                self.replicas()):
+            self._set_wrote_at(time.time())
+
+    def replicas(self):
+        """Return the replica binds, skipping the ones that are the master."""
+        config = self.app.config
+        binds = config.get('SQLALCHEMY_BINDS') or {}
+        master = config.get('SQLALCHEMY_DATABASE_URI')
+        return [bind for bind in config.get('READ_REPLICA_BINDS') or []
+                if bind in binds and binds[bind] != master]
+
+    def _read_bind(self, clause):
+        if self.wrote or self._flushing or not is_read(clause):
+            return None
+        if self.read_bind is not None:
+            return self.read_bind
+        if not self.routing:
+            return None
+        if self._replica is None:
+            self._replica = (self._safe_request() and
+                             self._choose_replica()) or False
+        return self._replica or None
+
+    def _safe_request(self):
+        if not has_request_context() or request.method not in SAFE_METHODS:
+            return False
+        wrote_at = self._get_wrote_at()
+        sticky = self.app.config.get('READ_REPLICA_STICKY')
+        return wrote_at is None or time.time() - wrote_at >= sticky
+
+    def _get_wrote_at(self):
+        if not _on_fast_path():
+            return session.get(WROTE_AT)
+        from pybossa.core import sentinel
+        wrote_at = sentinel.master.get(WROTE_AT_KEY % _client())
+        return float(wrote_at) if wrote_at is not None else None
+
+    def _set_wrote_at(self, wrote_at):
+        if not _on_fast_path():
+            session[WROTE_AT] = wrote_at
+            return
+        from pybossa.core import sentinel
+        sticky = int(math.ceil(self.app.config.get('READ_REPLICA_STICKY')))
+        if sticky > 0:
+            sentinel.master.setex(WROTE_AT_KEY % _client(), sticky, wrote_at)
+
+    def _choose_replica(self):
+        config = self.app.config
+        replicas = [bind for bind in self.replicas()
+                    if replica_lag.get(bind,
+                                       self._db.get_engine(self.app, bind=bind),
+                                       config.get('READ_REPLICA_LAG_CHECK'))
+                    <= config.get('READ_REPLICA_MAX_LAG')]
+        if replicas:
+            return random.choice(replicas)
+        return None
+
+
+def _on_fast_path():
+    from pybossa.api.fast_path import FastPathSession
+    return isinstance(session._get_current_object(), FastPathSession)
+
+
+def _client():
+    """Return who sent the request: its token, or its address if anonymous."""
+    token = (request.args.get('api_key') or
+             request.headers.get('Authorization'))
+    if isinstance(token, unicode):
+        token = token.encode('utf-8')
+    if token:
+        return hashlib.sha1(token).hexdigest()
+    return request.remote_addr
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_flush(session, flush_context):
+    session.mark_write()
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    """SQLAlchemy extension whose sessions read from the replicas."""
+
+    def create_session(self, options):
+        return RoutingSession(self, **options)
+
+    @contextmanager
+    def read_from(self, bind):
+        """Send the reads of the default and slave sessions to a bind while
+        in the block. Nothing changes if the bind is not configured."""
+        binds = self.get_app().config.get('SQLALCHEMY_BINDS') or {}
+        sessions = set([self.session(), self.slave_session()])
+        previous = [(s, s.read_bind) for s in sessions]
+        if bind in binds:
+            for s in sessions:
+                s.read_bind = bind
+        try:
+            yield
+        finally:
+            for s, read_bind in previous:
+                s.read_bind = read_bind
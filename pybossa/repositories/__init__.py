@@ -38,8 +38,9 @@ PYBOSSA.
 import json
 from pybossa.model.project import Project
 from sqlalchemy.sql import and_
-from sqlalchemy import cast, Text, func
+from sqlalchemy import cast, Text, func, text
 from sqlalchemy.orm.base import _entity_descriptor
+from pybossa.model.search import info_vector, search_config
 
 class Repository(object):
 
@@ -65,9 +66,8 @@ class Repository(object):
                 if pair != '':
                     k,v = pair.split("::")
                     if fulltextsearch == '1':
-                        vector = _entity_descriptor(model, 'info')[k].astext
-                        clause = func.to_tsvector(vector).match(v)
-                        clauses.append(clause)
+                        clauses = clauses + self.handle_info_fulltextsearch(
+                            model, k, v)
                     else:
                         clauses.append(_entity_descriptor(model,
                                                           'info')[k].astext == v)
@@ -78,6 +78,74 @@ class Repository(object):
         return clauses
 
 
+    def handle_info_fulltextsearch(self, model, key, value):
+        """Return the clauses for a full text search in an info key.
+
+        The stored search vector of the info (if the table has one) finds the
+        candidate rows with its GIN index, and then only those are checked
+        for the key. Queries with negations do not use it, as a row whose
+        key matches can have the negated word in another key.
+
+        """
+        query = func.to_tsquery(search_config(), value)
+        text = _entity_descriptor(model, 'info')[key].astext
+        clauses = [func.to_tsvector(search_config(), text).op('@@')(query)]
+        vector = info_vector(model.__tablename__)
+        if vector is not None and '!' not in value:
+            clauses.insert(0, vector.op('@@')(query))
+        return clauses
+
+
+    def select_columns(self, query, model, fields=None):
+        """Return query selecting only the columns of model (or the given
+        fields) as row tuples, and the names of the columns."""
+        names = fields or model.column_names()
+        columns = [model.__table__.c[name] for name in names]
+        return query.with_entities(*columns), names
+
+
+    def get_info_types(self, model, project_id):
+        """Return a dict with the keys of the info of all the rows of model
+        in a project, and the set of JSON types of their values."""
+        sql = text('''
+                   SELECT item.key, json_typeof(item.value) AS type
+                   FROM {0}, json_each(CASE
+                       WHEN json_typeof({0}.info) = 'object' THEN {0}.info
+                       ELSE '{{}}'::json END) AS item
+                   WHERE {0}.project_id=:project_id
+                   GROUP BY item.key, json_typeof(item.value);
+                   '''.format(model.__tablename__))
+        info_types = {}
+        results = self.db.session.execute(sql, dict(project_id=project_id))
+        for row in results:
+            info_types.setdefault(row.key, set()).add(row.type)
+        return info_types
+
+
+    def get_shard_boundaries(self, model, project_id, size, last_id=None):
+        """Return the ids splitting the rows of model in a project past
+        last_id in shards of size rows, each shard going from one boundary
+        (included) to the next one (excluded). Empty if there are no rows."""
+        sql = text('''
+                   SELECT id FROM (
+                       SELECT id, row_number() OVER (ORDER BY id) AS n
+                       FROM {0}
+                       WHERE project_id=:project_id AND id > :last_id)
+                   AS numbered
+                   WHERE MOD(n - 1, :size) = 0 ORDER BY id;
+                   '''.format(model.__tablename__))
+        params = dict(project_id=project_id, last_id=last_id or 0, size=size)
+        boundaries = [row.id for row in self.db.session.execute(sql, params)]
+        if not boundaries:
+            return boundaries
+        sql = text('''SELECT MAX(id) AS id FROM {0}
+                   WHERE project_id=:project_id;
+                   '''.format(model.__tablename__))
+        last = self.db.session.execute(sql, params).first()
+        boundaries.append(last.id + 1)
+        return boundaries
+
+
     def create_context(self, filters, fulltextsearch, model):
         """Return query with context aware query."""
         owner_id = None
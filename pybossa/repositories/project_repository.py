@@ -17,13 +17,18 @@
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import cast, Date
+from sqlalchemy import cast, Date, func
+from sqlalchemy.orm import load_only
 
 from pybossa.model.project import Project
 from pybossa.model.category import Category
+from pybossa.model.search import project_vector, search_config
 from pybossa.exc import WrongObjectError, DBIntegrityError
 from pybossa.cache import projects as cached_projects
-from pybossa.core import uploader
+from pybossa.core import uploader, sentinel
+from pybossa.project_versions import ProjectVersions
+from pybossa.progress_counters import ProgressCounters
+from pybossa.export_watermarks import ExportWatermarks
 
 
 class ProjectRepository(object):
@@ -35,6 +40,12 @@ class ProjectRepository(object):
     def get(self, id):
         return self.db.session.query(Project).get(id)
 
+    def get_many(self, ids):
+        """Return the projects with the given ids, in a single query."""
+        if not ids:
+            return []
+        return self.db.session.query(Project).filter(Project.id.in_(ids)).all()
+
     def get_by_shortname(self, short_name):
         return self.db.session.query(Project).filter_by(short_name=short_name).first()
 
@@ -45,10 +56,12 @@ class ProjectRepository(object):
         return self.db.session.query(Project).all()
 
     def filter_by(self, limit=None, offset=0, yielded=False, last_id=None,
-                  fulltextsearch=None, desc=False, **filters):
+                  fulltextsearch=None, desc=False, fields=None, **filters):
         if filters.get('owner_id'):
             filters['owner_id'] = filters.get('owner_id')
         query = self.db.session.query(Project).filter_by(**filters)
+        if fields:
+            query = query.options(load_only(*fields))
         if last_id:
             query = query.filter(Project.id > last_id)
             query = query.order_by(Project.id).limit(limit)
@@ -63,6 +76,16 @@ class ProjectRepository(object):
             return query.yield_per(limit)
         return query.all()
 
+    def search(self, query, limit=20, offset=0):
+        """Return the published projects matching a full text query, the
+        most relevant first."""
+        tsquery = func.plainto_tsquery(search_config(), query)
+        vector = project_vector()
+        return self.db.session.query(Project)\
+                   .filter(Project.published == True, vector.op('@@')(tsquery))\
+                   .order_by(func.ts_rank(vector, tsquery).desc(), Project.id)\
+                   .limit(limit).offset(offset).all()
+
     def save(self, project):
         self._validate_can_be('saved', project)
         self._empty_strings_to_none(project)
@@ -70,6 +93,7 @@ class ProjectRepository(object):
             self.db.session.add(project)
             self.db.session.commit()
             cached_projects.delete_project(project.short_name)
+            ProjectVersions(sentinel.master).bump(project.id)
         except IntegrityError as e:
             self.db.session.rollback()
             raise DBIntegrityError(e)
@@ -81,6 +105,7 @@ class ProjectRepository(object):
             self.db.session.merge(project)
             self.db.session.commit()
             cached_projects.delete_project(project.short_name)
+            ProjectVersions(sentinel.master).bump(project.id)
         except IntegrityError as e:
             self.db.session.rollback()
             raise DBIntegrityError(e)
@@ -92,6 +117,8 @@ class ProjectRepository(object):
         self.db.session.commit()
         cached_projects.delete_project(project.short_name)
         cached_projects.clean(project.id)
+        ProgressCounters(sentinel.master).reset(project.id)
+        ExportWatermarks(sentinel.master).reset(project.id)
         self._delete_zip_files_from_store(project)
 
 
@@ -109,10 +136,12 @@ class ProjectRepository(object):
 
     def filter_categories_by(self, limit=None, offset=0, yielded=False,
                              last_id=None, fulltextsearch=None,
-                             desc=False, **filters):
+                             desc=False, fields=None, **filters):
         if filters.get('owner_id'):
             del filters['owner_id']
         query = self.db.session.query(Category).filter_by(**filters)
+        if fields:
+            query = query.options(load_only(*fields))
         if last_id:
             query = query.filter(Category.id > last_id)
             query = query.order_by(Category.id).limit(limit)
@@ -161,7 +190,7 @@ class ProjectRepository(object):
             raise WrongObjectError(msg)
 
     def _delete_zip_files_from_store(self, project):
-        from pybossa.core import json_exporter, csv_exporter
+        from pybossa.core import json_exporter, csv_exporter, parquet_exporter
         global uploader
         if uploader is None:
             from pybossa.core import uploader
@@ -169,8 +198,12 @@ class ProjectRepository(object):
         csv_tasks_filename = csv_exporter.download_name(project, 'task')
         json_taskruns_filename = json_exporter.download_name(project, 'task_run')
         csv_taskruns_filename = csv_exporter.download_name(project, 'task_run')
+        parquet_tasks_filename = parquet_exporter.download_name(project, 'task')
+        parquet_taskruns_filename = parquet_exporter.download_name(project, 'task_run')
         container = "user_%s" % project.owner_id
         uploader.delete_file(json_tasks_filename, container)
         uploader.delete_file(csv_tasks_filename, container)
         uploader.delete_file(json_taskruns_filename, container)
         uploader.delete_file(csv_taskruns_filename, container)
+        uploader.delete_file(parquet_tasks_filename, container)
+        uploader.delete_file(parquet_taskruns_filename, container)
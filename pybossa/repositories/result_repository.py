@@ -16,10 +16,15 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import cast, Date
+from sqlalchemy import cast, Date, text
+from sqlalchemy.orm import load_only
 from pybossa.repositories import Repository
 from pybossa.model.result import Result
+from pybossa.model.task import Task
+from pybossa.model.task_run import TaskRun
 from pybossa.exc import WrongObjectError, DBIntegrityError
+from pybossa.core import sentinel
+from pybossa.project_versions import ProjectVersions
 
 
 class ResultRepository(Repository):
@@ -33,12 +38,15 @@ class ResultRepository(Repository):
         return self.db.session.query(Result).filter_by(**attributes).first()
 
     def filter_by(self, limit=None, offset=0, yielded=False,
-                  last_id=None, fulltextsearch=None, desc=False, **filters):
+                  last_id=None, fulltextsearch=None, desc=False,
+                  chunk_size=None, fields=None, **filters):
         if 'last_version' not in filters.keys():
             filters['last_version'] = True
         if filters['last_version'] is False:
             filters.pop('last_version')
         query = self.create_context(filters, fulltextsearch, Result)
+        if fields:
+            query = query.options(load_only(*fields))
         if last_id:
             query = query.filter(Result.id > last_id)
             query = query.order_by(Result.id).limit(limit)
@@ -49,15 +57,55 @@ class ResultRepository(Repository):
             else:
                 query = query.order_by(Result.id).limit(limit).offset(offset)
         if yielded:
-            limit = limit or 1
-            return query.yield_per(limit)
+            return query.yield_per(chunk_size or limit or 1)
         return query.all()
 
+    def filter_results_with_answers(self, project_id, last_id=None,
+                                    until_id=None, chunk_size=1000):
+        """Yield the last version results of a project by id as dicts, each
+        one with its task and its task runs (from task_run_ids) embedded.
+
+        The DB joins them in a single ordered pass, and the rows are fetched
+        with a server side cursor in chunks, so memory use is flat.
+
+        """
+        def columns(model):
+            return ', '.join('%s.%s' % (model.__tablename__, name)
+                             for name in model.column_names())
+        sql = text('''
+                   SELECT {0},
+                       (SELECT row_to_json(t) FROM (
+                           SELECT {1} FROM task
+                           WHERE task.id=result.task_id) AS t) AS task,
+                       (SELECT COALESCE(json_agg(tr ORDER BY tr.id), '[]')
+                        FROM (
+                           SELECT {2} FROM task_run
+                           WHERE task_run.id=ANY(result.task_run_ids)) AS tr)
+                       AS task_runs
+                   FROM result
+                   WHERE result.project_id=:project_id
+                   AND result.last_version=true AND result.id > :last_id
+                   AND (:until_id IS NULL OR result.id < :until_id)
+                   ORDER BY result.id;
+                   '''.format(columns(Result), columns(Task),
+                              columns(TaskRun)))
+        params = dict(project_id=project_id, last_id=last_id or 0,
+                      until_id=until_id)
+        rows = self.db.session.execute(
+            sql.execution_options(stream_results=True), params)
+        while True:
+            chunk = rows.fetchmany(chunk_size)
+            if not chunk:
+                break
+            for row in chunk:
+                yield dict(row)
+
     def update(self, result):
         self._validate_can_be('updated', result)
         try:
             self.db.session.merge(result)
             self.db.session.commit()
+            ProjectVersions(sentinel.master).bump(result.project_id)
         except IntegrityError as e:
             self.db.session.rollback()
             raise DBIntegrityError(e)
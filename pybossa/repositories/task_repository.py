@@ -16,15 +16,23 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 
+from itertools import islice
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import cast, Date
+from sqlalchemy import cast, Date, bindparam
+from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.orm import load_only
 
 from pybossa.repositories import Repository
 from pybossa.model.task import Task
 from pybossa.model.task_run import TaskRun
+from pybossa.model import update_project_timestamp
+from pybossa.model.info_hash import INFO_HASH_INDEX
 from pybossa.exc import WrongObjectError, DBIntegrityError
 from pybossa.cache import projects as cached_projects
-from pybossa.core import uploader
+from pybossa.cache import tasks as cached_tasks
+from pybossa.core import uploader, sentinel
+from pybossa.progress_counters import ProgressCounters
+from pybossa.export_watermarks import ExportWatermarks
 from sqlalchemy import text
 
 
@@ -40,9 +48,16 @@ class TaskRepository(Repository):
 
     def filter_tasks_by(self, limit=None, offset=0, yielded=False,
                         last_id=None, fulltextsearch=None, desc=False,
-                        **filters):
+                        chunk_size=None, fields=None, dictized=False,
+                        until_id=None, **filters):
 
         query = self.create_context(filters, fulltextsearch, Task)
+        if dictized:
+            query, names = self.select_columns(query, Task, fields)
+        elif fields:
+            query = query.options(load_only(*fields))
+        if until_id:
+            query = query.filter(Task.id < until_id)
         if last_id:
             query = query.filter(Task.id > last_id)
             query = query.order_by(Task.id).limit(limit)
@@ -53,9 +68,13 @@ class TaskRepository(Repository):
             else:
                 query = query.order_by(Task.id).limit(limit).offset(offset)
         if yielded:
-            limit = limit or 1
-            return query.yield_per(limit)
-        return query.all()
+            query = query.yield_per(chunk_size or limit or 1)
+        else:
+            query = query.all()
+        if dictized:
+            rows = Task.dictize_rows(query, names)
+            return rows if yielded else list(rows)
+        return query
 
     def count_tasks_with(self, **filters):
         query_args = self.generate_query_from_keywords(Task, **filters)
@@ -74,8 +93,15 @@ class TaskRepository(Repository):
 
     def filter_task_runs_by(self, limit=None, offset=0, last_id=None,
                             yielded=False, fulltextsearch=None,
-                            desc=False, **filters):
+                            desc=False, chunk_size=None, fields=None,
+                            dictized=False, until_id=None, **filters):
         query = self.create_context(filters, fulltextsearch, TaskRun)
+        if dictized:
+            query, names = self.select_columns(query, TaskRun, fields)
+        elif fields:
+            query = query.options(load_only(*fields))
+        if until_id:
+            query = query.filter(TaskRun.id < until_id)
         if last_id:
             query = query.filter(TaskRun.id > last_id)
             query = query.order_by(TaskRun.id).limit(limit)
@@ -86,9 +112,13 @@ class TaskRepository(Repository):
             else:
                 query = query.order_by(TaskRun.id).limit(limit).offset(offset)
         if yielded:
-            limit = limit or 1
-            return query.yield_per(limit)
-        return query.all()
+            query = query.yield_per(chunk_size or limit or 1)
+        else:
+            query = query.all()
+        if dictized:
+            rows = TaskRun.dictize_rows(query, names)
+            return rows if yielded else list(rows)
+        return query
 
     def count_task_runs_with(self, **filters):
         query_args = self.generate_query_from_keywords(TaskRun, **filters)
@@ -99,19 +129,131 @@ class TaskRepository(Repository):
     def save(self, element):
         self._validate_can_be('saved', element)
         try:
-            self.db.session.add(element)
-            self.db.session.commit()
+            self._commit(self.db.session.add, element)
             cached_projects.clean_project(element.project_id)
         except IntegrityError as e:
             self.db.session.rollback()
             raise DBIntegrityError(e)
 
+    def bulk_save(self, tasks, chunk_size=1000):
+        """Insert many tasks at once, setting their IDs.
+
+        The tasks are inserted with multi-row INSERTs in chunks. As that skips
+        the ORM events, the project timestamp, the feed and the caches are
+        updated once per project instead of once per task.
+
+        """
+        from pybossa.model.event_listeners import add_task_event
+        for task in tasks:
+            self._validate_can_be('saved', task)
+        table = Task.__table__
+        projects = dict((task.project_id, task) for task in tasks)
+        try:
+            for start in range(0, len(tasks), chunk_size):
+                chunk = tasks[start:start + chunk_size]
+                rows = [self._insert_values(task) for task in chunk]
+                sql = table.insert().values(rows).returning(table.c.id)
+                ids = [row.id for row in self.db.session.execute(sql)]
+                for task, task_id in zip(chunk, ids):
+                    task.id = task_id
+            conn = self.db.session.connection()
+            for task in projects.values():
+                update_project_timestamp(None, conn, task)
+                add_task_event(None, conn, task)
+            self.db.session.commit()
+        except IntegrityError as e:
+            self.db.session.rollback()
+            raise DBIntegrityError(e)
+        for project_id in projects:
+            cached_projects.clean_project(project_id)
+
+    def import_tasks(self, tasks, chunk_size=1000, callback=None):
+        """Insert the tasks which are not in their project yet, returning
+        how many were inserted.
+
+        tasks can be any iterable, and they are inserted with multi-row
+        INSERTs in chunks, each one committed on its own. The rows whose info
+        hash is already in the project are skipped by the unique index (ON
+        CONFLICT DO NOTHING), so nothing is read back to find them. The
+        project timestamp, the feed and the caches are updated once.
+
+        callback, if given, is called after every chunk with the number of
+        tasks read and inserted so far.
+
+        """
+        from pybossa.model.event_listeners import add_task_event
+        tasks = iter(tasks)
+        projects = {}
+        n_read = n_tasks = 0
+        try:
+            chunk = list(islice(tasks, chunk_size))
+            while chunk:
+                for task in chunk:
+                    self._validate_can_be('saved', task)
+                    projects.setdefault(task.project_id, task)
+                sql, params = self._import_sql(chunk)
+                n_tasks += len(self.db.session.execute(sql, params).fetchall())
+                self.db.session.commit()
+                n_read += len(chunk)
+                if callback is not None:
+                    callback(n_read, n_tasks)
+                chunk = list(islice(tasks, chunk_size))
+            if n_tasks:
+                conn = self.db.session.connection()
+                for task in projects.values():
+                    update_project_timestamp(None, conn, task)
+                    add_task_event(None, conn, task)
+                self.db.session.commit()
+        except IntegrityError as e:
+            self.db.session.rollback()
+            raise DBIntegrityError(e)
+        for project_id in projects:
+            cached_projects.clean_project(project_id)
+        return n_tasks
+
+    def _import_sql(self, tasks):
+        """Return the INSERT ... ON CONFLICT DO NOTHING of some tasks with
+        their info hashes, and its parameters."""
+        names = [column.key for column in Task.__table__.columns
+                 if not column.primary_key]
+        rows = []
+        params = {}
+        for index, task in enumerate(tasks):
+            values = self._insert_values(task)
+            for name in names:
+                params['%s_%d' % (name, index)] = values[name]
+            rows.append('(%s, pybossa_info_hash(CAST(:info_%d AS json)))' % (
+                ', '.join(':%s_%d' % (name, index) for name in names), index))
+        sql = text('INSERT INTO task (%s, info_hash) VALUES %s '
+                   'ON CONFLICT (project_id, info_hash) DO NOTHING '
+                   'RETURNING id' % (', '.join(names), ', '.join(rows)))
+        sql = sql.bindparams(*[bindparam('info_%d' % index, type_=JSON)
+                               for index in range(len(tasks))])
+        return sql, params
+
+    def _insert_values(self, task):
+        """Return the row of a task, filling in the column defaults."""
+        values = {}
+        for column in Task.__table__.columns:
+            if column.primary_key:
+                continue
+            value = getattr(task, column.key)
+            if value is None and column.default is not None:
+                value = column.default.arg
+                if column.default.is_callable:
+                    value = value(None)
+                setattr(task, column.key, value)
+            values[column.key] = value
+        return values
+
     def update(self, element):
         self._validate_can_be('updated', element)
         try:
-            self.db.session.merge(element)
-            self.db.session.commit()
+            self._commit(self.db.session.merge, element)
             cached_projects.clean_project(element.project_id)
+            ExportWatermarks(sentinel.master).reset(element.project_id)
+            if isinstance(element, Task):
+                cached_tasks.delete_task(element.id)
         except IntegrityError as e:
             self.db.session.rollback()
             raise DBIntegrityError(e)
@@ -121,6 +263,9 @@ class TaskRepository(Repository):
         project = element.project
         self.db.session.commit()
         cached_projects.clean_project(element.project_id)
+        ProgressCounters(sentinel.master).reset(element.project_id)
+        if isinstance(element, Task):
+            cached_tasks.delete_task(element.id)
         self._delete_zip_files_from_store(project)
 
     def delete_valid_from_project(self, project):
@@ -134,6 +279,8 @@ class TaskRepository(Repository):
         self.db.session.execute(sql, dict(project_id=project.id))
         self.db.session.commit()
         cached_projects.clean_project(project.id)
+        cached_tasks.reset()
+        ProgressCounters(sentinel.master).reset(project.id)
         self._delete_zip_files_from_store(project)
 
     def delete_taskruns_from_project(self, project):
@@ -143,6 +290,7 @@ class TaskRepository(Repository):
         self.db.session.execute(sql, dict(project_id=project.id))
         self.db.session.commit()
         cached_projects.clean_project(project.id)
+        ProgressCounters(sentinel.master).reset(project.id)
         self._delete_zip_files_from_store(project)
 
     def update_tasks_redundancy(self, project, n_answer):
@@ -168,6 +316,23 @@ class TaskRepository(Repository):
         self.db.session.execute(sql, dict(n_answers=n_answer, project_id=project.id))
         self.db.session.commit()
         cached_projects.clean_project(project.id)
+        cached_tasks.reset()
+        ProgressCounters(sentinel.master).reset(project.id)
+        ExportWatermarks(sentinel.master).reset(project.id)
+
+    def _commit(self, add, element):
+        """Add or merge an element and commit it. If a task with the same
+        info was committed meanwhile, it is done once more, so the info hash
+        trigger sees that task and leaves the hash of this one empty."""
+        try:
+            add(element)
+            self.db.session.commit()
+        except IntegrityError as e:
+            if INFO_HASH_INDEX not in str(e.orig):
+                raise
+            self.db.session.rollback()
+            add(element)
+            self.db.session.commit()
 
     def _validate_can_be(self, action, element):
         if not isinstance(element, Task) and not isinstance(element, TaskRun):
@@ -182,7 +347,7 @@ class TaskRepository(Repository):
         self.db.session.delete(inst)
 
     def _delete_zip_files_from_store(self, project):
-        from pybossa.core import json_exporter, csv_exporter
+        from pybossa.core import json_exporter, csv_exporter, parquet_exporter
         global uploader
         if uploader is None:
             from pybossa.core import uploader
@@ -190,8 +355,13 @@ class TaskRepository(Repository):
         csv_tasks_filename = csv_exporter.download_name(project, 'task')
         json_taskruns_filename = json_exporter.download_name(project, 'task_run')
         csv_taskruns_filename = csv_exporter.download_name(project, 'task_run')
+        parquet_tasks_filename = parquet_exporter.download_name(project, 'task')
+        parquet_taskruns_filename = parquet_exporter.download_name(project, 'task_run')
         container = "user_%s" % project.owner_id
         uploader.delete_file(json_tasks_filename, container)
         uploader.delete_file(csv_tasks_filename, container)
         uploader.delete_file(json_taskruns_filename, container)
         uploader.delete_file(csv_taskruns_filename, container)
+        uploader.delete_file(parquet_tasks_filename, container)
+        uploader.delete_file(parquet_taskruns_filename, container)
+        ExportWatermarks(sentinel.master).reset(project.id)
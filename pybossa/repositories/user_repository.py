@@ -17,10 +17,12 @@
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 
 from sqlalchemy import or_, func
+from sqlalchemy.orm import load_only
 from sqlalchemy.exc import IntegrityError
 
 from pybossa.model.user import User
 from pybossa.exc import WrongObjectError, DBIntegrityError
+from pybossa.cache import users as cached_users
 
 
 class UserRepository(object):
@@ -41,10 +43,12 @@ class UserRepository(object):
         return self.db.session.query(User).all()
 
     def filter_by(self, limit=None, offset=0, yielded=False, last_id=None,
-                  fulltextsearch=None, desc=False, **filters):
+                  fulltextsearch=None, desc=False, fields=None, **filters):
         if filters.get('owner_id'):
             del filters['owner_id']
         query = self.db.session.query(User).filter_by(**filters)
+        if fields:
+            query = query.options(load_only(*fields))
         if last_id:
             query = query.filter(User.id > last_id)
             query = query.order_by(User.id).limit(limit)
@@ -79,6 +83,7 @@ class UserRepository(object):
         try:
             self.db.session.merge(new_user)
             self.db.session.commit()
+            cached_users.delete_user_by_api_key(new_user.api_key)
         except IntegrityError as e:
             self.db.session.rollback()
             raise DBIntegrityError(e)
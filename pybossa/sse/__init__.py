@@ -0,0 +1,62 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Server Sent Events module for PYBOSSA.
+
+This module exports:
+    * channel_name: the Redis channel used for a project stream
+    * gateway_for: the SSE gateway shard that serves a channel
+    * gateway_url: a signed URL for streaming a channel from its gateway
+
+The gateway itself lives in pybossa.sse.gateway, and it is run as a separate
+service (see sse_gateway.py) so the web workers are never blocked by streams.
+
+"""
+import zlib
+from urllib import urlencode
+from flask import current_app
+from pybossa.core import signer
+
+
+def channel_name(channel_type, short_name):
+    """Return the Redis channel for a project stream."""
+    return "channel_%s_%s" % (channel_type, short_name)
+
+
+def gateway_for(channel, gateways):
+    """Return the gateway shard for a channel.
+
+    All the clients of a channel are sent to the same shard, so every channel
+    holds at most one Redis subscription across all the gateways.
+
+    """
+    if not gateways:
+        return None
+    shard = (zlib.crc32(channel) & 0xffffffff) % len(gateways)
+    return gateways[shard]
+
+
+def gateway_url(short_name, channel_type):
+    """Return a signed gateway URL for a project stream or None."""
+    channel = channel_name(channel_type, short_name)
+    gateway = gateway_for(channel,
+                          current_app.config.get('SSE_GATEWAY_URLS'))
+    if gateway is None:
+        return None
+    token = signer.dumps(dict(channel=channel))
+    return '%s/stream?%s' % (gateway.rstrip('/'), urlencode(dict(token=token)))
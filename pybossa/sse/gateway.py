@@ -0,0 +1,190 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+"""
+SSE gateway for PYBOSSA project event streams.
+
+This module exports:
+    * Subscriber class: a bounded queue of events for one client
+    * Hub class: fans out Redis channel messages to the subscribers
+    * SSEGateway class: the WSGI application that serves the streams
+
+It requires gevent, and it is meant to be run with a gevent WSGI server (see
+sse_gateway.py) instead of the regular web workers.
+
+"""
+from collections import defaultdict
+
+import gevent
+from gevent.queue import Queue, Empty, Full
+from itsdangerous import BadData
+from werkzeug.wrappers import Request, Response
+
+
+class Subscriber(object):
+
+    """A client connected to a channel, with a bounded queue of events."""
+
+    def __init__(self, channel, remote_addr, max_queued):
+        self.channel = channel
+        self.remote_addr = remote_addr
+        self.queue = Queue(maxsize=max_queued)
+        self.closed = False
+
+    def put(self, data):
+        """Queue an event, closing the subscriber if it is too slow."""
+        try:
+            self.queue.put_nowait(data)
+        except Full:
+            self.close()
+
+    def close(self):
+        """Close the subscriber, its stream will end on the next read."""
+        self.closed = True
+        try:
+            self.queue.put_nowait(StopIteration)
+        except Full:
+            pass
+
+    def events(self, heartbeat):
+        """Yield SSE formatted events, sending a heartbeat while idle."""
+        while not self.closed:
+            try:
+                data = self.queue.get(timeout=heartbeat)
+            except Empty:
+                yield ': heartbeat\n\n'
+                continue
+            if data is StopIteration or self.closed:
+                break
+            yield 'data: %s\n\n' % data
+
+
+class Hub(object):
+
+    """
+    Fan out Redis pub/sub messages to many subscribers.
+
+    It holds a single Redis pubsub connection, subscribed only to the channels
+    with at least one client connected.
+
+    """
+
+    def __init__(self, redis, max_connections, max_connections_per_ip,
+                 max_queued):
+        self.redis = redis
+        self.max_connections = max_connections
+        self.max_connections_per_ip = max_connections_per_ip
+        self.max_queued = max_queued
+        self.pubsub = redis.pubsub()
+        self.channels = defaultdict(set)
+        self.connections_per_ip = defaultdict(int)
+        self.n_connections = 0
+        self._listener = None
+
+    def can_accept(self, remote_addr):
+        """Return True if a new connection is within the limits."""
+        if self.n_connections >= self.max_connections:
+            return False
+        return (self.connections_per_ip[remote_addr] <
+                self.max_connections_per_ip)
+
+    def subscribe(self, channel, remote_addr):
+        """Return a new subscriber for a channel."""
+        subscriber = Subscriber(channel, remote_addr, self.max_queued)
+        if not self.channels[channel]:
+            self.pubsub.subscribe(channel)
+        self.channels[channel].add(subscriber)
+        self.connections_per_ip[remote_addr] += 1
+        self.n_connections += 1
+        self._ensure_listener()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber, releasing the channel if it was the last."""
+        subscribers = self.channels.get(subscriber.channel)
+        if not subscribers or subscriber not in subscribers:
+            return
+        subscribers.remove(subscriber)
+        self.n_connections -= 1
+        self.connections_per_ip[subscriber.remote_addr] -= 1
+        if self.connections_per_ip[subscriber.remote_addr] <= 0:
+            del self.connections_per_ip[subscriber.remote_addr]
+        if not subscribers:
+            del self.channels[subscriber.channel]
+            self.pubsub.unsubscribe(subscriber.channel)
+
+    def publish(self, channel, data):
+        """Send data to every subscriber of a channel."""
+        for subscriber in list(self.channels.get(channel, ())):
+            subscriber.put(data)
+            if subscriber.closed:
+                self.unsubscribe(subscriber)
+
+    def _ensure_listener(self):
+        if self._listener is None or self._listener.dead:
+            self._listener = gevent.spawn(self._listen)
+
+    def _listen(self):
+        for message in self.pubsub.listen():
+            if message['type'] == 'message':
+                self.publish(message['channel'], message['data'])
+
+
+class SSEGateway(object):
+
+    """WSGI application serving project streams from a Hub."""
+
+    def __init__(self, hub, signer, heartbeat=15, token_timeout=60):
+        self.hub = hub
+        self.signer = signer
+        self.heartbeat = heartbeat
+        self.token_timeout = token_timeout
+
+    def __call__(self, environ, start_response):
+        request = Request(environ)
+        response = self.dispatch(request)
+        return response(environ, start_response)
+
+    def dispatch(self, request):
+        """Return the stream response for a request."""
+        if request.path.rstrip('/') != '/stream':
+            return Response('Not Found', status=404)
+        try:
+            payload = self.signer.loads(request.args.get('token', ''),
+                                        max_age=self.token_timeout)
+            channel = payload['channel']
+        except (BadData, KeyError, TypeError):
+            return Response('Forbidden', status=403)
+        remote_addr = request.remote_addr
+        if not self.hub.can_accept(remote_addr):
+            return Response('Too Many Connections', status=503,
+                            headers={'Retry-After': str(self.heartbeat)})
+        subscriber = self.hub.subscribe(channel, remote_addr)
+        headers = {'Cache-Control': 'no-cache',
+                   'X-Accel-Buffering': 'no',
+                   'Access-Control-Allow-Origin': '*'}
+        return Response(self._stream(subscriber),
+                        mimetype='text/event-stream',
+                        headers=headers,
+                        direct_passthrough=True)
+
+    def _stream(self, subscriber):
+        try:
+            for event in subscriber.events(self.heartbeat):
+                yield event
+        finally:
+            self.hub.unsubscribe(subscriber)
@@ -24,7 +24,9 @@ This module exports:
 
 """
 import sys
+import tempfile
 from PIL import Image
+from werkzeug.datastructures import FileStorage
 
 
 class Uploader(object):
@@ -98,6 +100,24 @@ class Uploader(object):
         else:
             return False
 
+    def upload_chunks(self, chunks, filename, container):
+        """Upload a file from an iterable of chunks of bytes.
+
+        The chunks are spooled to a temporary file, as the generic uploader
+        needs the whole file. Override to stream them instead.
+        """
+        if not self.allowed_file(filename):
+            return False
+        spool = tempfile.TemporaryFile()
+        try:
+            for chunk in chunks:
+                spool.write(chunk)
+            spool.seek(0)
+            return self._upload_file(FileStorage(filename=filename,
+                                                 stream=spool), container)
+        finally:
+            spool.close()
+
     def external_url_handler(self, error, endpoint, values):
         """Build up an external URL when url_for cannot build a URL."""
         # This is an example of hooking the build_error_handler.
@@ -25,6 +25,7 @@ This module exports:
 """
 from pybossa.uploader import Uploader
 import os
+import tempfile
 from werkzeug import secure_filename
 
 
@@ -64,6 +65,33 @@ class LocalUploader(Uploader):
         except Exception:
             return False
 
+    def upload_chunks(self, chunks, filename, container):
+        """Write a file from an iterable of chunks into a container/folder.
+
+        The chunks go to a hidden file in the container, renamed once it is
+        complete, so the file is never seen half written.
+        """
+        if not self.allowed_file(filename):
+            return False
+        try:
+            folder = os.path.join(self.upload_folder, container)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            part = tempfile.NamedTemporaryFile(dir=folder, prefix='.',
+                                               suffix='.part', delete=False)
+            try:
+                with part:
+                    for chunk in chunks:
+                        part.write(chunk)
+                os.rename(part.name,
+                          os.path.join(folder, secure_filename(filename)))
+            except Exception:
+                os.remove(part.name)
+                raise
+            return True
+        except Exception:
+            return False
+
     def delete_file(self, name, container):
         """Delete file from filesystem."""
         try:
@@ -336,6 +336,18 @@ def with_cache_disabled(f):
     return wrapper
 
 
+def with_analytics_bind(f):
+    """Decorator that sends the reads of a function to the ANALYTICS_BIND
+    database, if it is configured.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        from pybossa.core import db
+        with db.read_from(current_app.config.get('ANALYTICS_BIND')):
+            return f(*args, **kwargs)
+    return wrapper
+
+
 def is_reserved_name(blueprint, name):
     """Check if a name has already been registered inside a blueprint URL."""
     path = ''.join(['/', blueprint])
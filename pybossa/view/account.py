@@ -657,9 +657,11 @@ def reset_api_key(name):
     if not user:
         return abort(404)
     ensure_authorized_to('update', user)
+    old_api_key = user.api_key
     user.api_key = model.make_uuid()
     user_repo.update(user)
     cached_users.delete_user_summary(user.name)
+    cached_users.delete_user_by_api_key(old_api_key)
     msg = gettext('New API-KEY generated')
     flash(msg, 'success')
     return redirect(url_for('account.profile', name=name))
@@ -16,7 +16,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 """Home view for PYBOSSA."""
-from flask import current_app, abort
+from flask import current_app, abort, request
 from flask.ext.login import current_user
 from pybossa.model.category import Category
 from flask import Blueprint
@@ -25,6 +25,7 @@ from pybossa.cache import projects as cached_projects
 from pybossa.cache import users as cached_users
 from pybossa.cache import categories as cached_cat
 from pybossa.util import rank
+from pybossa.core import project_repo
 from jinja2.exceptions import TemplateNotFound
 
 
@@ -74,7 +75,13 @@ def about():
 @blueprint.route("search")
 def search():
     """Render search results page."""
-    return render_template("/home/search.html")
+    query = request.args.get('q')
+    per_page = current_app.config.get('APPS_PER_PAGE')
+    projects = []
+    if query:
+        projects = project_repo.search(query, limit=per_page)
+    return render_template("/home/search.html", query=query,
+                           projects=projects)
 
 @blueprint.route("results")
 def result():
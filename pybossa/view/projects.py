@@ -33,7 +33,7 @@ from rq import Queue
 import pybossa.sched as sched
 
 from pybossa.core import (uploader, signer, sentinel, json_exporter,
-    csv_exporter, importer, sentinel)
+    csv_exporter, parquet_exporter, importer, sentinel)
 from pybossa.model import make_uuid
 from pybossa.model.project import Project
 from pybossa.model.category import Category
@@ -53,14 +53,18 @@ from pybossa.extensions import misaka
 from pybossa.cookies import CookieHandler
 from pybossa.password_manager import ProjectPasswdManager
 from pybossa.jobs import import_tasks, IMPORT_TASKS_TIMEOUT, webhook
+from pybossa.jobs import export_to_ckan, CKAN_EXPORT_TIMEOUT
 from pybossa.forms.projects_view_forms import *
 from pybossa.importers import BulkImportException
 from pybossa.pro_features import ProFeatureHandler
 
 from pybossa.core import project_repo, user_repo, task_repo, blog_repo
-from pybossa.core import webhook_repo, auditlog_repo
+from pybossa.core import webhook_repo, auditlog_repo, result_repo
 from pybossa.auditlogger import AuditLogger
 from pybossa.contributions_guard import ContributionsGuard
+from pybossa.export_watermarks import ExportWatermarks
+from pybossa.import_checkpoints import ImportCheckpoints
+from pybossa.sse import gateway_url, channel_name
 
 blueprint = Blueprint('project', __name__)
 
@@ -70,6 +74,9 @@ importer_queue = Queue('medium',
                        connection=sentinel.master,
                        default_timeout=IMPORT_TASKS_TIMEOUT)
 webhook_queue = Queue('high', connection=sentinel.master)
+ckan_queue = Queue('low',
+                   connection=sentinel.master,
+                   default_timeout=CKAN_EXPORT_TIMEOUT)
 
 def project_title(project, page_name):
     if not project:  # pragma: no cover
@@ -889,11 +896,15 @@ def tasks(short_name):
     project = add_custom_contrib_button_to(project, get_user_id_or_ip())
     feature_handler = ProFeatureHandler(current_app.config.get('PRO_FEATURES'))
     autoimporter_enabled = feature_handler.autoimporter_enabled_for(current_user)
+    # Rows imported so far by the import jobs still running or stopped
+    import_progress = ImportCheckpoints(sentinel.master).get_progress(
+        project.get('id'))
     return render_template('/projects/tasks.html',
                            title=title,
                            project=project,
                            owner=owner,
                            autoimporter_enabled=autoimporter_enabled,
+                           import_progress=import_progress,
                            n_tasks=n_tasks,
                            n_task_runs=n_task_runs,
                            overall_progress=overall_progress,
@@ -903,6 +914,30 @@ def tasks(short_name):
                            pro_features=pro)
 
 
+@blueprint.route('/<short_name>/tasks/progress')
+def jobs_progress(short_name):
+    """Return the progress of the import, export and CKAN jobs of a project
+    in JSON, so the pages can follow them."""
+    (project, owner, n_tasks, n_task_runs,
+     overall_progress, last_activity,
+     n_results) = project_by_shortname(short_name)
+
+    if project.needs_password():
+        redirect_to_password = _check_if_redirect_to_password(project)
+        if redirect_to_password:
+            return redirect_to_password
+    else:
+        ensure_authorized_to('read', project)
+
+    watermarks = ExportWatermarks(sentinel.master)
+    progress = dict(
+        import_progress=ImportCheckpoints(sentinel.master).get_progress(
+            project.id),
+        export_progress=watermarks.get_progress(project.id),
+        ckan_progress=watermarks.get_ckan_progress(project.id))
+    return Response(json.dumps(progress), mimetype='application/json')
+
+
 @blueprint.route('/<short_name>/tasks/browse', defaults={'page': 1})
 @blueprint.route('/<short_name>/tasks/browse/<int:page>')
 def tasks_browse(short_name, page):
@@ -998,6 +1033,11 @@ def export_to(short_name):
         ensure_authorized_to('read', project)
 
     def respond():
+        # Shards done of the ZIPs being exported in shards, by filename
+        watermarks = ExportWatermarks(sentinel.master)
+        export_progress = watermarks.get_progress(project.id)
+        # Chunks done of the last CKAN sync, by type
+        ckan_progress = watermarks.get_ckan_progress(project.id)
         return render_template('/projects/export.html',
                                title=title,
                                loading_text=loading_text,
@@ -1009,40 +1049,49 @@ def export_to(short_name):
                                n_volunteers=n_volunteers,
                                n_completed_tasks=n_completed_tasks,
                                overall_progress=overall_progress,
+                               export_progress=export_progress,
+                               ckan_progress=ckan_progress,
                                pro_features=pro)
 
     def respond_json(ty):
-        if ty not in ['task', 'task_run']:
+        if ty not in ['task', 'task_run', 'result']:
             return abort(404)
         res = json_exporter.response_zip(project, ty)
         return res
 
     def respond_csv(ty):
-        if ty not in ('task', 'task_run'):
+        if ty not in ('task', 'task_run', 'result'):
             return abort(404)
         res = csv_exporter.response_zip(project, ty)
         return res
 
-    def create_ckan_datastore(ckan, table, package_id, records):
+    def respond_parquet(ty):
+        if ty not in ('task', 'task_run', 'result'):
+            return abort(404)
+        res = parquet_exporter.response_zip(project, ty)
+        return res
+
+    def create_ckan_datastore(ckan, table, package_id):
         new_resource = ckan.resource_create(name=table,
                                             package_id=package_id)
         ckan.datastore_create(name=table,
                               resource_id=new_resource['result']['id'])
-        ckan.datastore_upsert(name=table,
-                              records=records,
-                              resource_id=new_resource['result']['id'])
+        return new_resource['result']['id']
 
     def respond_ckan(ty):
+        if ty not in ('task', 'task_run'):
+            return abort(404)
         # First check if there is a package (dataset) in CKAN
-        msg_1 = gettext("Data exported to ")
+        msg_1 = gettext("Data is being exported to ")
         msg = msg_1 + "%s ..." % current_app.config['CKAN_URL']
         ckan = Ckan(url=current_app.config['CKAN_URL'],
                     api_key=current_user.ckan_api)
         project_url = url_for('.details', short_name=project.short_name, _external=True)
+        watermarks = ExportWatermarks(sentinel.master)
+        append = False
 
         try:
             package, e = ckan.package_exists(name=project.short_name)
-            records = json_exporter.gen_json(ty, project.id)
             if e:
                 raise e
             if package:
@@ -1056,20 +1105,31 @@ def export_to(short_name):
                 resource_found = False
                 for r in package['resources']:
                     if r['name'] == ty:
-                        ckan.datastore_delete(name=ty, resource_id=r['id'])
-                        ckan.datastore_create(name=ty, resource_id=r['id'])
-                        ckan.datastore_upsert(name=ty,
-                                              records=records,
-                                              resource_id=r['id'])
+                        resource_id = r['id']
+                        # Task runs never change, so if they were synced
+                        # only the new ones are sent
+                        append = (ty in json_exporter.append_only and
+                                  watermarks.get_ckan_sync(
+                                      project.id, resource_id) is not None)
+                        if not append:
+                            ckan.datastore_delete(name=ty,
+                                                  resource_id=resource_id)
+                            ckan.datastore_create(name=ty,
+                                                  resource_id=resource_id)
                         resource_found = True
                         break
                 if not resource_found:
-                    create_ckan_datastore(ckan, ty, package['id'], records)
+                    resource_id = create_ckan_datastore(ckan, ty,
+                                                        package['id'])
             else:
                 owner = user_repo.get(project.owner_id)
                 package = ckan.package_create(project=project, user=owner,
                                               url=project_url)
-                create_ckan_datastore(ckan, ty, package['id'], records)
+                resource_id = create_ckan_datastore(ckan, ty, package['id'])
+            if not append:
+                watermarks.set_ckan_sync(project.id, resource_id, None)
+            ckan_queue.enqueue(export_to_ckan, project.id, ty, resource_id,
+                               current_user.id, append=append)
             flash(msg, 'success')
             return respond()
         except requests.exceptions.ConnectionError:
@@ -1089,6 +1149,8 @@ def export_to(short_name):
             return respond()
 
     export_formats = ["json", "csv"]
+    if parquet_exporter.enabled:
+        export_formats.append('parquet')
     if current_user.is_authenticated():
         if current_user.ckan_api:
             export_formats.append('ckan')
@@ -1112,8 +1174,13 @@ def export_to(short_name):
         task_run = task_repo.get_task_run_by(project_id=project.id)
         if task_run:
             ensure_authorized_to('read', task_run)
+    if ty == 'result':
+        result = result_repo.get_by(project_id=project.id)
+        if result:
+            ensure_authorized_to('read', result)
 
-    return {"json": respond_json, "csv": respond_csv, 'ckan': respond_ckan}[fmt](ty)
+    return {"json": respond_json, "csv": respond_csv,
+            'parquet': respond_parquet, 'ckan': respond_ckan}[fmt](ty)
 
 
 @blueprint.route('/<short_name>/stats')
@@ -1575,7 +1642,7 @@ def publish(short_name):
 def project_event_stream(short_name, channel_type):
     """Event stream for pub/sub notifications."""
     pubsub = sentinel.master.pubsub()
-    channel = "channel_%s_%s" % (channel_type, short_name)
+    channel = channel_name(channel_type, short_name)
     pubsub.subscribe(channel)
     for message in pubsub.listen():
         yield 'data: %s\n\n' % message['data']
@@ -1590,6 +1657,9 @@ def project_stream_uri_private(short_name):
          overall_progress, last_activity,
          n_results) = project_by_shortname(short_name)
         if (current_user.id == project.owner_id or current_user.admin):
+            url = gateway_url(short_name, 'private')
+            if url:
+                return redirect(url)
             return Response(project_event_stream(short_name, 'private'),
                             mimetype="text/event-stream",
                             direct_passthrough=True)
@@ -1606,6 +1676,9 @@ def project_stream_uri_public(short_name):
         (project, owner, n_tasks, n_task_runs,
          overall_progress, last_activity,
          n_results) = project_by_shortname(short_name)
+        url = gateway_url(short_name, 'public')
+        if url:
+            return redirect(url)
         return Response(project_event_stream(short_name, 'public'),
                         mimetype="text/event-stream")
     else:
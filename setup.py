@@ -62,6 +62,10 @@ setup(
     version = '2.3.0',
     packages = find_packages(),
     install_requires = requirements,
+    extras_require = {
+        'parquet': ["pyarrow>=0.15, <0.17"],   # last versions with Python 2
+        'sse_gateway': ["gevent>=1.1, <1.2"],
+    },
     # only needed when installing directly from setup.py (PyPi, eggs?) and pointing to e.g. a git repo.
     # Keep in mind that dependency_links are not used when installing with requirements.txt
     # and need to be added redundant to requirements.txt in this case!
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+
+from gevent import monkey
+monkey.patch_all()
+
+import sys
+from gevent.pywsgi import WSGIServer
+
+from pybossa.core import create_app, sentinel, signer
+from pybossa.sse.gateway import Hub, SSEGateway
+
+app = create_app(run_as_server=False)
+
+if __name__ == "__main__":  # pragma: no cover
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5050
+    config = app.config
+    hub = Hub(sentinel.master,
+              max_connections=config['SSE_GATEWAY_MAX_CONNECTIONS'],
+              max_connections_per_ip=config['SSE_GATEWAY_MAX_CONNECTIONS_PER_IP'],
+              max_queued=config['SSE_GATEWAY_CLIENT_QUEUE'])
+    gateway = SSEGateway(hub, signer,
+                         heartbeat=config['SSE_GATEWAY_HEARTBEAT'],
+                         token_timeout=config['SSE_GATEWAY_TOKEN_TIMEOUT'])
+    WSGIServer((config['HOST'], port), gateway).serve_forever()
@@ -419,6 +419,16 @@ class FakeResponse(object):
     def __init__(self, **kwargs):
         self.__dict__.update(**kwargs)
 
+    def iter_content(self, chunk_size=1):
+        content = self.text
+        if isinstance(content, unicode):
+            content = content.encode('utf-8')
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
 
 def mock_contributions_guard(stamped=True, timestamp='2015-11-18T16:29:25.496327'):
     fake_guard_instance = MagicMock()
@@ -251,3 +251,54 @@ class TestApiCommon(TestAPI):
                      'Access-Control-Request-Headers': header}
             res = self.app.options('/api/project/1', headers=headers)
             assert res.headers['Access-Control-Allow-Headers'] == header, err_msg
+
+    @with_context
+    def test_fast_path_anonymous_requests_skip_the_session(self):
+        """Test API anonymous requests without cookies get no session cookie"""
+        ProjectFactory.create()
+
+        res = self.app.get('/api/project')
+
+        assert res.status_code == 200, res.status_code
+        assert 'Set-Cookie' not in res.headers, res.headers
+
+    @with_context
+    def test_fast_path_token_requests_skip_the_session(self):
+        """Test API token authenticated requests are served without session"""
+        owner = UserFactory.create()
+        project = ProjectFactory.create(owner=owner, published=False)
+
+        url = '/api/project/%s?api_key=%s' % (project.id, owner.api_key)
+        res = self.app.get(url)
+
+        assert res.status_code == 200, res.status_code
+        assert 'Set-Cookie' not in res.headers, res.headers
+
+    @with_context
+    def test_session_cookie_requests_use_the_session(self):
+        """Test API requests with a session cookie are still authenticated"""
+        owner = UserFactory.create()
+        project = ProjectFactory.create(owner=owner, published=False)
+        url = '/api/project/%s' % project.id
+
+        res = self.app.get(url)
+        assert res.status_code == 401, res.status_code
+
+        with self.app.session_transaction() as session:
+            session['user_id'] = owner.name
+        res = self.app.get(url)
+        assert res.status_code == 200, res.status_code
+
+    @with_context
+    def test_session_cookie_requests_with_authorization_use_the_session(self):
+        """Test API requests with a session cookie and an Authorization header
+        (e.g. a project JWT) keep the session user"""
+        owner = UserFactory.create()
+        project = ProjectFactory.create(owner=owner, published=False)
+        url = '/api/project/%s' % project.id
+        headers = {'Authorization': 'Bearer some-project-jwt'}
+
+        with self.app.session_transaction() as session:
+            session['user_id'] = owner.name
+        res = self.app.get(url, headers=headers)
+        assert res.status_code == 200, res.status_code
@@ -17,6 +17,7 @@
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 import json
 from mock import patch, call
+from sqlalchemy import event
 from default import db, with_context
 from nose.tools import assert_equal, assert_raises
 from test_api import TestAPI
@@ -101,6 +102,42 @@ class TestProjectAPI(TestAPI):
         assert data[0]['updated'] == projects[len(projects)-1].updated, err_msg
 
 
+    @with_context
+    def test_project_query_fields_queries(self):
+        """Test API project query with sparse fields does not load the
+        columns needed to authorize the projects one by one"""
+        user = UserFactory.create()
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        def queries(n_projects):
+            ProjectFactory.create_batch(n_projects, published=False)
+            del statements[:]
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                res = self.app.get('/api/project?fields=name&links=0'
+                                   '&limit=100&api_key=%s' % user.api_key)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+            assert res.status_code == 200, res.data
+            return len(statements)
+
+        assert queries(2) == queries(6), statements
+
+    @with_context
+    def test_project_query_fields_only_returns_those(self):
+        """Test API project query with sparse fields does not return the
+        columns needed to authorize the projects"""
+        ProjectFactory.create()
+
+        res = self.app.get('/api/project?fields=id,name&links=0')
+        data = json.loads(res.data)
+
+        assert res.status_code == 200, res.data
+        assert sorted(data[0].keys()) == ['id', 'name'], data
+
     @with_context
     def test_project_query_with_context(self):
         """ Test API project query with context."""
@@ -706,6 +743,74 @@ class TestProjectAPI(TestAPI):
         assert len(taskruns) + 1 == data['done'], error_msg
 
 
+    @with_context
+    def test_user_progress_conditional_get(self):
+        """Test API userprogress answers 304 until the user contributes"""
+        user = UserFactory.create()
+        project = ProjectFactory.create(owner=user)
+        tasks = TaskFactory.create_batch(2, project=project)
+        url = '/api/project/%s/userprogress?api_key=%s' % (project.id,
+                                                           user.api_key)
+
+        res = self.app.get(url)
+        etag = res.headers['ETag']
+        res = self.app.get(url, headers=[('If-None-Match', etag)])
+        assert res.status_code == 304, res.status_code
+
+        # Anonymous users get their own ETag
+        url_anon = '/api/project/%s/userprogress' % project.id
+        res = self.app.get(url_anon, headers=[('If-None-Match', etag)])
+        assert res.status_code == 200, res.status_code
+
+        TaskRunFactory.create(task=tasks[0], user=user)
+        res = self.app.get(url, headers=[('If-None-Match', etag)])
+        assert res.status_code == 200, res.status_code
+        assert json.loads(res.data)['done'] == 1, res.data
+
+    @with_context
+    def test_user_progress_available(self):
+        """Test API userprogress returns the tasks the user can contribute to"""
+        user = UserFactory.create()
+        project = ProjectFactory.create(owner=user)
+        tasks = TaskFactory.create_batch(3, project=project)
+        url = '/api/project/%s/userprogress?api_key=%s' % (project.id,
+                                                           user.api_key)
+
+        data = json.loads(self.app.get(url).data)
+        assert data['done'] == 0, data
+        assert data['available'] == 3, data
+
+        TaskRunFactory.create(task=tasks[0], user=user)
+
+        data = json.loads(self.app.get(url).data)
+        assert data['done'] == 1, data
+        assert data['available'] == 2, data
+
+        # Deleting the task runs resets the counters
+        task_repo.delete_taskruns_from_project(project)
+
+        data = json.loads(self.app.get(url).data)
+        assert data['done'] == 0, data
+        assert data['available'] == 3, data
+
+    @with_context
+    def test_project_get_conditional(self):
+        """Test API GET project answers 304 until the project is updated"""
+        project = ProjectFactory.create()
+        url = '/api/project/%s' % project.id
+
+        res = self.app.get(url)
+        etag = res.headers['ETag']
+        res = self.app.get(url, headers=[('If-None-Match', etag)])
+        assert res.status_code == 304, res.status_code
+
+        project.description = 'new description'
+        project_repo.update(project)
+        res = self.app.get(url, headers=[('If-None-Match', etag)])
+        assert res.status_code == 200, res.status_code
+        assert json.loads(res.data)['description'] == 'new description'
+
+
     @with_context
     def test_delete_project_cascade(self):
         """Test API delete project deletes associated tasks and taskruns"""
@@ -830,7 +935,9 @@ class TestProjectAPI(TestAPI):
         expected = [call('1_project1_task_json.zip', 'user_1'),
                     call('1_project1_task_csv.zip', 'user_1'),
                     call('1_project1_task_run_json.zip', 'user_1'),
-                    call('1_project1_task_run_csv.zip', 'user_1')]
+                    call('1_project1_task_run_csv.zip', 'user_1'),
+                    call('1_project1_task_parquet.zip', 'user_1'),
+                    call('1_project1_task_run_parquet.zip', 'user_1')]
         assert uploader.delete_file.call_args_list == expected
 
     def test_project_post_with_reserved_fields_returns_error(self):
@@ -428,3 +428,22 @@ class TestResultAPI(TestAPI):
                 assert r.last_version is True, r.last_version
             else:
                 assert r.last_version is False, r.last_version
+
+    @with_context
+    def test_result_stream_with_answers(self):
+        """Test API Result stream embeds the task and task runs."""
+        result = self.create_result(n_answers=2)
+        url = '/api/result?stream=1&answers=1&project_id=%s' % result.project_id
+        res = self.app.get(url)
+        assert res.mimetype == 'application/x-ndjson', res
+        lines = [json.loads(line) for line in res.data.splitlines()]
+        assert len(lines) == 1, lines
+        assert lines[0]['task']['id'] == result.task_id, lines
+        assert sorted(tr['id'] for tr in lines[0]['task_runs']) == sorted(
+            result.task_run_ids), lines
+
+    @with_context
+    def test_result_stream_with_answers_needs_project_id(self):
+        """Test API Result stream with answers needs a project_id."""
+        res = self.app.get('/api/result?stream=1&answers=1')
+        assert res.status_code == 400, res.status_code
@@ -16,6 +16,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 import json
+from sqlalchemy import event
 from default import db, with_context
 from nose.tools import assert_equal
 from test_api import TestAPI
@@ -104,6 +105,120 @@ class TestTaskAPI(TestAPI):
         assert len(tasks) == 20, tasks
 
 
+    @with_context
+    def test_task_query_stream(self):
+        """Test API Task query as a NDJSON stream works"""
+        project = ProjectFactory.create()
+        tasks = TaskFactory.create_batch(110, project=project,
+                                         info={'question': 'answer'})
+
+        res = self.app.get('/api/task?stream=1')
+        assert res.mimetype == 'application/x-ndjson', res
+        lines = res.data.splitlines()
+        assert len(lines) == 110, len(lines)
+        ids = [json.loads(line)['id'] for line in lines]
+        assert ids == sorted(task.id for task in tasks), ids
+
+        # It should start after last_id
+        url = '/api/task?stream=1&last_id=%s' % tasks[99].id
+        res = self.app.get(url)
+        lines = res.data.splitlines()
+        assert len(lines) == 10, len(lines)
+
+        # It should also be requested with the Accept header
+        headers = [('Accept', 'application/x-ndjson')]
+        res = self.app.get('/api/task?project_id=%s' % project.id,
+                           headers=headers)
+        assert res.mimetype == 'application/x-ndjson', res
+        assert len(res.data.splitlines()) == 110
+
+    @with_context
+    def test_task_query_fields_and_links(self):
+        """Test API Task query with sparse fields and no links works"""
+        project = ProjectFactory.create()
+        TaskFactory.create_batch(3, project=project,
+                                 info={'question': 'answer'})
+
+        res = self.app.get('/api/task?fields=id,state')
+        tasks = json.loads(res.data)
+        assert len(tasks) == 3, tasks
+        for task in tasks:
+            assert sorted(task.keys()) == ['id', 'link', 'links', 'state'], task
+
+        res = self.app.get('/api/task?fields=id,state&links=0')
+        tasks = json.loads(res.data)
+        for task in tasks:
+            assert sorted(task.keys()) == ['id', 'state'], task
+
+        res = self.app.get('/api/task?links=0')
+        task = json.loads(res.data)[0]
+        assert 'link' not in task and 'links' not in task, task
+        assert task['info']['question'] == 'answer', task
+
+        res = self.app.get('/api/task/1?fields=project_id')
+        task = json.loads(res.data)
+        assert task['project_id'] == project.id, task
+        assert 'info' not in task, task
+
+        res = self.app.get('/api/task?fields=wrongfield')
+        err = json.loads(res.data)
+        assert res.status_code == 415, res.status_code
+        assert err['exception_cls'] == 'AttributeError', err
+
+    @with_context
+    def test_task_query_fields_and_links_queries(self):
+        """Test API Task query with sparse fields and no links does not query
+        the tasks or their projects one by one"""
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        def queries(n_tasks):
+            project = ProjectFactory.create()
+            TaskFactory.create_batch(n_tasks, project=project)
+            del statements[:]
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                res = self.app.get('/api/task?project_id=%s&fields=id,state'
+                                   '&links=0&limit=100' % project.id)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+            assert len(json.loads(res.data)) == n_tasks, res.data
+            return len(statements)
+
+        assert queries(2) == queries(10), statements
+
+    @with_context
+    def test_task_query_conditional_get(self):
+        """Test API Task query answers 304 until the project changes"""
+        project = ProjectFactory.create()
+        TaskFactory.create_batch(2, project=project)
+        url = '/api/task?project_id=%s' % project.id
+
+        res = self.app.get(url)
+        etag = res.headers['ETag']
+        last_modified = res.headers['Last-Modified']
+        assert res.status_code == 200, res.status_code
+        assert 'no-cache' in res.headers['Cache-Control'], res.headers
+
+        res = self.app.get(url, headers=[('If-None-Match', etag)])
+        assert res.status_code == 304, res.status_code
+        assert res.data == '', res.data
+
+        res = self.app.get(url, headers=[('If-Modified-Since', last_modified)])
+        assert res.status_code == 304, res.status_code
+
+        # Other queries have their own ETag
+        res = self.app.get(url + '&limit=1', headers=[('If-None-Match', etag)])
+        assert res.status_code == 200, res.status_code
+
+        TaskFactory.create(project=project)
+        res = self.app.get(url, headers=[('If-None-Match', etag)])
+        assert res.status_code == 200, res.status_code
+        assert len(json.loads(res.data)) == 3, res.data
+        assert res.headers['ETag'] != etag
+
     @with_context
     def test_task_query_with_params(self):
         """Test API query for task with params works"""
@@ -338,6 +453,45 @@ class TestTaskAPI(TestAPI):
         assert err['action'] == 'POST', err
         assert err['exception_cls'] == 'TypeError', err
 
+    @with_context
+    def test_task_post_bulk(self):
+        """Test API Task creation in bulk with JSON arrays and NDJSON"""
+        user = UserFactory.create()
+        project = ProjectFactory.create(owner=user)
+        other_project = ProjectFactory.create()
+        data = [dict(project_id=project.id, info={'n': 1}),
+                dict(project_id=project.id, info={'n': 2}, state='completed'),
+                dict(project_id=other_project.id, info={'n': 3}),
+                dict(project_id=project.id, info={'n': 4}, n_answers=2)]
+        url = '/api/task?api_key=' + user.api_key
+
+        res = self.app.post(url, data=json.dumps(data))
+        assert res.status_code == 200, res.status_code
+        results = json.loads(res.data)
+        assert len(results) == 4, results
+        assert results[0]['info'] == {'n': 1}, results[0]
+        assert results[0]['state'] == 'ongoing', results[0]
+        assert results[0]['n_answers'] == 30, results[0]
+        assert results[1]['status_code'] == 400, results[1]
+        assert results[2]['exception_cls'] == 'Forbidden', results[2]
+        assert results[3]['n_answers'] == 2, results[3]
+        tasks = task_repo.filter_tasks_by(project_id=project.id)
+        assert sorted(task.id for task in tasks) == [results[0]['id'],
+                                                     results[3]['id']]
+        assert task_repo.count_tasks_with(project_id=other_project.id) == 0
+
+        ndjson = '\n'.join(json.dumps(dict(project_id=project.id, info=i))
+                           for i in range(3))
+        res = self.app.post(url, data=ndjson,
+                            content_type='application/x-ndjson')
+        results = json.loads(res.data)
+        assert [result['info'] for result in results] == [0, 1, 2], results
+        assert task_repo.count_tasks_with(project_id=project.id) == 5
+
+        # anonymous users cannot create tasks
+        res = self.app.post('/api/task', data=json.dumps(data[:1]))
+        assert json.loads(res.data)[0]['status_code'] == 401, res.data
+
     def test_task_post_with_reserved_fields_returns_error(self):
         user = UserFactory.create()
         project = ProjectFactory.create(owner=user)
@@ -533,7 +687,9 @@ class TestTaskAPI(TestAPI):
         expected = [call('1_project1_task_json.zip', 'user_1'),
                     call('1_project1_task_csv.zip', 'user_1'),
                     call('1_project1_task_run_json.zip', 'user_1'),
-                    call('1_project1_task_run_csv.zip', 'user_1')]
+                    call('1_project1_task_run_csv.zip', 'user_1'),
+                    call('1_project1_task_parquet.zip', 'user_1'),
+                    call('1_project1_task_run_parquet.zip', 'user_1')]
         assert uploader.delete_file.call_args_list == expected
 
 
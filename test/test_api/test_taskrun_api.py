@@ -54,6 +54,22 @@ class TestTaskrunAPI(TestAPI):
             return result_repo.get_by(project_id=1)
 
 
+    @with_context
+    def test_taskrun_query_stream(self):
+        """Test API TaskRun query as a NDJSON stream works"""
+        project = ProjectFactory.create()
+        TaskRunFactory.create_batch(5, project=project,
+                                    info={'answer': 'annakarenina'})
+        TaskRunFactory.create_batch(5, info={'answer': 'annakarenina'})
+
+        url = '/api/taskrun?stream=1&project_id=%s' % project.id
+        res = self.app.get(url)
+        assert res.mimetype == 'application/x-ndjson', res
+        taskruns = [json.loads(line) for line in res.data.splitlines()]
+        assert len(taskruns) == 5, taskruns
+        for tr in taskruns:
+            assert tr['project_id'] == project.id, tr
+
     @with_context
     def test_taskrun_query_without_params(self):
         """Test API TaskRun query"""
@@ -212,6 +212,21 @@ class TestUserAPI(TestAPI):
         assert user_with_privacy_enabled['fullname'] == 'Private user', data
 
 
+    @with_context
+    def test_user_query_fields_only_returns_those(self):
+        """Test API user query with sparse fields does not return the privacy
+        mode needed to hide the private attributes"""
+        UserFactory.create(name='publicUser', fullname='Public user',
+                           privacy_mode=False)
+
+        res = self.app.get('/api/user?name=publicUser&fields=name,fullname'
+                           '&links=0')
+        data = json.loads(res.data)
+
+        assert res.status_code == 200, res.data
+        assert data == [dict(name='publicUser', fullname='Public user')], data
+
+
     @with_context
     def test_privacy_mode_user_queries(self):
         """Test API user queries for privacy mode with private fields in query
@@ -16,9 +16,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 
-from default import assert_not_raises
+from default import assert_not_raises, flask_app
 from mock import Mock, patch, PropertyMock
 from pybossa.auth import ensure_authorized_to, is_authorized
+from pybossa.auth import is_authorized_many, _authorizer_for
+from pybossa.model.task import Task
 from nose.tools import assert_raises
 from werkzeug.exceptions import Forbidden, Unauthorized
 from pybossa.model.user import User
@@ -120,3 +122,55 @@ class TestAuthorizationFunctions(object):
 
         auth_factory.assert_called_with('token')
         authorizer.can.assert_called_with(user, 'read', 'token')
+
+    def test_authorizer_for_reuses_instances(self):
+        assert _authorizer_for('task') is _authorizer_for('task')
+        assert _authorizer_for('task') is not _authorizer_for('taskrun')
+
+    @patch('pybossa.auth.project_repo')
+    @patch('pybossa.auth._authorizer_for')
+    def test_is_authorized_many_returns_a_mask(self, auth_factory, repo):
+        authorizer = Mock()
+        authorizer.specific_actions = []
+        authorizer._project_actions = ('read',)
+        authorizer.can.side_effect = lambda user, action, task: task.id != 2
+        auth_factory.return_value = authorizer
+        user = self.mock_authenticated
+        tasks = [Task(id=1, project_id=1), Task(id=2, project_id=1),
+                 Task(id=3, project_id=2)]
+
+        mask = is_authorized_many(user, 'read', tasks)
+
+        assert mask == [True, False, True], mask
+        repo.get_many.assert_called_once_with([1, 2])
+
+    @patch('pybossa.auth.project_repo')
+    @patch('pybossa.auth._authorizer_for')
+    def test_is_authorized_many_loads_projects_only_if_needed(self,
+                                                              auth_factory,
+                                                              repo):
+        authorizer = Mock()
+        authorizer.specific_actions = []
+        authorizer._project_actions = ('update',)
+        auth_factory.return_value = authorizer
+        user = self.mock_authenticated
+        tasks = [Task(id=1, project_id=1), Task(id=2, project_id=2)]
+
+        is_authorized_many(user, 'read', tasks)
+
+        assert not repo.get_many.called
+
+    @patch('pybossa.auth._authorizer_for')
+    def test_is_authorized_reuses_decisions_within_a_request(self, auth_factory):
+        authorizer = Mock()
+        authorizer.specific_actions = []
+        auth_factory.return_value = authorizer
+        user = self.mock_authenticated
+        task = Task(id=1, project_id=1)
+
+        with flask_app.test_request_context('/'):
+            is_authorized(user, 'read', task)
+            is_authorized(user, 'read', task)
+            is_authorized(user, 'update', task)
+
+        assert authorizer.can.call_count == 2, authorizer.can.call_count
@@ -146,6 +146,20 @@ class TestCacheMemoizeFunctions(object):
         assert len(test_sentinel.master.keys(key_pattern)) == 1
 
 
+    def test_memoize_does_not_store_none_if_told(self):
+        """Test CACHE memoize decorator does not store None results with
+        cache_none=False"""
+
+        @memoize(cache_none=False)
+        def my_func(arg):
+            return arg
+        key_pattern = "%s:%s_args:*" % (REDIS_KEYPREFIX, my_func.__name__)
+        my_func(None)
+        assert len(test_sentinel.master.keys(key_pattern)) == 0
+        my_func('arg')
+        assert len(test_sentinel.master.keys(key_pattern)) == 1
+
+
     def test_memoize_stores_function_call_only_first_time_called(self):
         """Test CACHE memoize decorator stores the result of calling a function
         in the cache only the first time it's called"""
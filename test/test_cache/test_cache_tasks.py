@@ -0,0 +1,82 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+
+from mock import patch
+from default import Test, db, with_context
+from pybossa.cache import tasks as cached_tasks
+from pybossa.repositories import TaskRepository
+from factories import TaskFactory
+
+
+task_repo = TaskRepository(db)
+
+
+class TestTasksCache(Test):
+
+    @with_context
+    def test_get_task_returns_payload(self):
+        """Test CACHE TASKS get_task returns the immutable task columns"""
+        task = TaskFactory.create(info={'url': 'my.url'}, n_answers=3)
+
+        payload = cached_tasks.get_task(task.id)
+
+        assert payload.id == task.id, payload
+        assert payload.project_id == task.project_id, payload
+        assert payload.info == {'url': 'my.url'}, payload
+        assert payload.n_answers == 3, payload
+
+    @with_context
+    def test_get_task_returns_none_if_no_task(self):
+        """Test CACHE TASKS get_task returns None if the task does not exist"""
+        assert cached_tasks.get_task(1000) is None
+
+    @with_context
+    def test_get_task_looks_for_missing_tasks_in_the_master(self):
+        """Test CACHE TASKS get_task finds a task missing in the slave"""
+        task = TaskFactory.create()
+
+        with patch.object(cached_tasks, 'session') as slave_session:
+            slave_session.execute.return_value = []
+            payload = cached_tasks.get_task(task.id)
+
+        assert payload.id == task.id, payload
+
+    @with_context
+    def test_get_task_is_cached_for_the_request(self):
+        """Test CACHE TASKS get_task loads a task only once per request"""
+        task = TaskFactory.create(info={'url': 'my.url'})
+
+        with self.flask_app.test_request_context('/'):
+            cached_tasks.get_task(task.id)
+            db.session.execute("UPDATE task SET info='{}' WHERE id=%s" % task.id)
+            db.session.commit()
+            assert cached_tasks.get_task(task.id).info == {'url': 'my.url'}
+
+        with self.flask_app.test_request_context('/'):
+            assert cached_tasks.get_task(task.id).info == {}
+
+    @with_context
+    def test_update_task_deletes_cached_task(self):
+        """Test CACHE TASKS updating a task removes it from the request cache"""
+        task = TaskFactory.create(info={'url': 'my.url'})
+
+        with self.flask_app.test_request_context('/'):
+            cached_tasks.get_task(task.id)
+            task.info = {'url': 'new.url'}
+            task_repo.update(task)
+            assert cached_tasks.get_task(task.id).info == {'url': 'new.url'}
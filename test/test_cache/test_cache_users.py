@@ -16,7 +16,8 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 
-from default import Test
+from default import Test, sentinel
+from settings_test import REDIS_KEYPREFIX
 from pybossa.cache import users as cached_users
 from pybossa.model.user import User
 
@@ -318,3 +319,26 @@ class TestUsersCache(Test):
         for field in fields:
             assert field in users[0].keys(), field
         assert len(users[0].keys()) == len(fields)
+
+
+    def test_get_user_by_api_key(self):
+        """Test CACHE USERS get_user_by_api_key returns the user of a key or
+        None"""
+        user = UserFactory.create()
+
+        cached = cached_users.get_user_by_api_key(user.api_key)
+
+        assert cached == dict(id=user.id, name=user.name, admin=user.admin,
+                              pro=user.pro), cached
+        assert cached_users.get_user_by_api_key('wrong-key') is None
+
+    def test_get_user_by_api_key_does_not_cache_unknown_keys(self):
+        """Test CACHE USERS get_user_by_api_key only caches the known keys"""
+        self.redis_flushall()
+        user = UserFactory.create()
+        key_pattern = "%s:get_user_by_api_key_args:*" % REDIS_KEYPREFIX
+
+        cached_users.get_user_by_api_key('wrong-key')
+        assert len(sentinel.master.keys(key_pattern)) == 0
+        cached_users.get_user_by_api_key(user.api_key)
+        assert len(sentinel.master.keys(key_pattern)) == 1
@@ -455,6 +455,49 @@ class TestCkanModule(Test, object):
                 assert 500 == status_code, status_code
                 assert "CKAN: the remote site failed! datastore_upsert failed" == type, type
 
+    @patch('pybossa.ckan.time.sleep')
+    @patch('pybossa.ckan.requests.Session')
+    def test_06_datastore_upsert_chunks(self, Session, sleep):
+        """Test CKAN datastore_upsert_chunks retries the failed chunks"""
+        ok = FakeRequest(json.dumps(self.task_upsert), 200,
+                         {'content-type': 'application/json'})
+        post = Session.return_value.post
+        post.side_effect = [ok, self.server_error, ok]
+        chunks = [[dict(id=1)], [dict(id=2)]]
+        done = []
+
+        out = self.ckan.datastore_upsert_chunks(
+            name='task', chunks=iter(chunks),
+            resource_id=self.task_resource_id, workers=1,
+            callback=done.append)
+
+        assert out is True, out
+        assert done == chunks, done
+        assert post.call_count == 3, post.call_count
+        payload = json.loads(post.call_args[1]['data'])
+        assert payload['records'] == [dict(id=2)], payload
+        assert payload['method'] == 'upsert', payload
+        sleep.assert_called_once_with(1)
+
+    @patch('pybossa.ckan.time.sleep')
+    @patch('pybossa.ckan.requests.Session')
+    def test_06_datastore_upsert_chunks_gives_up(self, Session, sleep):
+        """Test CKAN datastore_upsert_chunks raises after the retries"""
+        post = Session.return_value.post
+        post.return_value = self.server_error
+
+        error = None
+        try:
+            self.ckan.datastore_upsert_chunks(
+                name='task', chunks=[[dict(id=1)]],
+                resource_id=self.task_resource_id, retries=2)
+        except Exception as out:
+            error = out
+        assert error is not None, "It should raise an exception"
+        type, msg, status_code = error.args
+        assert 500 == status_code, status_code
+        assert post.call_count == 3, post.call_count
+
     @patch('pybossa.ckan.requests.post')
     def test_07_datastore_delete(self, Mock):
         """Test CKAN datastore_delete works"""
@@ -0,0 +1,110 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+
+from redis import StrictRedis
+from pybossa.export_watermarks import ExportWatermarks
+
+
+class TestExportWatermarks(object):
+
+    def setUp(self):
+        self.connection = StrictRedis()
+        self.connection.flushall()
+        self.watermarks = ExportWatermarks(self.connection)
+
+    def test_get_mark_returns_none_if_not_exported(self):
+        assert self.watermarks.get_mark(1) is None
+
+    def test_set_mark(self):
+        self.watermarks.set_mark(1, '1:2:2015-01-01')
+
+        assert self.watermarks.get_mark(1) == '1:2:2015-01-01'
+
+    def test_checkpoints(self):
+        checkpoint = dict(offset=10, last_id=3)
+
+        self.watermarks.set_checkpoint(1, 'foo.zip', checkpoint)
+
+        assert self.watermarks.get_checkpoint(1, 'foo.zip') == checkpoint
+        assert self.watermarks.get_checkpoint(1, 'bar.zip') is None
+
+    def test_set_checkpoint_none_deletes_it(self):
+        self.watermarks.set_checkpoint(1, 'foo.zip', dict(offset=10))
+
+        self.watermarks.set_checkpoint(1, 'foo.zip', None)
+
+        assert self.watermarks.get_checkpoint(1, 'foo.zip') is None
+
+    def test_reset_deletes_only_the_project_watermarks(self):
+        self.watermarks.set_mark(1, 'foo')
+        self.watermarks.set_checkpoint(1, 'foo.zip', dict(offset=10))
+        self.watermarks.set_mark(11, 'bar')
+
+        self.watermarks.reset(1)
+
+        assert self.watermarks.get_mark(1) is None
+        assert self.watermarks.get_checkpoint(1, 'foo.zip') is None
+        assert self.watermarks.get_mark(11) == 'bar'
+
+    def test_shards(self):
+        plan = dict(boundaries=[1, 3, 5], base=False, first_part=0)
+        self.watermarks.set_shards(1, 'foo.zip', plan)
+
+        assert self.watermarks.get_shards(1, 'foo.zip') == plan
+        result = dict(last_id=4)
+
+        assert self.watermarks.shard_done(1, 'foo.zip', 1, result) == 1
+        assert self.watermarks.shard_done(1, 'foo.zip', 1, result) is None
+        assert self.watermarks.get_shard_results(1, 'foo.zip', 2) == [
+            None, dict(last_id=4)]
+        assert self.watermarks.get_progress(1) == {
+            'foo.zip': dict(done=1, total=2)}
+
+    def test_shard_jobs(self):
+        assert self.watermarks.get_shard_jobs(1, 'foo.zip', 2) == [None, None]
+
+        self.watermarks.set_shard_job(1, 'foo.zip', 1, 'job-id')
+
+        assert self.watermarks.get_shard_jobs(1, 'foo.zip', 2) == [
+            None, 'job-id']
+
+    def test_set_shards_none_deletes_them(self):
+        plan = dict(boundaries=[1, 3, 5], base=False, first_part=0)
+        self.watermarks.set_shards(1, 'foo.zip', plan)
+        self.watermarks.shard_done(1, 'foo.zip', 0, dict(last_id=2))
+        self.watermarks.set_shard_job(1, 'foo.zip', 1, 'job-id')
+
+        self.watermarks.set_shards(1, 'foo.zip', None)
+
+        assert self.watermarks.get_shards(1, 'foo.zip') is None
+        assert self.watermarks.get_shard_results(1, 'foo.zip', 2) == [
+            None, None]
+        assert self.watermarks.get_shard_jobs(1, 'foo.zip', 2) == [None, None]
+        assert self.watermarks.get_progress(1) == {}
+
+    def test_ckan_sync(self):
+        assert self.watermarks.get_ckan_sync(1, 'res') is None
+
+        self.watermarks.set_ckan_sync(1, 'res', 10)
+        self.watermarks.set_ckan_progress(1, 'task_run', 2, 3)
+
+        assert self.watermarks.get_ckan_sync(1, 'res') == 10
+        assert self.watermarks.get_ckan_progress(1) == {
+            'task_run': dict(done=2, total=3)}
+        self.watermarks.set_ckan_sync(1, 'res', None)
+        assert self.watermarks.get_ckan_sync(1, 'res') is None
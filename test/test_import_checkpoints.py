@@ -0,0 +1,77 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+
+from redis import StrictRedis
+from pybossa.import_checkpoints import ImportCheckpoints
+
+
+class TestImportCheckpoints(object):
+
+    def setUp(self):
+        self.connection = StrictRedis()
+        self.connection.flushall()
+        self.checkpoints = ImportCheckpoints(self.connection)
+        self.form_data = dict(type='csv', csv_url='http://foo.com/a.csv')
+
+    def test_get_returns_none_if_not_started(self):
+        assert self.checkpoints.get(1, self.form_data) is None
+
+    def test_set(self):
+        self.checkpoints.set(1, self.form_data, rows=10, created=8)
+
+        checkpoint = self.checkpoints.get(1, dict(self.form_data))
+
+        assert checkpoint == dict(type='csv', rows=10, created=8), checkpoint
+        assert self.checkpoints.get(2, self.form_data) is None
+        other = dict(type='csv', csv_url='http://foo.com/b.csv')
+        assert self.checkpoints.get(1, other) is None
+
+    def test_set_version(self):
+        self.checkpoints.set(1, self.form_data, rows=10, created=8,
+                             version='etag')
+
+        checkpoint = self.checkpoints.get(1, self.form_data)
+
+        assert checkpoint == dict(type='csv', rows=10, created=8,
+                                  version='etag'), checkpoint
+
+    def test_set_expires(self):
+        self.checkpoints.set(1, self.form_data, rows=10, created=8)
+
+        ttl = self.connection.ttl(ImportCheckpoints.KEY_PREFIX % 1)
+
+        assert 0 < ttl <= ImportCheckpoints.CHECKPOINT_TTL, ttl
+
+    def test_delete(self):
+        self.checkpoints.set(1, self.form_data, rows=10, created=8)
+
+        self.checkpoints.delete(1, self.form_data)
+
+        assert self.checkpoints.get(1, self.form_data) is None
+
+    def test_get_progress(self):
+        other = dict(type='gdocs', googledocs_url='http://foo.com')
+        self.checkpoints.set(1, self.form_data, rows=10, created=8)
+        self.checkpoints.set(1, other, rows=5, created=5)
+
+        progress = sorted(self.checkpoints.get_progress(1),
+                          key=lambda checkpoint: checkpoint['type'])
+
+        assert progress == [dict(type='csv', rows=10, created=8),
+                            dict(type='gdocs', rows=5, created=5)], progress
+        assert self.checkpoints.get_progress(2) == []
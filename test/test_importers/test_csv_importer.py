@@ -164,6 +164,22 @@ class TestBulkTaskCSVImport(object):
         finally:
             assert raised, "Exception not raised"
 
+    def test_source_version_is_the_etag_or_the_length(self, request):
+        csv_file = FakeResponse(text='Foo\n1', status_code=200,
+                                headers={'content-type': 'text/plain',
+                                         'etag': '"abc"',
+                                         'content-length': '5'},
+                                encoding='utf-8')
+        request.return_value = csv_file
+        assert self.importer.source_version() is None
+
+        self.importer.tasks()
+        assert self.importer.source_version() == '"abc"'
+
+        del csv_file.headers['etag']
+        self.importer.tasks()
+        assert self.importer.source_version() == '5'
+
     def test_tasks_return_tasks_with_only_info_fields(self, request):
         csv_file = FakeResponse(text='Foo,Bar,Baz\n1,2,3', status_code=200,
                                 headers={'content-type': 'text/plain'},
@@ -198,3 +214,47 @@ class TestBulkTaskCSVImport(object):
         task = tasks.next()
 
         assert csv_file.encoding == 'utf-8'
+
+    def test_tasks_streams_values_with_line_breaks(self, request):
+        csv_file = FakeResponse(text=u'Foo,Bar\r\n"a\r\nb",M\xfcnchen\r\n',
+                                status_code=200,
+                                headers={'content-type': 'text/plain'},
+                                encoding='utf-8')
+        request.return_value = csv_file
+        self.importer.chunk_size = 3
+
+        tasks = list(self.importer.tasks())
+
+        assert tasks == [{'info': {u'Foo': u'a\r\nb',
+                                   u'Bar': u'M\xfcnchen'}}], tasks
+        assert request.call_args[1]['stream'] is True
+
+    def test_tasks_raises_exception_if_too_many_rows(self, request):
+        csv_file = FakeResponse(text='Foo,Bar\n1,2\n3,4', status_code=200,
+                                headers={'content-type': 'text/plain'},
+                                encoding='utf-8')
+        request.return_value = csv_file
+        importer = BulkTaskCSVImport(csv_url='http://myfakecsvurl.com',
+                                     max_rows=1)
+        msg = "The file you uploaded has more than 1 rows."
+
+        assert_raises(BulkImportException, importer.count_tasks)
+        try:
+            importer.count_tasks()
+        except BulkImportException as e:
+            assert e[0] == msg, e
+
+    def test_tasks_raises_exception_if_too_many_bytes(self, request):
+        csv_file = FakeResponse(text='Foo,Bar\n1,2\n3,4', status_code=200,
+                                headers={'content-type': 'text/plain'},
+                                encoding='utf-8')
+        request.return_value = csv_file
+        importer = BulkTaskCSVImport(csv_url='http://myfakecsvurl.com',
+                                     max_bytes=10)
+        msg = "The file you uploaded is bigger than 10 bytes."
+
+        assert_raises(BulkImportException, importer.count_tasks)
+        try:
+            importer.count_tasks()
+        except BulkImportException as e:
+            assert e[0] == msg, e
@@ -25,7 +25,7 @@ from pybossa.importers import BulkImportException
 from pybossa.importers.flickr import BulkTaskFlickrImport
 
 
-@patch('pybossa.importers.flickr.requests')
+@patch('pybossa.importers.base.requests')
 class TestBulkTaskFlickrImport(object):
 
     invalid_response = {u'stat': u'fail',
@@ -66,7 +66,7 @@ class TestBulkTaskFlickrImport(object):
         return fake_response
 
     def test_call_to_flickr_api_endpoint(self, requests):
-        requests.get.return_value = self.make_response(json.dumps(self.response))
+        requests.Session().get.return_value = self.make_response(json.dumps(self.response))
         self.importer._get_album_info()
         url = 'https://api.flickr.com/services/rest/'
         payload = {'method': 'flickr.photosets.getPhotos',
@@ -74,49 +74,49 @@ class TestBulkTaskFlickrImport(object):
                    'photoset_id': '72157633923521788',
                    'format': 'json',
                    'nojsoncallback': '1'}
-        requests.get.assert_called_with(url, params=payload)
+        requests.Session().get.assert_called_with(url, params=payload)
 
     def test_call_to_flickr_api_uses_no_credentials(self, requests):
-        requests.get.return_value = self.make_response(json.dumps(self.response))
+        requests.Session().get.return_value = self.make_response(json.dumps(self.response))
         self.importer._get_album_info()
 
         # The request MUST NOT include user credentials, to avoid private photos
-        url_call_params = requests.get.call_args_list[0][1]['params'].keys()
+        url_call_params = requests.Session().get.call_args_list[0][1]['params'].keys()
         assert 'auth_token' not in url_call_params
 
     def test_count_tasks_returns_number_of_photos_in_album(self, requests):
-        requests.get.return_value = self.make_response(json.dumps(self.response))
+        requests.Session().get.return_value = self.make_response(json.dumps(self.response))
 
         number_of_tasks = self.importer.count_tasks()
 
         assert number_of_tasks is 3, number_of_tasks
 
     def test_count_tasks_raises_exception_if_invalid_album(self, requests):
-        requests.get.return_value = self.make_response(json.dumps(self.invalid_response))
+        requests.Session().get.return_value = self.make_response(json.dumps(self.invalid_response))
         importer = BulkTaskFlickrImport(api_key='fake-key', album_id='bad')
 
         assert_raises(BulkImportException, importer.count_tasks)
 
     def test_count_tasks_raises_exception_on_non_200_flickr_response(self, requests):
-        requests.get.return_value = self.make_response('Not Found', 404)
+        requests.Session().get.return_value = self.make_response('Not Found', 404)
 
         assert_raises(BulkImportException, self.importer.count_tasks)
 
     def test_tasks_returns_list_of_all_photos(self, requests):
-        requests.get.return_value = self.make_response(json.dumps(self.response))
+        requests.Session().get.return_value = self.make_response(json.dumps(self.response))
 
-        photos = self.importer.tasks()
+        photos = list(self.importer.tasks())
 
         assert len(photos) == 3, len(photos)
 
     def test_tasks_returns_tasks_with_title_and_url_info_fields(self, requests):
-        requests.get.return_value = self.make_response(json.dumps(self.response))
+        requests.Session().get.return_value = self.make_response(json.dumps(self.response))
         url = 'https://farm6.staticflickr.com/5441/8947115130_00e2301a0d.jpg'
         url_m = 'https://farm6.staticflickr.com/5441/8947115130_00e2301a0d_m.jpg'
         url_b = 'https://farm6.staticflickr.com/5441/8947115130_00e2301a0d_b.jpg'
         link = 'https://www.flickr.com/photos/32985084@N00/8947115130'
         title = self.response['photoset']['photo'][0]['title']
-        photo = self.importer.tasks()[0]
+        photo = list(self.importer.tasks())[0]
 
         assert photo['info'].get('title') == title
         assert photo['info'].get('url') == url, photo['info'].get('url')
@@ -125,13 +125,13 @@ class TestBulkTaskFlickrImport(object):
         assert photo['info'].get('link') == link, photo['info'].get('link')
 
     def test_tasks_raises_exception_if_invalid_album(self, requests):
-        requests.get.return_value = self.make_response(json.dumps(self.invalid_response))
+        requests.Session().get.return_value = self.make_response(json.dumps(self.invalid_response))
         importer = BulkTaskFlickrImport(api_key='fake-key', album_id='bad')
 
         assert_raises(BulkImportException, importer.tasks)
 
     def test_tasks_raises_exception_on_non_200_flickr_response(self, requests):
-        requests.get.return_value = self.make_response('Not Found', 404)
+        requests.Session().get.return_value = self.make_response('Not Found', 404)
 
         assert_raises(BulkImportException, self.importer.tasks)
 
@@ -151,9 +151,9 @@ class TestBulkTaskFlickrImport(object):
         fake_first_response = self.make_response(json.dumps(first_response))
         fake_second_response = self.make_response(json.dumps(second_response))
         responses = [fake_first_response, fake_second_response]
-        requests.get.side_effect = lambda *args, **kwargs: responses.pop(0)
+        requests.Session().get.side_effect = lambda *args, **kwargs: responses.pop(0)
 
-        photos = self.importer.tasks()
+        photos = list(self.importer.tasks())
 
         assert len(photos) == 600, len(photos)
 
@@ -179,8 +179,8 @@ class TestBulkTaskFlickrImport(object):
         fake_second_response = self.make_response(json.dumps(second_response))
         fake_third_response = self.make_response(json.dumps(third_response))
         responses = [fake_first_response, fake_second_response, fake_third_response]
-        requests.get.side_effect = lambda *args, **kwargs: responses.pop(0)
+        requests.Session().get.side_effect = lambda *args, **kwargs: responses.pop(0)
 
-        photos = self.importer.tasks()
+        photos = list(self.importer.tasks())
 
         assert len(photos) == 1100, len(photos)
@@ -0,0 +1,116 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import os
+import shutil
+import tempfile
+from nose.tools import assert_raises
+from pybossa.importers import BulkImportException
+from pybossa.importers.localfile import BulkTaskLocalFileImport
+
+
+class TestBulkTaskLocalFileImport(object):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def create_file(self, name, content, compress=False):
+        path = os.path.join(self.folder, name)
+        _file = gzip.open(path, 'wb') if compress else open(path, 'wb')
+        _file.write(content)
+        _file.close()
+        return path
+
+    def test_tasks_from_csv_file(self):
+        path = self.create_file('tasks.csv', 'Foo,priority_0\n1,2\n3,4\n')
+
+        tasks = list(BulkTaskLocalFileImport(path).tasks())
+
+        assert tasks == [{'info': {u'Foo': u'1'}, u'priority_0': u'2'},
+                         {'info': {u'Foo': u'3'}, u'priority_0': u'4'}], tasks
+
+    def test_source_version_changes_with_the_file(self):
+        path = self.create_file('tasks.csv', 'Foo\n1\n')
+        importer = BulkTaskLocalFileImport(path)
+        version = importer.source_version()
+
+        assert importer.source_version() == version, version
+        self.create_file('tasks.csv', 'Foo\n1\n2\n')
+        assert importer.source_version() != version, version
+        os.remove(path)
+        assert importer.source_version() is None
+
+    def test_tasks_from_json_array(self):
+        content = '[{"foo": "a\\u00fc", "n_answers": 3},\n {"bar": [1, 2]}]'
+        path = self.create_file('tasks.json', content)
+        importer = BulkTaskLocalFileImport(path)
+        importer.chunk_size = 4
+
+        tasks = list(importer.tasks())
+
+        assert tasks == [{'info': {'foo': u'a\xfc'}, 'n_answers': 3},
+                         {'info': {'bar': [1, 2]}}], tasks
+
+    def test_tasks_from_gzipped_ndjson(self):
+        content = '{"foo": 1}\n\n{"foo": 2}\n'
+        path = self.create_file('tasks.jsonl.gz', content, compress=True)
+        importer = BulkTaskLocalFileImport(path)
+
+        tasks = list(importer.tasks())
+
+        assert importer.file_format == 'ndjson', importer.file_format
+        assert tasks == [{'info': {'foo': 1}}, {'info': {'foo': 2}}], tasks
+
+    def test_file_format_overrides_the_extension(self):
+        path = self.create_file('tasks.txt', '{"foo": 1}\n')
+
+        tasks = list(BulkTaskLocalFileImport(path, 'ndjson').tasks())
+
+        assert tasks == [{'info': {'foo': 1}}], tasks
+
+    def test_tasks_raises_exception_if_invalid_json_array(self):
+        for content in ('{"foo": 1}', '[{"foo": 1}, {"foo"', '[{"foo": 1}'):
+            path = self.create_file('tasks.json', content)
+            importer = BulkTaskLocalFileImport(path)
+
+            assert_raises(BulkImportException, list, importer.tasks())
+
+    def test_tasks_raises_exception_if_not_objects(self):
+        path = self.create_file('tasks.ndjson', '{"foo": 1}\n[1, 2]\n')
+        importer = BulkTaskLocalFileImport(path)
+        msg = "The file you uploaded has a value which is not an object on row 2."
+
+        try:
+            list(importer.tasks())
+            raise AssertionError('BulkImportException not raised')
+        except BulkImportException as e:
+            assert e[0] == msg, e
+
+    def test_tasks_raises_exception_if_unknown_format(self):
+        path = self.create_file('tasks.xml', '<tasks/>')
+
+        assert_raises(BulkImportException, BulkTaskLocalFileImport(path).tasks)
+
+    def test_tasks_raises_exception_if_no_file(self):
+        path = os.path.join(self.folder, 'tasks.csv')
+
+        assert_raises(BulkImportException, BulkTaskLocalFileImport(path).tasks)
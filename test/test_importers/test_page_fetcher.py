@@ -0,0 +1,118 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from urlparse import urlparse, parse_qs
+from nose.tools import assert_raises
+from pybossa.importers.base import PageFetcher
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+
+    """Local API which returns the page it is asked for, slowly."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.requests = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.running += 1
+            server.requests += 1
+            server.max_running = max(server.max_running, server.running)
+        time.sleep(0.05)
+        page = int(parse_qs(urlparse(self.path).query)['page'][0])
+        with server.lock:
+            server.running -= 1
+        if page < 0:
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps(dict(page=page))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPageFetcher(object):
+
+    def setUp(self):
+        self.server = StubServer()
+        self.url = 'http://127.0.0.1:%s/' % self.server.server_address[1]
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fetch(self, fetcher):
+        def fetch_page(page):
+            res = fetcher.get(self.url, params=dict(page=page))
+            res.raise_for_status()
+            return res.json()['page']
+        return fetch_page
+
+    def test_map_yields_pages_in_order(self):
+        fetcher = PageFetcher(workers=3)
+
+        pages = list(fetcher.map(self.fetch(fetcher), range(1, 11)))
+
+        assert pages == range(1, 11), pages
+
+    def test_map_fetches_up_to_workers_pages_at_a_time(self):
+        fetcher = PageFetcher(workers=3)
+
+        list(fetcher.map(self.fetch(fetcher), range(1, 11)))
+
+        assert 1 < self.server.max_running <= 3, self.server.max_running
+
+    def test_map_only_prefetches_workers_pages(self):
+        fetcher = PageFetcher(workers=2)
+        pages = fetcher.map(self.fetch(fetcher), range(1, 11))
+
+        assert next(pages) == 1
+        time.sleep(0.2)
+
+        assert self.server.requests <= 3, self.server.requests
+
+    def test_map_raises_the_errors_of_the_pages(self):
+        fetcher = PageFetcher(workers=2)
+        pages = fetcher.map(self.fetch(fetcher), [1, -1, 3])
+
+        assert next(pages) == 1
+        assert_raises(Exception, next, pages)
@@ -77,7 +77,7 @@ class TestBulkTaskTwitterImportSearch(object):
         importer.client.api.search.tweets.return_value = self.one_status
         expected_task_data = self.one_status['statuses'][0]
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert len(tasks) == 1, tasks
         info = tasks[0]['info']
@@ -104,7 +104,7 @@ class TestBulkTaskTwitterImportSearch(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.search.tweets = multiple_responses
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert len(tasks) == 6, len(tasks)
 
@@ -114,7 +114,7 @@ class TestBulkTaskTwitterImportSearch(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.search.tweets.return_value = self.five_statuses
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert len(tasks) == max_tweets, len(tasks)
 
@@ -134,14 +134,13 @@ class TestBulkTaskTwitterImportSearch(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.search.tweets = multiple_responses
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert calls[0]['kwargs']['count'] == 6, calls[0]['kwargs']
         assert calls[0]['kwargs']['q'] == form_data['source'] + '-filter:retweets', calls[0]['kwargs']
         assert calls[1]['kwargs']['count'] == 1, calls[1]['kwargs']
         assert calls[1]['kwargs']['max_id'] == 0, calls[1]['kwargs']
-        assert calls[2]['kwargs']['count'] == 0, calls[2]['kwargs']
-        assert calls[2]['kwargs']['max_id'] == -1, calls[2]['kwargs']
+        assert len(calls) == 2, calls
 
     def test_max_tweets_gets_a_default_value_of_200(self):
         calls = []
@@ -153,7 +152,7 @@ class TestBulkTaskTwitterImportSearch(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.search.tweets = response
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert calls[0]['kwargs']['count'] == 200, calls[0]['kwargs']['count']
 
@@ -193,7 +192,7 @@ class TestBulkTaskTwitterImportSearch(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.search.tweets = multiple_responses
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert len(api_calls) == 1, api_calls
 
@@ -211,7 +210,7 @@ class TestBulkTaskTwitterImportSearch(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.search.tweets = response
 
-        assert_raises(BulkImportException, importer.tasks)
+        assert_raises(BulkImportException, list, importer.tasks())
 
     def test_tasks_raises_exception_on_rate_limit_error(self):
         def response(*args, **kwargs):
@@ -227,10 +226,10 @@ class TestBulkTaskTwitterImportSearch(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.search.tweets = response
 
-        assert_raises(BulkImportException, importer.tasks)
+        assert_raises(BulkImportException, list, importer.tasks())
 
         try:
-            importer.tasks()
+            list(importer.tasks())
         except BulkImportException as e:
             assert e.message == "Rate limit for Twitter API reached. Please, try again in 15 minutes.", e.message
 
@@ -244,7 +243,7 @@ class TestBulkTaskTwitterImportSearch(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.search.tweets.return_value = {'statuses': []}
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         importer.client.api.search.tweets.assert_called_with(
             count=500,
@@ -282,7 +281,7 @@ class TestBulkTaskTwitterImportSearch(object):
         importer.client.api.search.tweets = multiple_responses
         expected_metadata = {'last_id': 5}
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
         metadata = importer.import_metadata()
         assert metadata == expected_metadata, metadata
 
@@ -382,7 +381,7 @@ class TestBulkTaskTwitterImportFromAccount(object):
         importer.client.api.statuses.user_timeline.return_value = self.one_status
         expected_task_data = self.one_status[0]
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert len(tasks) == 1, tasks
         info = tasks[0]['info']
@@ -409,7 +408,7 @@ class TestBulkTaskTwitterImportFromAccount(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.statuses.user_timeline = multiple_responses
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert len(tasks) == 6, len(tasks)
 
@@ -419,7 +418,7 @@ class TestBulkTaskTwitterImportFromAccount(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.statuses.user_timeline.return_value = self.five_statuses
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert len(tasks) == max_tweets, len(tasks)
 
@@ -439,15 +438,14 @@ class TestBulkTaskTwitterImportFromAccount(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.statuses.user_timeline = multiple_responses
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert calls[0]['kwargs']['count'] == 6, calls[0]['kwargs']
         assert calls[0]['kwargs'].get('q') is None, calls[0]['kwargs']
         assert calls[0]['kwargs']['screen_name'] == form_data['source']
         assert calls[1]['kwargs']['count'] == 1, calls[1]['kwargs']
         assert calls[1]['kwargs']['max_id'] == 0, calls[1]['kwargs']
-        assert calls[2]['kwargs']['count'] == 0, calls[2]['kwargs']
-        assert calls[2]['kwargs']['max_id'] == -1, calls[2]['kwargs']
+        assert len(calls) == 2, calls
 
     def test_tasks_raises_exception_on_twitter_client_error(self):
         def response(*args, **kwargs):
@@ -463,7 +461,7 @@ class TestBulkTaskTwitterImportFromAccount(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.statuses.user_timeline = response
 
-        assert_raises(BulkImportException, importer.tasks)
+        assert_raises(BulkImportException, list, importer.tasks())
 
     def test_if_last_import_meta_is_None_since_id_is_not_passed_to_twitter_client(self):
         responses = [self.no_results, self.five_statuses]
@@ -481,6 +479,6 @@ class TestBulkTaskTwitterImportFromAccount(object):
         importer = create_importer_with_form_data(**form_data)
         importer.client.api.statuses.user_timeline = multiple_responses
 
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert 'since_id' not in calls[0]['kwargs'].keys(), calls[0]['kwargs']
@@ -189,7 +189,7 @@ class TestBulkYoutubeImport(object):
         build.return_value.playlistItems.return_value.list.\
             return_value.execute.return_value = self.short_playlist_response
         importer = BulkTaskYoutubeImport(**self.form_data)
-        importer._fetch_all_youtube_videos('fakeId')
+        list(importer._fetch_all_youtube_videos('fakeId'))
 
         build.assert_called_with('youtube', 'v3', developerKey=self.form_data['youtube_api_server_key'])
 
@@ -197,17 +197,16 @@ class TestBulkYoutubeImport(object):
         build.return_value.playlistItems.return_value.list.\
             return_value.execute.return_value = self.short_playlist_response
         importer = BulkTaskYoutubeImport(**self.form_data)
-        playlist = importer._fetch_all_youtube_videos('fakeId')
+        playlist = list(importer._fetch_all_youtube_videos('fakeId'))
 
-        assert playlist == self.short_playlist_response, playlist
+        assert playlist == self.short_playlist_response['items'], playlist
 
     def test_call_to_youtube_api_long_playlist(self, build):
         build.return_value.playlistItems.return_value.list.\
             return_value.execute.side_effect = [self.long_playlist_response, self.long_playlist_response, self.short_playlist_response]
         importer = BulkTaskYoutubeImport(**self.form_data)
-        expected_playlist = {'items': ''}
-        expected_playlist['items'] = self.long_playlist_response['items'] + self.long_playlist_response['items'] + self.short_playlist_response['items']
-        playlist = importer._fetch_all_youtube_videos('fakeId')
+        expected_playlist = self.long_playlist_response['items'] + self.long_playlist_response['items'] + self.short_playlist_response['items']
+        playlist = list(importer._fetch_all_youtube_videos('fakeId'))
 
         assert playlist == expected_playlist, playlist
 
@@ -242,7 +241,7 @@ class TestBulkYoutubeImport(object):
         build.return_value.playlistItems.return_value.list.\
             return_value.execute.return_value = self.short_playlist_response
         importer = BulkTaskYoutubeImport(**self.form_data)
-        tasks = importer.tasks()
+        tasks = list(importer.tasks())
 
         assert tasks == [{u'info': {u'oembed': '<iframe width="512" height="512" src="https://www.youtube.com/embed/youtubeid2" frameborder="0" allowfullscreen></iframe>',
             'video_url': u'https://www.youtube.com/watch?v=youtubeid2'}}]
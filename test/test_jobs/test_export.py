@@ -15,10 +15,16 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+import shutil
+import zipfile
 from default import Test, with_context, flask_app
-from factories import ProjectFactory, UserFactory
+from factories import ProjectFactory, UserFactory, TaskFactory, TaskRunFactory
+from pybossa.core import json_exporter, csv_exporter, uploader, sentinel
 from pybossa.jobs import get_export_task_jobs, project_export
 from mock import patch
+from rq import Queue
 
 class TestExport(Test):
 
@@ -97,3 +103,144 @@ class TestExport(Test):
         project_export(0)
         assert not csv_exporter.pregenerate_zip_files.called
         assert not json_exporter.pregenerate_zip_files.called
+
+    @with_context
+    @patch('pybossa.core.json_exporter')
+    @patch('pybossa.core.csv_exporter')
+    def test_get_export_task_jobs_skips_unchanged_projects(self, csv_exporter,
+                                                           json_exporter):
+        """Test JOB export task jobs skips the projects exported already."""
+        project = ProjectFactory.create()
+        project_export(project.id)
+
+        jobs = list(get_export_task_jobs(queue='low'))
+
+        assert jobs == [], jobs
+
+        TaskFactory.create(project=project)
+        jobs = list(get_export_task_jobs(queue='low'))
+
+        assert len(jobs) == 1, jobs
+        assert jobs[0]['args'] == [project.id], jobs
+
+    @with_context
+    def test_project_export_appends_new_task_runs(self):
+        """Test JOB project_export only adds the new task runs to the ZIPs."""
+        project = ProjectFactory.create()
+        container = os.path.join(uploader.upload_folder,
+                                 'user_%d' % project.owner_id)
+        shutil.rmtree(container, ignore_errors=True)
+        task = TaskFactory.create(project=project)
+        task_runs = TaskRunFactory.create_batch(2, task=task)
+        project_export(project.id)
+        task_runs.append(TaskRunFactory.create(task=task))
+
+        with patch.object(json_exporter, '_zip_member',
+                          wraps=json_exporter._zip_member) as member:
+            project_export(project.id)
+            resumed = [args for args, kwargs in member.call_args_list
+                       if kwargs.get('resume')]
+            assert [args[1] for args in resumed] == ['task_run'], resumed
+
+        filename = json_exporter.download_name(project, 'task_run')
+        archive = zipfile.ZipFile(os.path.join(container, filename))
+        exported = json.loads(archive.read(archive.namelist()[0]))
+        assert [tr['id'] for tr in exported] == [tr.id for tr in task_runs]
+
+        filename = csv_exporter.download_name(project, 'task_run')
+        archive = zipfile.ZipFile(os.path.join(container, filename))
+        lines = archive.read(archive.namelist()[0]).splitlines()
+        assert len(lines) == 4, lines
+
+    @with_context
+    @patch('pybossa.jobs.enqueue_job')
+    def test_project_export_in_shards(self, enqueue_job):
+        """Test JOB project_export exports big ZIPs in shards."""
+        project = ProjectFactory.create()
+        container = os.path.join(uploader.upload_folder,
+                                 'user_%d' % project.owner_id)
+        shutil.rmtree(container, ignore_errors=True)
+        task = TaskFactory.create(project=project)
+        task_runs = TaskRunFactory.create_batch(5, task=task)
+
+        with patch.dict(flask_app.config, {'EXPORT_SHARD_SIZE': 2}):
+            project_export(project.id)
+            jobs = [call[0][0] for call in enqueue_job.call_args_list]
+            jobs = [job for job in jobs if job['args'][0] == 'json']
+            assert [job['args'][3] for job in jobs] == [0, 1, 2], jobs
+            for job in jobs:
+                job['name'](*job['args'])
+
+        filename = json_exporter.download_name(project, 'task_run')
+        archive = zipfile.ZipFile(os.path.join(container, filename))
+        manifest = json.loads(archive.read('manifest.json'))
+        names = [part['name'] for part in manifest['parts']]
+        assert archive.namelist() == names + ['manifest.json'], names
+        exported = []
+        for name in names:
+            exported += json.loads(archive.read(name))
+        assert [tr['id'] for tr in exported] == [tr.id for tr in task_runs]
+        assert not os.path.exists(
+            os.path.join(container, json_exporter._shard_name(filename, 0)))
+
+    @with_context
+    @patch('pybossa.jobs.enqueue_job')
+    def test_project_export_stitches_shards_after_failed_stitch(self,
+                                                                enqueue_job):
+        """Test JOB project_export stitches the shards of a ZIP again if they
+        are all done but their stitch failed."""
+        project = ProjectFactory.create()
+        container = os.path.join(uploader.upload_folder,
+                                 'user_%d' % project.owner_id)
+        shutil.rmtree(container, ignore_errors=True)
+        task = TaskFactory.create(project=project)
+        task_runs = TaskRunFactory.create_batch(5, task=task)
+        filename = json_exporter.download_name(project, 'task_run')
+        upload_chunks = uploader.upload_chunks
+
+        def fail_stitch(chunks, name, container):
+            if name == filename:
+                return False
+            return upload_chunks(chunks, name, container)
+
+        with patch.dict(flask_app.config, {'EXPORT_SHARD_SIZE': 2}):
+            project_export(project.id)
+            jobs = [call[0][0] for call in enqueue_job.call_args_list]
+            jobs = [job for job in jobs if job['args'][0] == 'json']
+            with patch.object(uploader, 'upload_chunks',
+                              side_effect=fail_stitch):
+                for job in jobs:
+                    job['name'](*job['args'])
+            assert not os.path.exists(os.path.join(container, filename))
+            project_export(project.id)
+
+        archive = zipfile.ZipFile(os.path.join(container, filename))
+        manifest = json.loads(archive.read('manifest.json'))
+        exported = []
+        for part in manifest['parts']:
+            exported += json.loads(archive.read(part['name']))
+        assert [tr['id'] for tr in exported] == [tr.id for tr in task_runs]
+        assert not os.path.exists(
+            os.path.join(container, json_exporter._shard_name(filename, 0)))
+
+    @with_context
+    def test_project_export_does_not_enqueue_pending_shards(self):
+        """Test JOB project_export only enqueues the shards whose job is not
+        queued or running."""
+        project = ProjectFactory.create()
+        task = TaskFactory.create(project=project)
+        TaskRunFactory.create_batch(5, task=task)
+        queue = Queue('low', connection=sentinel.master)
+        queue.empty()
+
+        with patch.dict(flask_app.config, {'EXPORT_SHARD_SIZE': 2}):
+            project_export(project.id)
+            n_jobs = queue.count
+            assert n_jobs > 0, n_jobs
+            project_export(project.id)
+            assert queue.count == n_jobs, queue.count
+            # Lost jobs are enqueued again
+            queue.empty()
+            project_export(project.id)
+            assert queue.count == n_jobs, queue.count
+        queue.empty()
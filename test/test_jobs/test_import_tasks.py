@@ -21,7 +21,10 @@ from pybossa.jobs import import_tasks, task_repo, get_autoimport_jobs
 from pybossa.model.task import Task
 from pybossa.importers import ImportReport
 from factories import ProjectFactory, TaskFactory, UserFactory
-from mock import patch
+from mock import patch, Mock
+from nose.tools import assert_raises
+from pybossa.core import sentinel
+from pybossa.import_checkpoints import ImportCheckpoints
 
 class TestImportTasksJob(Test):
 
@@ -33,7 +36,9 @@ class TestImportTasksJob(Test):
 
         import_tasks(project.id, **form_data)
 
-        create.assert_called_once_with(task_repo, project.id, **form_data)
+        create.assert_called_once_with(task_repo, project.id, checkpoint=None,
+                                       progress=create.call_args[1]['progress'],
+                                       **form_data)
 
     @with_context
     @patch('pybossa.jobs.send_mail')
@@ -85,6 +90,93 @@ class TestImportTasksJob(Test):
 
         assert autoimporter.get('last_import_meta') == None, autoimporter
 
+    @with_context
+    @patch('pybossa.jobs.send_mail')
+    @patch('pybossa.jobs.importer._create_importer_for')
+    def test_it_resumes_from_the_last_checkpoint(self, importer_for, send_mail):
+        mock_importer = Mock()
+        mock_importer.tasks.return_value = [{'info': {'n': 1}},
+                                            {'info': {'n': 2}},
+                                            {'info': {'n': 3}}]
+        mock_importer.source_version.return_value = 'etag'
+        importer_for.return_value = mock_importer
+        project = ProjectFactory.create()
+        form_data = {'type': 'csv', 'csv_url': 'http://google.es'}
+        checkpoints = ImportCheckpoints(sentinel.master)
+        checkpoints.set(project.id, form_data, rows=2, created=1,
+                        version='etag')
+
+        msg = import_tasks(project.id, **form_data)
+
+        tasks = task_repo.filter_tasks_by(project_id=project.id)
+        assert [task.info for task in tasks] == [{'n': 3}], tasks
+        assert msg.startswith('2 new tasks were imported successfully'), msg
+        assert checkpoints.get(project.id, form_data) is None
+
+    @with_context
+    @patch('pybossa.jobs.send_mail')
+    @patch('pybossa.jobs.importer._create_importer_for')
+    def test_it_reads_again_a_source_which_changed(self, importer_for,
+                                                   send_mail):
+        mock_importer = Mock()
+        mock_importer.tasks.return_value = [{'info': {'n': 1}},
+                                            {'info': {'n': 2}},
+                                            {'info': {'n': 3}}]
+        mock_importer.source_version.return_value = 'new-etag'
+        importer_for.return_value = mock_importer
+        project = ProjectFactory.create()
+        TaskFactory.create(project=project, info={'n': 2})
+        form_data = {'type': 'csv', 'csv_url': 'http://google.es'}
+        checkpoints = ImportCheckpoints(sentinel.master)
+        checkpoints.set(project.id, form_data, rows=2, created=1,
+                        version='etag')
+
+        msg = import_tasks(project.id, **form_data)
+
+        tasks = task_repo.filter_tasks_by(project_id=project.id)
+        assert sorted(task.info['n'] for task in tasks) == [1, 2, 3], tasks
+        assert msg.startswith('3 new tasks were imported successfully'), msg
+
+    @with_context
+    @patch('pybossa.jobs.send_mail')
+    @patch('pybossa.jobs.importer._create_importer_for')
+    def test_autoimport_reads_again_the_source(self, importer_for, send_mail):
+        mock_importer = Mock()
+        mock_importer.tasks.return_value = [{'info': {'n': 1}},
+                                            {'info': {'n': 2}}]
+        mock_importer.source_version.return_value = 'etag'
+        mock_importer.import_metadata.return_value = None
+        importer_for.return_value = mock_importer
+        project = ProjectFactory.create()
+        form_data = {'type': 'csv', 'csv_url': 'http://google.es'}
+        checkpoints = ImportCheckpoints(sentinel.master)
+        checkpoints.set(project.id, form_data, rows=1, created=1,
+                        version='etag')
+
+        import_tasks(project.id, from_auto=True, **form_data)
+
+        tasks = task_repo.filter_tasks_by(project_id=project.id)
+        assert sorted(task.info['n'] for task in tasks) == [1, 2], tasks
+
+    @with_context
+    @patch('pybossa.jobs.send_mail')
+    @patch('pybossa.jobs.importer.create_tasks')
+    def test_it_reports_the_progress_if_it_stops(self, create, send_mail):
+        def stop(task_repo, project_id, progress=None, **kwargs):
+            progress(10, 8)
+            raise Exception('timeout')
+        create.side_effect = stop
+        project = ProjectFactory.create()
+        form_data = {'type': 'csv', 'csv_url': 'http://google.es'}
+
+        assert_raises(Exception, import_tasks, project.id, **form_data)
+
+        checkpoint = ImportCheckpoints(sentinel.master).get(project.id,
+                                                            form_data)
+        assert checkpoint == dict(type='csv', rows=10, created=8), checkpoint
+        body = send_mail.call_args[0][0]['body']
+        assert 'stopped after creating 8 new tasks' in body, body
+
 
 class TestAutoimportJobs(Test):
     @with_context
@@ -137,3 +137,22 @@ class TestModelBase(Test):
         outrun = out_task.task_runs[0]
         assert outrun.info['answer'] == task_run_info['answer'], outrun
         assert outrun.user.name == username, outrun
+
+    @with_context
+    def test_dictize_returns_every_column(self):
+        """Test DomainObject dictize returns a key for every column."""
+        task = Task(project_id=1, info={'foo': 'bar'})
+        task_dict = task.dictize()
+        assert sorted(task_dict.keys()) == sorted(Task.__table__.c.keys())
+        assert task_dict['info'] == {'foo': 'bar'}, task_dict
+        assert task_dict['project_id'] == 1, task_dict
+
+    @with_context
+    def test_dictize_rows(self):
+        """Test DomainObject dictize_rows builds dicts from row tuples."""
+        names = Category.column_names()
+        row = tuple(range(len(names)))
+        dicts = list(Category.dictize_rows([row]))
+        assert dicts == [dict(zip(names, row))], dicts
+        dicts = list(Category.dictize_rows([(1, 'name')], ['id', 'name']))
+        assert dicts == [{'id': 1, 'name': 'name'}], dicts
@@ -0,0 +1,77 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+
+from redis import StrictRedis
+from pybossa.progress_counters import ProgressCounters
+
+
+class TestProgressCounters(object):
+
+    def setUp(self):
+        self.connection = StrictRedis()
+        self.connection.flushall()
+        self.counters = ProgressCounters(self.connection)
+
+    def test_get_returns_none_if_not_initialized(self):
+        assert self.counters.get(1, user_id=1) is None
+
+    def test_set_initializes_the_counters(self):
+        key = 'pybossa:progress:project:1:user:1'
+
+        self.counters.set(1, 2, 8, user_id=1)
+
+        assert self.counters.get(1, user_id=1) == dict(done=2, available=8)
+        assert self.connection.ttl(key) > 0
+
+    def test_anonymous_users_are_counted_by_ip(self):
+        key = 'pybossa:progress:project:1:user:ip:127.0.0.1'
+
+        self.counters.set(1, 2, 8, user_ip='127.0.0.1')
+
+        assert self.connection.exists(key)
+        assert self.counters.get(1) == dict(done=2, available=8)
+
+    def test_add_task_run_updates_initialized_counters(self):
+        self.counters.set(1, 2, 8, user_id=1)
+
+        assert self.counters.add_task_run(1, user_id=1) is True
+
+        assert self.counters.get(1, user_id=1) == dict(done=3, available=7)
+
+    def test_add_task_run_does_not_initialize_counters(self):
+        assert self.counters.add_task_run(1, user_id=1) is False
+
+        assert self.counters.get(1, user_id=1) is None
+
+    def test_available_is_never_negative(self):
+        self.counters.set(1, 0, 0, user_id=1)
+
+        self.counters.add_task_run(1, user_id=1)
+
+        assert self.counters.get(1, user_id=1) == dict(done=1, available=0)
+
+    def test_reset_deletes_only_the_project_counters(self):
+        self.counters.set(1, 1, 1, user_id=1)
+        self.counters.set(1, 1, 1, user_ip='127.0.0.1')
+        self.counters.set(11, 1, 1, user_id=1)
+
+        self.counters.reset(1)
+
+        assert self.counters.get(1, user_id=1) is None
+        assert self.counters.get(1, user_ip='127.0.0.1') is None
+        assert self.counters.get(11, user_id=1) is not None
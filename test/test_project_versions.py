@@ -0,0 +1,64 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+
+from redis import StrictRedis
+from pybossa.project_versions import ProjectVersions
+
+
+class TestProjectVersions(object):
+
+    def setUp(self):
+        self.connection = StrictRedis()
+        self.connection.flushall()
+        self.versions = ProjectVersions(self.connection)
+
+    def test_get_initializes_a_missing_version(self):
+        key = 'pybossa:project_version:1'
+
+        version = self.versions.get(1)
+
+        assert self.connection.get(key) == version, version
+        assert self.versions.get(1) == version
+
+    def test_get_without_project_returns_site_version(self):
+        key = 'pybossa:project_version:site'
+
+        version = self.versions.get()
+
+        assert self.connection.get(key) == version, version
+
+    def test_bump_sets_a_new_version_for_project_and_site(self):
+        project_version = self.versions.get(1)
+        site_version = self.versions.get()
+
+        version = self.versions.bump(1)
+
+        assert version != project_version
+        assert version != site_version
+        assert self.versions.get(1) == version
+        assert self.versions.get() == version
+
+    def test_bump_does_not_change_other_projects(self):
+        other_version = self.versions.get(2)
+
+        self.versions.bump(1)
+
+        assert self.versions.get(2) == other_version
+
+    def test_timestamp(self):
+        assert self.versions.timestamp('1450000000.123456') == 1450000000
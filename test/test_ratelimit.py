@@ -27,6 +27,7 @@ import json
 from default import flask_app, sentinel
 from factories import ProjectFactory, UserFactory
 from mock import patch
+from pybossa.ratelimit import RateLimit, leases
 
 
 class TestAPI(object):
@@ -35,6 +36,12 @@ class TestAPI(object):
 
     def setUp(self):
         sentinel.connection.master_for('mymaster').flushall()
+        # Stop the token buckets from refilling while the tests run
+        self.time_patcher = patch('pybossa.ratelimit.time')
+        self.time_patcher.start().time.return_value = 1450000000.0
+
+    def tearDown(self):
+        self.time_patcher.stop()
 
     limit = flask_app.config.get('LIMIT')
 
@@ -138,3 +145,68 @@ class TestAPI(object):
 
         url = '/api/project/1/userprogress'
         self.check_limit(url, 'get', 'project')
+
+
+class TestRateLimit(object):
+
+    def setUp(self):
+        sentinel.connection.master_for('mymaster').flushall()
+        leases.leases.clear()
+
+    @patch('pybossa.ratelimit.time')
+    def test_token_bucket_refills(self, mock_time):
+        """Test RateLimit refills the bucket at limit/per tokens a second."""
+        with flask_app.app_context():
+            mock_time.time.return_value = 1000.0
+            for i in range(10):
+                rlimit = RateLimit('rate-limit/test/', 10, 10, True)
+            assert rlimit.remaining == 0, rlimit.remaining
+            assert rlimit.over_limit is False
+            rlimit = RateLimit('rate-limit/test/', 10, 10, True)
+            assert rlimit.over_limit is True
+            assert rlimit.reset == 1010, rlimit.reset
+
+            mock_time.time.return_value = 1003.0
+            rlimit = RateLimit('rate-limit/test/', 10, 10, True)
+            assert rlimit.over_limit is False
+            assert rlimit.remaining == 2, rlimit.remaining
+
+    @patch('pybossa.ratelimit.time')
+    def test_lease_serves_requests_locally(self, mock_time):
+        """Test RateLimit leases tokens only for clients under half their
+        limit."""
+        mock_time.time.return_value = 1000.0
+        with flask_app.app_context():
+            with patch('pybossa.ratelimit.sentinel') as mock_sentinel:
+                mock_sentinel.master = sentinel.connection.master_for('mymaster')
+                rlimit = RateLimit('rate-limit/test/', 20, 10, True, lease=5)
+                assert rlimit.remaining == 19, rlimit.remaining
+                mock_sentinel.master = None
+                for remaining in range(18, 14, -1):
+                    rlimit = RateLimit('rate-limit/test/', 20, 10, True,
+                                       lease=5)
+                    assert rlimit.remaining == remaining, rlimit.remaining
+
+                mock_sentinel.master = sentinel.connection.master_for('mymaster')
+                for remaining in range(14, 9, -1):
+                    rlimit = RateLimit('rate-limit/test/', 20, 10, True,
+                                       lease=5)
+                    assert rlimit.remaining == remaining, rlimit.remaining
+
+                # Close to the limit, tokens are taken one by one
+                rlimit = RateLimit('rate-limit/test/', 20, 10, True, lease=5)
+                assert rlimit.remaining == 9, rlimit.remaining
+                assert leases.take('rate-limit/test/', 1000.0) is None
+
+    def test_rate_limit_endpoint_override(self):
+        """Test the rate limit of an endpoint can be overridden."""
+        endpoints = {'api.api_project': {'limit': 2, 'per': 60}}
+        with patch.dict('pybossa.ratelimit.ratelimits',
+                        {'ENDPOINTS': endpoints}):
+            app = flask_app.test_client()
+            res = app.get('/api/project')
+            assert res.headers['X-RateLimit-Limit'] == '2', res.headers
+            app.get('/api/project')
+            res = app.get('/api/project')
+            assert res.status_code == 429, res.status_code
+
@@ -0,0 +1,149 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+import time
+from flask import session
+from mock import patch
+from sqlalchemy import create_engine, select, text
+from default import db, flask_app, sentinel
+from pybossa.api.fast_path import FastPathSession
+from pybossa.model.task import Task
+from pybossa.read_replicas import is_read, replica_lag, WROTE_AT
+
+
+class TestReadReplicas(object):
+
+    def setUp(self):
+        master = flask_app.config['SQLALCHEMY_DATABASE_URI']
+        # The same database, under another URI so it is not the master
+        binds = dict(slave=master,
+                     replica=master + '?application_name=replica',
+                     analytics=master + '?application_name=analytics')
+        self.config = patch.dict(flask_app.config, {
+            'SQLALCHEMY_BINDS': binds,
+            'READ_REPLICA_BINDS': ['slave', 'replica']})
+        self.config.start()
+        replica_lag.reset()
+        sentinel.master.flushall()
+
+    def tearDown(self):
+        self.config.stop()
+        replica_lag.reset()
+
+    def engine(self, bind=None):
+        return db.get_engine(flask_app, bind=bind)
+
+    def test_is_read(self):
+        """Test only SELECTs which do not lock are reads."""
+        assert is_read(select([Task.id]))
+        assert is_read(text('SELECT * FROM task'))
+        assert is_read('  select 1')
+        assert not is_read(select([Task.id]).with_for_update())
+        assert not is_read('SELECT * FROM task FOR UPDATE')
+        assert not is_read(Task.__table__.delete())
+        assert not is_read(text('UPDATE task SET n_answers=1'))
+        assert not is_read(None)
+
+    def test_get_reads_from_replica(self):
+        """Test the reads of a GET request go to the replica, skipping the
+        slave as it is the master."""
+        with flask_app.test_request_context('/', method='GET'):
+            session = db.create_session({})
+            assert session.get_bind(clause=select([Task.id])) is \
+                self.engine('replica')
+            assert session.get_bind(clause=Task.__table__.delete()) is \
+                self.engine()
+
+    def test_post_reads_from_master(self):
+        """Test the reads of a POST request go to the master."""
+        with flask_app.test_request_context('/', method='POST'):
+            session = db.create_session({})
+            assert session.get_bind(clause=select([Task.id])) is self.engine()
+
+    def test_no_request_reads_from_master(self):
+        """Test the reads out of a request go to the master."""
+        with flask_app.app_context():
+            session = db.create_session({})
+            assert session.get_bind(clause=select([Task.id])) is self.engine()
+
+    def test_reads_own_writes(self):
+        """Test a request reads from the master once it writes, and so does
+        the client for a while."""
+        with flask_app.test_request_context('/', method='GET'):
+            db_session = db.create_session({})
+            db_session.mark_write()
+            assert db_session.get_bind(clause=select([Task.id])) is \
+                self.engine()
+            assert session[WROTE_AT] <= time.time()
+        with flask_app.test_request_context('/', method='GET'):
+            session[WROTE_AT] = time.time()
+            db_session = db.create_session({})
+            assert db_session.get_bind(clause=select([Task.id])) is \
+                self.engine()
+        with flask_app.test_request_context('/', method='GET'):
+            session[WROTE_AT] = (time.time() -
+                                 flask_app.config['READ_REPLICA_STICKY'])
+            db_session = db.create_session({})
+            assert db_session.get_bind(clause=select([Task.id])) is \
+                self.engine('replica')
+
+    def test_token_client_reads_own_writes(self):
+        """Test an API client on the fast path, whose session is never saved,
+        reads from the master after writing, and other clients do not."""
+        with flask_app.test_request_context('/api/taskrun?api_key=tester',
+                                            method='POST'):
+            assert isinstance(session._get_current_object(), FastPathSession)
+            db.create_session({}).mark_write()
+        with flask_app.test_request_context('/api/task?api_key=tester',
+                                            method='GET'):
+            db_session = db.create_session({})
+            assert db_session.get_bind(clause=select([Task.id])) is \
+                self.engine()
+        with flask_app.test_request_context('/api/task?api_key=other',
+                                            method='GET'):
+            db_session = db.create_session({})
+            assert db_session.get_bind(clause=select([Task.id])) is \
+                self.engine('replica')
+
+    @patch.object(replica_lag, 'get')
+    def test_lagging_replica_is_skipped(self, get):
+        """Test the reads go to the master if the replica lags too much."""
+        get.return_value = flask_app.config['READ_REPLICA_MAX_LAG'] + 1
+        with flask_app.test_request_context('/', method='GET'):
+            session = db.create_session({})
+            assert session.get_bind(clause=select([Task.id])) is self.engine()
+
+    def test_replica_lag_is_checked(self):
+        """Test the lag of a replica is checked, and infinite if it fails."""
+        assert replica_lag.get('replica', self.engine('replica'), 60) == 0
+        broken = create_engine('postgresql://nobody@localhost:1/nothing')
+        assert replica_lag.get('broken', broken, 60) == float('inf')
+
+    def test_read_from(self):
+        """Test read_from sends the reads to a configured bind."""
+        with flask_app.app_context():
+            with db.read_from('analytics'):
+                assert db.session.get_bind(clause=select([Task.id])) is \
+                    self.engine('analytics')
+                assert db.session.get_bind(clause=Task.__table__.delete()) \
+                    is self.engine()
+            assert db.session.get_bind(clause=select([Task.id])) is \
+                self.engine()
+            with db.read_from('missing'):
+                assert db.session.get_bind(clause=select([Task.id])) is \
+                    self.engine()
+            db.session.remove()
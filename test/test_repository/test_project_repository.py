@@ -50,6 +50,17 @@ class TestProjectRepositoryForProjects(Test):
         assert project == retrieved_project, retrieved_project
 
 
+    def test_get_many_returns_projects(self):
+        """Test get_many method returns the projects with the given ids"""
+
+        projects = ProjectFactory.create_batch(3)
+
+        retrieved = self.project_repo.get_many([projects[0].id, projects[2].id])
+
+        assert sorted(p.id for p in retrieved) == [projects[0].id, projects[2].id]
+        assert self.project_repo.get_many([]) == []
+
+
     def test_get_by_shortname_return_none_if_no_project(self):
         """Test get_by_shortname returns None when a project with the specified
         short_name does not exist"""
@@ -102,6 +113,35 @@ class TestProjectRepositoryForProjects(Test):
             assert project in projects, project
 
 
+    def test_search_returns_published_projects_by_relevance(self):
+        """Test search returns the published projects matching the query,
+        with matches in the name first"""
+
+        by_description = ProjectFactory.create(published=True,
+                                               name='Count birds',
+                                               description='Spotting penguins')
+        by_name = ProjectFactory.create(published=True,
+                                        name='Penguin watch',
+                                        description='Count animals')
+        ProjectFactory.create(published=False, name='Penguins draft')
+        ProjectFactory.create(published=True, name='Whales')
+
+        retrieved_projects = self.project_repo.search('penguin')
+
+        assert retrieved_projects == [by_name, by_description], retrieved_projects
+
+
+    def test_search_uses_updated_vectors(self):
+        """Test search finds projects by their updated name"""
+
+        project = ProjectFactory.create(published=True, name='Old name')
+        project.name = 'Galaxy zoo'
+        self.project_repo.update(project)
+
+        assert self.project_repo.search('galaxy') == [project]
+        assert self.project_repo.search('old') == []
+
+
     def test_filter_by_no_matches(self):
         """Test filter_by returns an empty list if no projects match the query"""
 
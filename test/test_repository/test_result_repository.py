@@ -225,3 +225,36 @@ class TestResultRepository(Test):
         bad_object = dict()
 
         assert_raises(WrongObjectError, self.result_repo.update, bad_object)
+
+
+    def test_filter_results_with_answers(self):
+        """Test filter_results_with_answers returns the results with their
+        task and task runs"""
+
+        task = TaskFactory.create(n_answers=2)
+        task_runs = TaskRunFactory.create_batch(2, task=task)
+        result = self.result_repo.get_by(project_id=task.project_id)
+
+        results = list(self.result_repo.filter_results_with_answers(
+            task.project_id))
+
+        assert len(results) == 1, results
+        assert results[0]['id'] == result.id, results
+        assert results[0]['task']['id'] == task.id, results
+        assert [tr['id'] for tr in results[0]['task_runs']] == [
+            tr.id for tr in task_runs], results
+
+
+    def test_filter_results_with_answers_last_id(self):
+        """Test filter_results_with_answers returns only the results past
+        last_id"""
+
+        tasks = TaskFactory.create_batch(2, n_answers=1)
+        for task in tasks:
+            TaskRunFactory.create(task=task)
+        first = self.result_repo.get_by(task_id=tasks[0].id)
+
+        results = list(self.result_repo.filter_results_with_answers(
+            tasks[0].project_id, last_id=first.id))
+
+        assert [r['task_id'] for r in results] == [tasks[1].id], results
@@ -17,6 +17,7 @@
 # along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
 # Cache global variables for timeouts
 
+import threading
 from default import Test, db
 from nose.tools import assert_raises
 from factories import TaskFactory, TaskRunFactory, ProjectFactory
@@ -62,6 +63,38 @@ class TestTaskRepositoryForTaskQueries(Test):
         assert len(res) == 0, len(res)
 
 
+    def test_handle_info_json_fulltextsearch_checks_the_key(self):
+        """Test handle info fulltextsearch only matches the given key, and
+        finds tasks inserted and updated without the ORM."""
+        project = ProjectFactory.create()
+        task = Task(project_id=project.id, info={'foo': 'agent', 'bar': 'x'})
+        self.task_repo.bulk_save([task])
+        res = self.task_repo.filter_tasks_by(info='bar::agent',
+                                             fulltextsearch='1')
+        assert len(res) == 0, res
+
+        db.session.execute("update task set info='{\"bar\": \"agents\"}'")
+        db.session.commit()
+        res = self.task_repo.filter_tasks_by(info='bar::agent',
+                                             fulltextsearch='1')
+        assert len(res) == 1, res
+        res = self.task_repo.filter_tasks_by(info='foo::agent',
+                                             fulltextsearch='1')
+        assert len(res) == 0, res
+
+
+    def test_handle_info_json_fulltextsearch_negated(self):
+        """Test handle info fulltextsearch with a negation only looks at the
+        given key, and works with info which is not a JSON object."""
+        TaskFactory.create(info={'foo': 'bar', 'other': 'agent'})
+        TaskFactory.create(info={'foo': 'agent'})
+        TaskFactory.create(info='agent')
+        res = self.task_repo.filter_tasks_by(info='foo::!agent',
+                                             fulltextsearch='1')
+        assert len(res) == 1, res
+        assert res[0].info == {'foo': 'bar', 'other': 'agent'}, res[0]
+
+
     def test_handle_info_json_multiple_keys(self):
         """Test handle info in JSON with multiple keys works."""
         TaskFactory.create(info={'foo': 'bar', 'bar': 'foo'})
@@ -226,6 +259,39 @@ class TestTaskRepositoryForTaskQueries(Test):
             assert task in tasks
 
 
+    def test_filter_tasks_dictized(self):
+        """Test that filter_tasks_by with the dictized=True option returns the
+        tasks as dicts"""
+
+        tasks = TaskFactory.create_batch(2, state='done')
+
+        dictized = self.task_repo.filter_tasks_by(state='done', dictized=True)
+        assert dictized == [task.dictize() for task in tasks], dictized
+
+        yielded = self.task_repo.filter_tasks_by(state='done', dictized=True,
+                                                 yielded=True,
+                                                 fields=['id', 'state'])
+        assert list(yielded) == [dict(id=task.id, state='done')
+                                 for task in tasks]
+
+
+    def test_get_info_types(self):
+        """Test get_info_types returns the info keys of all the tasks of a
+        project with the JSON types of their values"""
+
+        project = ProjectFactory.create()
+        TaskFactory.create(project=project, info=dict(a=1, b='foo'))
+        TaskFactory.create(project=project, info=dict(a='bar', c=[1]))
+        TaskFactory.create(project=project, info='not an object')
+        TaskFactory.create(info=dict(d=True))
+
+        info_types = self.task_repo.get_info_types(Task, project.id)
+
+        assert info_types == dict(a=set(['number', 'string']),
+                                  b=set(['string']),
+                                  c=set(['array'])), info_types
+
+
     def test_filter_tasks_limit_offset(self):
         """Test that filter_tasks_by supports limit and offset options"""
 
@@ -421,6 +487,17 @@ class TestTaskRepositoryForTaskrunQueries(Test):
             assert taskrun in task_runs
 
 
+    def test_filter_task_runs_dictized(self):
+        """Test that filter_task_runs_by with the dictized=True option returns
+        the task runs as dicts"""
+
+        task_runs = TaskRunFactory.create_batch(2, info='info')
+
+        dictized = self.task_repo.filter_task_runs_by(info='info',
+                                                      dictized=True)
+        assert dictized == [taskrun.dictize() for taskrun in task_runs]
+
+
     def test_filter_tasks_runs_limit_offset(self):
         """Test that filter_tasks_by supports limit and offset options"""
 
@@ -509,6 +586,84 @@ class TestTaskRepositorySaveDeleteUpdate(Test):
         assert_raises(DBIntegrityError, self.task_repo.save, task)
 
 
+    def test_bulk_save_saves_tasks_in_chunks(self):
+        """Test bulk_save persists many Task instances and sets their ids"""
+
+        project = ProjectFactory.create()
+        tasks = [Task(project_id=project.id, info={'n': i}) for i in range(5)]
+
+        self.task_repo.bulk_save(tasks, chunk_size=2)
+
+        for task in tasks:
+            saved = self.task_repo.get_task(task.id)
+            assert saved.info == task.info, saved
+            assert saved.state == 'ongoing', saved
+            assert saved.created is not None, saved
+        assert self.task_repo.count_tasks_with(project_id=project.id) == 5
+
+
+    def test_bulk_save_fails_if_integrity_error(self):
+        """Test bulk_save raises a DBIntegrityError and saves nothing if a task
+        lacks a required value"""
+
+        project = ProjectFactory.create()
+        tasks = [Task(project_id=project.id), Task(project_id=None)]
+
+        assert_raises(DBIntegrityError, self.task_repo.bulk_save, tasks)
+        assert self.task_repo.count_tasks_with(project_id=project.id) == 0
+
+
+    def test_import_tasks_skips_duplicates(self):
+        """Test import_tasks only saves the tasks whose info is not in the
+        project yet, and returns how many it saved"""
+
+        project = ProjectFactory.create()
+        TaskFactory.create(project=project, info={'a': 1, 'b': 2})
+        infos = [{'b': 2, 'a': 1}, {'a': 3}, {'a': 4}, {'a': 3}, {'a': 5}]
+        tasks = (Task(project_id=project.id, info=info) for info in infos)
+
+        n = self.task_repo.import_tasks(tasks, chunk_size=2)
+
+        assert n == 3, n
+        assert self.task_repo.count_tasks_with(project_id=project.id) == 4
+        assert self.task_repo.import_tasks(
+            [Task(project_id=project.id, info={'a': 4})]) == 0
+
+
+    def test_save_allows_concurrent_duplicates(self):
+        """Test save stores a task whose info is being inserted at the same
+        time by another transaction"""
+
+        project = ProjectFactory.create()
+        conn = db.engine.connect()
+        trans = conn.begin()
+        conn.execute(Task.__table__.insert(), project_id=project.id,
+                     info={'a': 1})
+        # The save waits on the unique index until the other insert commits
+        timer = threading.Timer(0.5, trans.commit)
+        timer.start()
+
+        self.task_repo.save(Task(project_id=project.id, info={'a': 1}))
+
+        timer.join()
+        conn.close()
+        assert self.task_repo.count_tasks_with(project_id=project.id) == 2
+
+
+    def test_import_tasks_allows_duplicates_in_other_projects(self):
+        """Test import_tasks saves a task if its info is only in another
+        project"""
+
+        project, other = ProjectFactory.create_batch(2)
+        TaskFactory.create(project=other, info={'a': 1})
+
+        n = self.task_repo.import_tasks([Task(project_id=project.id,
+                                              info={'a': 1})])
+
+        assert n == 1, n
+        assert self.task_repo.count_tasks_with(project_id=project.id) == 1
+
+
     def test_save_only_saves_tasks_and_taskruns(self):
         """Test save raises a WrongObjectError when an object which is neither
         a Task nor a Taskrun instance is saved"""
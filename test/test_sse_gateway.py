@@ -0,0 +1,138 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+from itsdangerous import URLSafeTimedSerializer
+from mock import MagicMock, patch
+from nose.plugins.skip import SkipTest
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+try:
+    import gevent
+except ImportError:  # pragma: no cover
+    raise SkipTest('gevent is not installed')
+
+from pybossa.sse import gateway_for
+from pybossa.sse.gateway import Subscriber, Hub, SSEGateway
+
+
+class TestSubscriber(object):
+
+    def test_events(self):
+        """Test Subscriber yields queued events."""
+        subscriber = Subscriber('channel_public_foo', '127.0.0.1', 10)
+        subscriber.put('foobar')
+        events = subscriber.events(heartbeat=1)
+        assert next(events) == 'data: foobar\n\n'
+
+    def test_events_heartbeat(self):
+        """Test Subscriber yields a heartbeat when idle."""
+        subscriber = Subscriber('channel_public_foo', '127.0.0.1', 10)
+        events = subscriber.events(heartbeat=0.01)
+        assert next(events) == ': heartbeat\n\n'
+
+    def test_slow_subscriber_is_closed(self):
+        """Test Subscriber is closed when its queue is full."""
+        subscriber = Subscriber('channel_public_foo', '127.0.0.1', 1)
+        subscriber.put('first')
+        subscriber.put('second')
+        assert subscriber.closed is True
+        assert list(subscriber.events(heartbeat=1)) == []
+
+
+class TestHub(object):
+
+    def setUp(self):
+        self.redis = MagicMock()
+        self.hub = Hub(self.redis, max_connections=3,
+                       max_connections_per_ip=2, max_queued=10)
+
+    @patch('pybossa.sse.gateway.gevent')
+    def test_one_redis_subscription_per_channel(self, gevent):
+        """Test Hub subscribes to a channel only once."""
+        pubsub = self.redis.pubsub.return_value
+        first = self.hub.subscribe('channel_public_foo', '1.1.1.1')
+        second = self.hub.subscribe('channel_public_foo', '2.2.2.2')
+        pubsub.subscribe.assert_called_once_with('channel_public_foo')
+        self.hub.unsubscribe(first)
+        assert not pubsub.unsubscribe.called
+        self.hub.unsubscribe(second)
+        pubsub.unsubscribe.assert_called_once_with('channel_public_foo')
+        assert self.hub.n_connections == 0
+
+    @patch('pybossa.sse.gateway.gevent')
+    def test_publish_fans_out(self, gevent):
+        """Test Hub sends a message to every subscriber of a channel."""
+        first = self.hub.subscribe('channel_public_foo', '1.1.1.1')
+        second = self.hub.subscribe('channel_public_foo', '2.2.2.2')
+        other = self.hub.subscribe('channel_public_bar', '3.3.3.3')
+        self.hub.publish('channel_public_foo', 'foobar')
+        assert first.queue.get_nowait() == 'foobar'
+        assert second.queue.get_nowait() == 'foobar'
+        assert other.queue.empty()
+
+    @patch('pybossa.sse.gateway.gevent')
+    def test_connection_caps(self, gevent):
+        """Test Hub enforces the global and per IP connection caps."""
+        self.hub.subscribe('channel_public_foo', '1.1.1.1')
+        self.hub.subscribe('channel_public_foo', '1.1.1.1')
+        assert self.hub.can_accept('1.1.1.1') is False
+        assert self.hub.can_accept('2.2.2.2') is True
+        self.hub.subscribe('channel_public_foo', '2.2.2.2')
+        assert self.hub.can_accept('3.3.3.3') is False
+
+
+class TestSSEGateway(object):
+
+    def setUp(self):
+        self.signer = URLSafeTimedSerializer('secret')
+        self.hub = MagicMock()
+        self.gateway = SSEGateway(self.hub, self.signer, heartbeat=1)
+
+    def request(self, path, **args):
+        return Request(EnvironBuilder(path=path, query_string=args).get_environ())
+
+    def test_invalid_token(self):
+        """Test SSEGateway rejects an invalid token."""
+        res = self.gateway.dispatch(self.request('/stream', token='foo'))
+        assert res.status_code == 403, res.status_code
+
+    def test_connection_cap(self):
+        """Test SSEGateway returns 503 when the hub is full."""
+        self.hub.can_accept.return_value = False
+        token = self.signer.dumps(dict(channel='channel_public_foo'))
+        res = self.gateway.dispatch(self.request('/stream', token=token))
+        assert res.status_code == 503, res.status_code
+        assert not self.hub.subscribe.called
+
+    def test_stream(self):
+        """Test SSEGateway streams the channel of the token."""
+        self.hub.can_accept.return_value = True
+        token = self.signer.dumps(dict(channel='channel_public_foo'))
+        res = self.gateway.dispatch(self.request('/stream', token=token))
+        assert res.status_code == 200, res.status_code
+        assert res.mimetype == 'text/event-stream'
+        assert self.hub.subscribe.call_args[0][0] == 'channel_public_foo'
+
+
+def test_gateway_for_is_stable():
+    """Test gateway_for always returns the same shard for a channel."""
+    gateways = ['http://a', 'http://b', 'http://c']
+    shard = gateway_for('channel_public_foo', gateways)
+    assert shard in gateways
+    assert gateway_for('channel_public_foo', gateways) == shard
+    assert gateway_for('channel_public_foo', []) is None
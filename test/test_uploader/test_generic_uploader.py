@@ -129,3 +129,16 @@ class TestUploader(Test):
                               IOError,
                               'endpoint',
                               'values')
+
+    @with_context
+    def test_upload_chunks(self):
+        """Test UPLOADER upload_chunks spools the chunks into a file."""
+        u = Uploader()
+        uploaded = []
+        def _upload_file(file, container):
+            uploaded.append((file.filename, file.read(), container))
+            return True
+        with patch.object(u, '_upload_file', side_effect=_upload_file):
+            assert u.upload_chunks(iter(['foo', 'bar']), 'test.zip', 'user_3')
+        assert uploaded == [('test.zip', 'foobar', 'user_3')], uploaded
+        assert u.upload_chunks(iter(['foo']), 'test.txt', 'user_3') is False
@@ -159,3 +159,32 @@ class TestLocalUploader(Test):
         u.upload_file(file, container=container)
 
         assert u.file_exists('test.jpg', container) is True
+
+    def test_local_uploader_upload_chunks(self):
+        """Test LOCAL UPLOADER upload_chunks writes the file."""
+        u = LocalUploader()
+        u.upload_folder = tempfile.mkdtemp()
+        res = u.upload_chunks(iter(['foo', 'bar']), 'test.zip', 'mycontainer')
+        assert res is True, res
+        path = os.path.join(u.upload_folder, 'mycontainer', 'test.zip')
+        assert open(path).read() == 'foobar'
+        assert os.listdir(os.path.dirname(path)) == ['test.zip']
+
+    def test_local_uploader_upload_chunks_fails(self):
+        """Test LOCAL UPLOADER upload_chunks leaves no file if it fails."""
+        def chunks():
+            yield 'foo'
+            raise IOError
+        u = LocalUploader()
+        u.upload_folder = tempfile.mkdtemp()
+        res = u.upload_chunks(chunks(), 'test.zip', 'mycontainer')
+        assert res is False, res
+        folder = os.path.join(u.upload_folder, 'mycontainer')
+        assert os.listdir(folder) == [], os.listdir(folder)
+
+    def test_local_uploader_upload_chunks_wrong_file(self):
+        """Test LOCAL UPLOADER upload_chunks with wrong extension."""
+        u = LocalUploader()
+        u.upload_folder = tempfile.mkdtemp()
+        res = u.upload_chunks(iter(['foo']), 'test.txt', 'mycontainer')
+        assert res is False, res
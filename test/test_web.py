@@ -39,10 +39,14 @@ from pybossa.model.task_run import TaskRun
 from pybossa.model.user import User
 from pybossa.messages import *
 from pybossa.core import user_repo, sentinel, project_repo, result_repo, signer
+from pybossa.core import parquet_exporter
 from pybossa.jobs import send_mail, import_tasks
 from pybossa.importers import ImportReport
+from pybossa.import_checkpoints import ImportCheckpoints
+from pybossa.export_watermarks import ExportWatermarks
 from factories import ProjectFactory, CategoryFactory, TaskFactory, TaskRunFactory, UserFactory
 from unidecode import unidecode
+from nose.plugins.skip import SkipTest
 from werkzeug.utils import secure_filename
 
 
@@ -74,6 +78,20 @@ class TestWeb(web.Helper):
         err_msg = "Search page should be accessible"
         assert "Search" in res.data, err_msg
 
+    @with_context
+    @patch('pybossa.view.home.render_template')
+    def test_01_search_projects(self, mock_render):
+        """Test WEB search page finds published projects."""
+        mock_render.return_value = 'Search'
+        project = ProjectFactory.create(published=True, name='Penguin watch')
+        ProjectFactory.create(published=True, name='Whales')
+
+        self.app.get('/search?q=penguins')
+
+        kwargs = mock_render.call_args[1]
+        assert kwargs['query'] == 'penguins', kwargs
+        assert [p.id for p in kwargs['projects']] == [project.id], kwargs
+
     @with_context
     def test_result_view(self):
         """Test WEB result page works."""
@@ -1548,7 +1566,9 @@ class TestWeb(web.Helper):
         expected = [call('1_test-app_task_json.zip', 'user_2'),
                     call('1_test-app_task_csv.zip', 'user_2'),
                     call('1_test-app_task_run_json.zip', 'user_2'),
-                    call('1_test-app_task_run_csv.zip', 'user_2')]
+                    call('1_test-app_task_run_csv.zip', 'user_2'),
+                    call('1_test-app_task_parquet.zip', 'user_2'),
+                    call('1_test-app_task_run_parquet.zip', 'user_2')]
         assert uploader.delete_file.call_args_list == expected
 
     @with_context
@@ -2790,6 +2810,70 @@ class TestWeb(web.Helper):
         filename = secure_filename(unidecode(u'Измени Киев!'))
         assert filename in res.headers.get('Content-Disposition'), res.headers
 
+    @with_context
+    def test_export_results_json(self):
+        """Test WEB export Results to JSON embeds the tasks and task runs"""
+        project = ProjectFactory.create()
+        self.clear_temp_container(project.owner_id)
+        task = TaskFactory.create(project=project, n_answers=2)
+        task_runs = TaskRunFactory.create_batch(2, task=task)
+        uri = "/project/%s/tasks/export?type=result&format=json" % project.short_name
+        res = self.app.get(uri, follow_redirects=True)
+        zip = zipfile.ZipFile(StringIO(res.data))
+        assert zip.namelist() == ['project1_result.json'], zip.namelist()
+        results = json.loads(zip.read('project1_result.json'))
+        assert len(results) == 1, results
+        assert results[0]['task']['id'] == task.id, results
+        assert [tr['id'] for tr in results[0]['task_runs']] == [
+            tr.id for tr in task_runs], results
+
+    @with_context
+    def test_export_results_csv(self):
+        """Test WEB export Results to CSV writes the answers as JSON"""
+        project = ProjectFactory.create()
+        self.clear_temp_container(project.owner_id)
+        task = TaskFactory.create(project=project, n_answers=1)
+        task_run = TaskRunFactory.create(task=task)
+        uri = "/project/%s/tasks/export?type=result&format=csv" % project.short_name
+        res = self.app.get(uri, follow_redirects=True)
+        zip = zipfile.ZipFile(StringIO(res.data))
+        csv_content = StringIO(zip.read('project1_result.csv'))
+        header, row = list(unicode_csv_reader(csv_content))
+        task_json = row[header.index('result__task')]
+        assert json.loads(task_json)['id'] == task.id, row
+        task_runs = json.loads(row[header.index('result__task_runs')])
+        assert [tr['id'] for tr in task_runs] == [task_run.id], row
+
+    @with_context
+    def test_export_task_parquet(self):
+        """Test WEB export Tasks to Parquet works"""
+        if not parquet_exporter.enabled:
+            raise SkipTest('pyarrow is not installed')
+        import pyarrow.parquet
+        project = ProjectFactory.create()
+        self.clear_temp_container(project.owner_id)
+        TaskFactory.create(project=project, info=dict(a=1))
+        TaskFactory.create(project=project, info=dict(b='foo'))
+        uri = "/project/%s/tasks/export?type=task&format=parquet" % project.short_name
+        res = self.app.get(uri, follow_redirects=True)
+        zip = zipfile.ZipFile(StringIO(res.data))
+        assert zip.namelist() == ['project1_task.parquet'], zip.namelist()
+        table = pyarrow.parquet.read_table(
+            pyarrow.BufferReader(zip.read('project1_task.parquet')))
+        data = table.to_pydict()
+        assert data['taskinfo__a'] == [1.0, None], data
+        assert data['taskinfo__b'] == [None, 'foo'], data
+        assert data['task__project_id'] == [project.id, project.id], data
+
+    @with_context
+    @patch('pybossa.exporter.parquet_export.pyarrow', None)
+    def test_export_parquet_needs_pyarrow(self):
+        """Test WEB export to Parquet is not supported without pyarrow"""
+        project = ProjectFactory.create()
+        uri = "/project/%s/tasks/export?type=task&format=parquet" % project.short_name
+        res = self.app.get(uri, follow_redirects=True)
+        assert res.status_code == 415, res.status_code
+
     @with_context
     def test_export_taskruns_json(self):
         """Test WEB export Task Runs to JSON works"""
@@ -2830,6 +2914,30 @@ class TestWeb(web.Helper):
         content_disposition = 'attachment; filename=%d_test-app_task_run_json.zip' % project.id
         assert res.headers.get('Content-Disposition') == content_disposition, res.headers
 
+    @with_context
+    def test_jobs_progress(self):
+        """Test WEB jobs progress returns the progress of the import, export
+        and CKAN jobs of a project in JSON"""
+        project = ProjectFactory.create()
+        ImportCheckpoints(sentinel.master).set(project.id, {'type': 'csv'},
+                                               10, 8)
+        watermarks = ExportWatermarks(sentinel.master)
+        watermarks.set_shards(project.id, 'foo.zip',
+                              dict(boundaries=[1, 3, 5], base=False,
+                                   first_part=0))
+        watermarks.set_ckan_progress(project.id, 'task', 1, 4)
+
+        res = self.app.get('/project/%s/tasks/progress' % project.short_name)
+        progress = json.loads(res.data)
+
+        assert res.mimetype == 'application/json', res.mimetype
+        assert progress['import_progress'] == [
+            dict(type='csv', rows=10, created=8)], progress
+        assert progress['export_progress'] == {
+            'foo.zip': dict(done=0, total=2)}, progress
+        assert progress['ckan_progress'] == {
+            'task': dict(done=1, total=4)}, progress
+
     @with_context
     def test_export_task_json_no_tasks_returns_file_with_empty_list(self):
         """Test WEB export Tasks to JSON returns empty list if no tasks in project"""
@@ -3157,7 +3265,7 @@ class TestWeb(web.Helper):
         with patch.dict(self.flask_app.config, {'CKAN_URL': 'http://ckan.com'}):
             # First time exporting the package
             res = self.app.get(uri, follow_redirects=True)
-            msg = 'Data exported to http://ckan.com'
+            msg = 'Data is being exported to http://ckan.com'
             err_msg = "Tasks should be exported to CKAN"
             assert msg in res.data, err_msg
 
@@ -3210,7 +3318,7 @@ class TestWeb(web.Helper):
         with patch.dict(self.flask_app.config, {'CKAN_URL': 'http://ckan.com'}):
             # First time exporting the package
             res = self.app.get(uri, follow_redirects=True)
-            msg = 'Data exported to http://ckan.com'
+            msg = 'Data is being exported to http://ckan.com'
             err_msg = "Tasks should be exported to CKAN"
             assert msg in res.data, err_msg
 
@@ -3258,10 +3366,44 @@ class TestWeb(web.Helper):
         with patch.dict(self.flask_app.config, {'CKAN_URL': 'http://ckan.com'}):
             # First time exporting the package
             res = self.app.get(uri, follow_redirects=True)
-            msg = 'Data exported to http://ckan.com'
+            msg = 'Data is being exported to http://ckan.com'
             err_msg = "Tasks should be exported to CKAN"
             assert msg in res.data, err_msg
 
+    @with_context
+    @patch('pybossa.view.projects.ckan_queue.enqueue')
+    @patch('pybossa.view.projects.Ckan', autospec=True)
+    def test_export_task_runs_ckan_appends_new_ones(self, mock1, enqueue):
+        """Test WEB Export CKAN Task Runs only sends the new ones if they
+        were synced."""
+        from pybossa.export_watermarks import ExportWatermarks
+        mocks = [Mock()]
+        resource = dict(name='task_run', id=1)
+        package = dict(id=3, resources=[resource])
+        mocks[0].package_exists.return_value = (package, None)
+        mocks[0].package_update.return_value = package
+        mock1.side_effect = mocks
+
+        Fixtures.create()
+        user = db.session.query(User).filter_by(name=Fixtures.name).first()
+        project = db.session.query(Project).first()
+        user.ckan_api = 'ckan-api-key'
+        project.owner_id = user.id
+        db.session.add(user)
+        db.session.add(project)
+        db.session.commit()
+        ExportWatermarks(sentinel.master).set_ckan_sync(project.id, 1, 10)
+
+        self.signin(email=user.email_addr, password=Fixtures.password)
+        uri = "/project/%s/tasks/export?type=task_run&format=ckan" % Fixtures.project_short_name
+        with patch.dict(self.flask_app.config, {'CKAN_URL': 'http://ckan.com'}):
+            self.app.get(uri, follow_redirects=True)
+
+        assert not mocks[0].datastore_delete.called
+        args, kwargs = enqueue.call_args
+        assert args[1:] == (project.id, 'task_run', 1, user.id), args
+        assert kwargs == dict(append=True), kwargs
+
     @patch('pybossa.view.projects.uploader.upload_file', return_value=True)
     def test_get_import_tasks_no_params_shows_options_and_templates(self, mock):
         """Test WEB import tasks displays the different importers and template
@@ -3577,7 +3719,7 @@ class TestWeb(web.Helper):
             assert t.info == epi_tasks[n], "The task info should be the same"
             n += 1
 
-    @patch('pybossa.importers.flickr.requests.get')
+    @patch('pybossa.importers.base.requests.Session.get')
     def test_bulk_flickr_import_works(self, request):
         """Test WEB bulk Flickr import works"""
         data = {
@@ -3806,7 +3948,9 @@ class TestWeb(web.Helper):
         expected = [call('1_test-app_task_json.zip', 'user_2'),
                     call('1_test-app_task_csv.zip', 'user_2'),
                     call('1_test-app_task_run_json.zip', 'user_2'),
-                    call('1_test-app_task_run_csv.zip', 'user_2')]
+                    call('1_test-app_task_run_csv.zip', 'user_2'),
+                    call('1_test-app_task_parquet.zip', 'user_2'),
+                    call('1_test-app_task_run_parquet.zip', 'user_2')]
         assert uploader.delete_file.call_args_list == expected
 
     @with_context
@@ -3837,6 +3981,12 @@ class TestWeb(web.Helper):
         assert api_key != user.api_key, err_msg
         self.signout()
 
+        # The old API key is no longer valid
+        res = self.app.get('/api/token?api_key=%s' % api_key)
+        assert res.status_code == 401, res.status_code
+        res = self.app.get('/api/token?api_key=%s' % user.api_key)
+        assert res.status_code == 200, res.status_code
+
         self.register(fullname="new", name="new")
         res = self.app.post(url)
         assert res.status_code == 403, res.status_code
@@ -18,7 +18,7 @@
 from helper import web
 from default import with_context
 from factories import ProjectFactory
-from pybossa.core import user_repo
+from pybossa.core import user_repo, signer
 from pybossa.view.projects import project_event_stream
 from mock import patch, MagicMock
 
@@ -202,3 +202,31 @@ class TestWebSse(web.Helper):
         res = project_event_stream('foo', 'public')
         expected = 'data: %s\n\n' % 'foobar'
         assert next(res) == expected, next(res)
+
+    @with_context
+    def test_stream_uri_public_redirects_to_gateway(self):
+        """Test stream URI public redirects to the SSE gateway works."""
+        project = ProjectFactory.create()
+        public_uri = '/project/%s/publicstream' % project.short_name
+        gateways = {'SSE_GATEWAY_URLS': ['http://sse.example.com']}
+        with patch.dict(self.flask_app.config, gateways):
+            res = self.app.get(public_uri)
+            assert res.status_code == 302, res.status_code
+            location = res.headers['Location']
+            assert location.startswith('http://sse.example.com/stream?token='), location
+
+    @with_context
+    def test_stream_uri_private_owner_redirects_to_gateway(self):
+        """Test stream URI private redirects owner to the SSE gateway works."""
+        self.register()
+        user = user_repo.get(1)
+        project = ProjectFactory.create(owner=user)
+        private_uri = '/project/%s/privatestream' % project.short_name
+        gateways = {'SSE_GATEWAY_URLS': ['http://sse.example.com']}
+        with patch.dict(self.flask_app.config, gateways):
+            res = self.app.get(private_uri)
+            assert res.status_code == 302, res.status_code
+            token = res.headers['Location'].split('token=')[1]
+            payload = signer.loads(token)
+            channel = 'channel_private_%s' % project.short_name
+            assert payload['channel'] == channel, payload
@@ -0,0 +1,92 @@
+# -*- coding: utf8 -*-
+# This file is part of PYBOSSA.
+#
+# Copyright (C) 2015 Scifabric LTD.
+#
+# PYBOSSA is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PYBOSSA is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PYBOSSA.  If not, see <http://www.gnu.org/licenses/>.
+import zipfile
+from StringIO import StringIO
+from mock import patch
+
+from pybossa.exporter.zipstream import ZipStream
+
+
+class TestZipStream(object):
+
+    def archive(self, members):
+        return zipfile.ZipFile(StringIO(''.join(ZipStream().stream(members))))
+
+    def test_stream_is_a_valid_zip(self):
+        """Test ZipStream yields an archive readable by zipfile."""
+        rows = ('{"id": %d}, ' % i for i in range(1000))
+        archive = self.archive([('tasks.json', rows),
+                                ('tasks.csv', [u'id\n', u'\xe9\n'])])
+        assert archive.testzip() is None
+        assert archive.namelist() == ['tasks.json', 'tasks.csv']
+        expected = ''.join('{"id": %d}, ' % i for i in range(1000))
+        assert archive.read('tasks.json') == expected
+        assert archive.read('tasks.csv') == u'id\n\xe9\n'.encode('utf-8')
+
+    def test_stream_empty_member(self):
+        """Test ZipStream supports members without data."""
+        archive = self.archive([('empty.csv', [''])])
+        assert archive.testzip() is None
+        assert archive.read('empty.csv') == ''
+
+    def test_stream_is_lazy(self):
+        """Test ZipStream consumes the data only while it is iterated."""
+        def rows():
+            yield 'foo'
+            raise AssertionError('consumed too soon')
+        chunks = ZipStream().stream([('foo.json', rows())])
+        assert next(chunks).startswith(zipfile.stringFileHeader)
+
+    def test_stream_zip64(self):
+        """Test ZipStream writes ZIP64 records for big members."""
+        with patch('zipfile.ZIP64_LIMIT', 16):
+            data = ''.join(ZipStream().stream([('big.json', ['x' * 1000]),
+                                               ('small.json', ['y'])]))
+        archive = zipfile.ZipFile(StringIO(data))
+        assert archive.testzip() is None
+        assert archive.getinfo('big.json').file_size == 1000
+        assert archive.read('small.json') == 'y'
+
+    def test_resume(self):
+        """Test ZipStream resumes an archive from its checkpoint."""
+        zipstream = ZipStream()
+        data = ''.join(zipstream.stream([('tasks.json', ['[', '1'], ']')]))
+        checkpoint = zipstream.checkpoint
+        head = data[:checkpoint['offset']]
+
+        resumed = ZipStream()
+        data = head + ''.join(resumed.resume(checkpoint, [', 2', ', 3'], ']'))
+
+        archive = zipfile.ZipFile(StringIO(data))
+        assert archive.testzip() is None
+        assert archive.read('tasks.json') == '[1, 2, 3]'
+        assert resumed.checkpoint['offset'] > checkpoint['offset']
+
+    def test_copy(self):
+        """Test ZipStream copies members of other archives as they are."""
+        first = StringIO(''.join(ZipStream().stream([('a.json', ['[1]'])])))
+        second = StringIO(''.join(ZipStream().stream([('a.json', ['[2]'])])))
+        zipstream = ZipStream()
+        chunks = list(zipstream.copy(first, 'a.json', 'a_0000.json'))
+        chunks += list(zipstream.copy(second, 'a.json', 'a_0001.json'))
+        chunks += list(zipstream.stream([('manifest.json', ['{}'])]))
+        archive = zipfile.ZipFile(StringIO(''.join(chunks)))
+        assert archive.testzip() is None
+        assert archive.namelist() == ['a_0000.json', 'a_0001.json',
+                                      'manifest.json']
+        assert archive.read('a_0001.json') == '[2]'